@@ -0,0 +1,62 @@
+"""HTML提取性能基准
+
+对比 lxml 预编译 XPath 提取引擎与原 BeautifulSoup 选择器在保存的页面上的耗时，
+并校验两者结果完全一致
+
+用法:
+    python benchmarks/bench_html_extract.py [迭代次数]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from downloader.html_extractor import HtmlExtractor  # noqa: E402
+
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+
+def load_fixtures():
+    """加载所有HTML样例页面"""
+    fixtures = {}
+    for name in sorted(os.listdir(FIXTURE_DIR)):
+        if name.endswith('.html'):
+            with open(os.path.join(FIXTURE_DIR, name), 'r', encoding='utf-8') as f:
+                fixtures[name] = f.read()
+    return fixtures
+
+
+def time_it(func, text, iterations):
+    """返回每次调用的平均耗时（毫秒）"""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func(text)
+    return (time.perf_counter() - start) / iterations * 1000
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    extractor = HtmlExtractor()
+
+    print(f"{'页面':<22}{'大小':>10}{'BeautifulSoup':>16}{'lxml XPath':>14}{'加速比':>10}")
+    for name, text in load_fixtures().items():
+        expected = extractor.extract_with_soup(text)
+        actual = extractor.extract(text)
+        if expected != actual:
+            print(f"{name}: 结果不一致!")
+            for key in expected:
+                if expected[key] != actual[key]:
+                    print(f"  {key}: soup={expected[key][:5]} lxml={actual[key][:5]}")
+            sys.exit(1)
+
+        soup_ms = time_it(extractor.extract_with_soup, text, iterations)
+        lxml_ms = time_it(extractor.extract, text, iterations)
+        size_kb = len(text.encode('utf-8')) / 1024
+        print(f"{name:<22}{size_kb:>8.1f}KB{soup_ms:>14.2f}ms{lxml_ms:>12.2f}ms{soup_ms / lxml_ms:>9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,245 @@
+"""视频下载器 - 命令行批量下载入口
+
+无界面批量下载，不依赖 tkinter，可在无显示环境的服务器和定时任务中运行
+
+用法:
+    python cli.py URL [URL ...]
+    python cli.py -i urls.txt -j 4 -o videos
+    cat urls.txt | python cli.py -i - --results results.jsonl
+    python cli.py --db /mnt/shared/jobs.db --shared-db --worker --node host-a
+    python cli.py --import-folder videos --import-archive archive.txt
+
+已下载的视频记录在下载归档中（默认 cache/archive.db），再次遇到时直接跳过，不发起网络请求；
+已有的下载目录和 yt-dlp 归档文件可以批量导入
+
+多台主机使用同一个共享目录中的数据库时，每台主机以 --worker 模式运行即成为一个下载节点，
+节点之间通过任务租约自动分配任务，无需手工拆分URL列表
+
+每个任务结束时输出一行JSON结果，最后输出一行吞吐量汇总（JSON Lines）
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from downloader.job_queue import JobQueue, STATE_DONE, STATE_QUEUED, STATE_PAUSED
+from downloader.download_archive import DownloadArchive
+from downloader.scheduler import DownloadScheduler
+from downloader.scheduling_policy import POLICIES
+from utils.url_validator import URLValidator
+
+
+def read_urls(args):
+    """
+    从命令行参数、文件或标准输入读取URL（忽略空行和 # 注释行）
+
+    Args:
+        args: 命令行参数
+
+    Returns:
+        list: URL列表
+    """
+    lines = list(args.urls)
+    if args.input == '-':
+        lines.extend(sys.stdin)
+    elif args.input:
+        with open(args.input, 'r', encoding='utf-8') as f:
+            lines.extend(f)
+
+    validator = URLValidator()
+    urls = []
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        if not validator.is_valid_url(line):
+            print(f"跳过无效的URL: {line}", file=sys.stderr)
+            continue
+        urls.append(validator.normalize_url(line))
+    return urls
+
+
+def parse_args(argv=None):
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description='视频下载器 - 命令行批量下载')
+    parser.add_argument('urls', nargs='*', help='视频URL')
+    parser.add_argument('-i', '--input', help='URL列表文件（每行一个），- 表示从标准输入读取')
+    parser.add_argument('-o', '--output', default='videos', help='保存路径（默认: videos）')
+    parser.add_argument('-q', '--quality', default='best',
+                        choices=['best', 'best-mp4', 'economy', 'best-audio', 'worst'], help='视频质量')
+    parser.add_argument('-j', '--jobs', type=int, default=3, help='同时下载的任务数（默认: 3）')
+    parser.add_argument('--per-host', type=int, default=2, help='同一网站同时下载的任务数（默认: 2）')
+    parser.add_argument('--connections', type=int, default=16, help='所有任务共享的分片连接数（默认: 16）')
+    parser.add_argument('--policy', choices=sorted(POLICIES), help='调度策略（默认沿用队列上次的设置）')
+    parser.add_argument('--processes', action='store_true', help='在工作进程中执行任务（利用多核CPU）')
+    parser.add_argument('--retries', type=int, default=3, help='每个任务的最大尝试次数（默认: 3）')
+    parser.add_argument('--cookie', help='Cookie字符串')
+    parser.add_argument('--proxy', help='代理地址，如 http://127.0.0.1:7890')
+    parser.add_argument('--db', default=os.path.join('cache', 'jobs.db'),
+                        help='任务队列数据库（默认: cache/jobs.db），:memory: 表示不持久化')
+    parser.add_argument('--queue', default='cli', help='队列名称（默认: cli）')
+    parser.add_argument('--results', help='结果输出文件（JSON Lines），默认输出到标准输出')
+    parser.add_argument('--worker', action='store_true', help='节点模式：队列空闲时继续等待新任务，不退出')
+    parser.add_argument('--node', help='节点标识（默认为 主机名:进程ID:随机后缀），同一时刻只能有一个进程使用同一标识')
+    parser.add_argument('--lease', type=int, default=60, help='任务租约时长（秒），节点失联超过该时间后任务被收回（默认: 60）')
+    parser.add_argument('--shared-db', action='store_true', help='数据库位于多台主机共享的目录（网络文件系统）')
+    parser.add_argument('--archive', default=os.path.join('cache', 'archive.db'),
+                        help='下载归档数据库（默认: cache/archive.db），已下载的视频直接跳过')
+    parser.add_argument('--no-archive', action='store_true', help='不使用下载归档（重新下载已下载过的视频）')
+    parser.add_argument('--import-folder', action='append', default=[], metavar='DIR',
+                        help='把已有输出文件夹中的视频导入下载归档（可多次指定）')
+    parser.add_argument('--import-archive', action='append', default=[], metavar='FILE',
+                        help='导入 yt-dlp 的归档文件（--download-archive，可多次指定）')
+    return parser.parse_args(argv)
+
+
+class BatchRunner:
+    """批量下载执行器：收集每个任务的结果并统计吞吐量"""
+
+    def __init__(self, scheduler, output):
+        """
+        初始化执行器
+
+        Args:
+            scheduler: DownloadScheduler 实例
+            output: 结果输出流
+        """
+        self.scheduler = scheduler
+        self.output = output
+        self.lock = threading.Lock()
+        self.started = {}
+        self.results = []
+        self.total_bytes = 0
+
+        scheduler.job_started_callback = self.job_started
+        scheduler.job_finished_callback = self.job_finished
+
+    def job_started(self, job):
+        """任务开始回调"""
+        with self.lock:
+            self.started[job['id']] = time.time()
+
+    def job_finished(self, job, result, state):
+        """任务结束回调：重新排队和暂停的任务不输出结果"""
+        if state in (STATE_QUEUED, STATE_PAUSED):
+            return
+
+        elapsed = time.time() - self.started.get(job['id'], time.time())
+        filename = result.get('filename')
+        skipped = bool(result.get('skipped'))
+        # 跳过的视频没有传输数据，不计入吞吐量
+        size = os.path.getsize(filename) if filename and os.path.isfile(filename) and not skipped else 0
+        record = {
+            'id': job['id'],
+            'url': job['url'],
+            'state': state or 'cancelled',
+            'success': state == STATE_DONE,
+            'skipped': skipped,
+            'title': result.get('title'),
+            'filename': filename,
+            'bytes': size,
+            'elapsed': round(elapsed, 3),
+            'speed': round(size / elapsed) if elapsed > 0 else 0,
+            'attempts': job['attempts'],
+            'error': None if state == STATE_DONE else result.get('error'),
+        }
+
+        with self.lock:
+            self.results.append(record)
+            self.total_bytes += size
+            self.output.write(json.dumps(record, ensure_ascii=False) + '\n')
+            self.output.flush()
+
+    def summary(self, elapsed):
+        """
+        生成吞吐量汇总
+
+        Args:
+            elapsed: 批量任务总耗时（秒）
+
+        Returns:
+            dict: 汇总信息
+        """
+        succeeded = sum(1 for record in self.results if record['success'])
+        return {
+            'summary': {
+                'jobs': len(self.results),
+                'succeeded': succeeded,
+                'failed': len(self.results) - succeeded,
+                'skipped': sum(1 for record in self.results if record['skipped']),
+                'bytes': self.total_bytes,
+                'elapsed': round(elapsed, 3),
+                'throughput': round(self.total_bytes / elapsed) if elapsed > 0 else 0,
+                'jobs_per_minute': round(len(self.results) / elapsed * 60, 2) if elapsed > 0 else 0,
+            }
+        }
+
+
+def main(argv=None):
+    """主函数"""
+    args = parse_args(argv)
+    urls = read_urls(args)
+
+    job_queue = JobQueue(args.db, name=args.queue, node_id=args.node, lease_seconds=args.lease,
+                         shared=args.shared_db)
+    if args.policy:
+        job_queue.set_policy(args.policy)
+
+    # 上次被中断的任务重新排队，从已下载部分续传
+    recovered = job_queue.recover()
+    if recovered:
+        print(f"已恢复 {recovered} 个中断的任务", file=sys.stderr)
+
+    archive = None
+    if not args.no_archive:
+        archive = DownloadArchive(args.archive)
+        for folder in args.import_folder:
+            print(f"已从 {folder} 导入 {archive.import_folder(folder)} 条下载记录", file=sys.stderr)
+        for path in args.import_archive:
+            print(f"已从 {path} 导入 {archive.import_ytdlp_archive(path)} 条下载记录", file=sys.stderr)
+
+    if not urls and not args.worker and not job_queue.counts().get(STATE_QUEUED):
+        if args.import_folder or args.import_archive:
+            return 0
+        print("没有需要下载的URL", file=sys.stderr)
+        return 1
+
+    os.makedirs(args.output, exist_ok=True)
+    options = {'quality': args.quality, 'cookie': args.cookie}
+    for url in urls:
+        job_queue.add(url, options, args.output, max_attempts=args.retries)
+
+    scheduler = DownloadScheduler(job_queue, max_workers=args.jobs, per_host_limit=args.per_host,
+                                  max_connections=args.connections, use_processes=args.processes)
+    if args.proxy:
+        scheduler.set_proxy(args.proxy)
+    scheduler.set_archive(archive)
+
+    output = open(args.results, 'a', encoding='utf-8') if args.results else sys.stdout
+    try:
+        runner = BatchRunner(scheduler, output)
+        start = time.time()
+        scheduler.start(exit_when_idle=not args.worker)
+        try:
+            scheduler.join()
+        except KeyboardInterrupt:
+            # 交还运行中的任务：立即重新排队，下次启动时从已下载部分续传
+            scheduler.stop()
+            released = job_queue.release_leases()
+            print(f"已中断，{released} 个运行中的任务已重新排队，下次运行时将继续未完成的任务", file=sys.stderr)
+            return 130
+
+        summary = runner.summary(time.time() - start)
+        output.write(json.dumps(summary, ensure_ascii=False) + '\n')
+        output.flush()
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    return 0 if summary['summary']['failed'] == 0 else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
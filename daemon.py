@@ -0,0 +1,69 @@
+"""视频下载器 - 本地HTTP控制守护进程入口
+
+通过HTTP接口远程提交和监控下载任务，不依赖 tkinter
+
+用法:
+    python daemon.py --port 8765 -j 4
+    curl -X POST localhost:8765/jobs -d '{"url": "https://..."}'
+    curl -N localhost:8765/events
+"""
+
+import argparse
+import os
+from downloader.job_queue import JobQueue
+from downloader.scheduler import DownloadScheduler
+from downloader.scheduling_policy import POLICIES
+from downloader.http_daemon import run_daemon
+from downloader.download_archive import DownloadArchive
+
+
+def parse_args(argv=None):
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description='视频下载器 - 本地HTTP控制守护进程')
+    parser.add_argument('--host', default='127.0.0.1', help='监听地址（默认: 127.0.0.1）')
+    parser.add_argument('--port', type=int, default=8765, help='监听端口（默认: 8765）')
+    parser.add_argument('--token', default=os.environ.get('VIDEO_DOWNLOADER_TOKEN'),
+                        help='访问令牌（默认读取环境变量 VIDEO_DOWNLOADER_TOKEN）')
+    parser.add_argument('-j', '--jobs', type=int, default=3, help='同时下载的任务数（默认: 3）')
+    parser.add_argument('--per-host', type=int, default=2, help='同一网站同时下载的任务数（默认: 2）')
+    parser.add_argument('--connections', type=int, default=16, help='所有任务共享的分片连接数（默认: 16）')
+    parser.add_argument('--policy', choices=sorted(POLICIES), help='调度策略（默认沿用队列上次的设置）')
+    parser.add_argument('--processes', action='store_true', help='在工作进程中执行任务（利用多核CPU）')
+    parser.add_argument('--proxy', help='代理地址，如 http://127.0.0.1:7890')
+    parser.add_argument('--db', default=os.path.join('cache', 'jobs.db'), help='任务队列数据库（默认: cache/jobs.db）')
+    parser.add_argument('--queue', default='daemon', help='队列名称（默认: daemon）')
+    parser.add_argument('--node', help='节点标识（默认为 主机名:进程ID:随机后缀），同一时刻只能有一个进程使用同一标识')
+    parser.add_argument('--lease', type=int, default=60, help='任务租约时长（秒），节点失联超过该时间后任务被收回（默认: 60）')
+    parser.add_argument('--shared-db', action='store_true', help='数据库位于多台主机共享的目录（网络文件系统）')
+    parser.add_argument('--archive', default=os.path.join('cache', 'archive.db'),
+                        help='下载归档数据库（默认: cache/archive.db），已下载的视频直接跳过')
+    parser.add_argument('--no-archive', action='store_true', help='不使用下载归档')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """主函数"""
+    args = parse_args(argv)
+
+    job_queue = JobQueue(args.db, name=args.queue, node_id=args.node, lease_seconds=args.lease,
+                         shared=args.shared_db)
+    if args.policy:
+        job_queue.set_policy(args.policy)
+    job_queue.recover()
+
+    scheduler = DownloadScheduler(job_queue, max_workers=args.jobs, per_host_limit=args.per_host,
+                                  max_connections=args.connections, use_processes=args.processes)
+    if args.proxy:
+        scheduler.set_proxy(args.proxy)
+    if not args.no_archive:
+        scheduler.set_archive(DownloadArchive(args.archive))
+
+    if args.host not in ('127.0.0.1', 'localhost', '::1') and not args.token:
+        print("警告: 监听非本机地址但未设置访问令牌，任何人都可以提交任务")
+
+    print(f"下载守护进程: http://{args.host}:{args.port}")
+    run_daemon(scheduler, args.host, args.port, args.token)
+
+
+if __name__ == '__main__':
+    main()
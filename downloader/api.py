@@ -0,0 +1,378 @@
+"""可嵌入的Python下载接口
+
+在自己的程序中使用下载器，无需处理松散的结果字典和字符串格式的进度回调：
+
+    from downloader.api import DownloaderClient
+
+    client = DownloaderClient(max_workers=4)
+
+    # concurrent.futures 方式
+    info = client.resolve('https://...').result()
+    task = client.download('https://...', output_path='videos')
+    result = task.result()
+
+    # asyncio 方式
+    info = await client.resolve_async('https://...')
+    task = client.download('https://...', output_path='videos')
+    async for update in task.progress():
+        print(update.percentage)
+    result = await task
+
+所有解析和下载都在一个共享的有界线程池中执行（不会为每个任务创建线程），
+每个任务使用独立的 VideoDownloader 实例；取消是协作式的，
+下载在最近的取消检查点停止（关闭连接，保留可续传的部分文件）并以 DownloadCancelled 结束
+"""
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor, CancelledError
+from dataclasses import dataclass, field
+from typing import List, Optional
+from .cancellation import CancelToken, DownloadCancelled
+from .progress_handler import ProgressEvent
+from utils.logger import get_logger
+
+
+@dataclass
+class VideoFormat:
+    """可用格式"""
+
+    format_id: Optional[str]
+    ext: str
+    resolution: str
+    height: Optional[int] = None
+    vcodec: Optional[str] = None
+    acodec: Optional[str] = None
+    filesize: Optional[int] = None
+    estimated_size: Optional[int] = None
+
+    @classmethod
+    def from_dict(cls, fmt):
+        return cls(
+            format_id=fmt.get('format_id'),
+            ext=fmt.get('ext', 'mp4'),
+            resolution=fmt.get('resolution', 'unknown'),
+            height=fmt.get('height'),
+            vcodec=fmt.get('vcodec'),
+            acodec=fmt.get('acodec'),
+            filesize=fmt.get('filesize') or None,
+            estimated_size=fmt.get('estimated_size') or None,
+        )
+
+
+@dataclass
+class VideoInfo:
+    """解析结果"""
+
+    url: str
+    title: str
+    duration: float = 0
+    uploader: Optional[str] = None
+    is_playlist: bool = False
+    is_m3u8: bool = False
+    playlist_count: int = 0
+    formats: List[VideoFormat] = field(default_factory=list)
+    # get_video_info 返回的原始字典（下载时复用，避免重复解析）
+    raw: dict = field(default_factory=dict, repr=False)
+
+    @classmethod
+    def from_dict(cls, url, info):
+        return cls(
+            url=url,
+            title=info.get('title', ''),
+            duration=info.get('duration') or 0,
+            uploader=info.get('uploader'),
+            is_playlist=bool(info.get('is_playlist')),
+            is_m3u8=bool(info.get('is_m3u8')),
+            playlist_count=info.get('playlist_count') or 0,
+            formats=[VideoFormat.from_dict(fmt) for fmt in info.get('formats', [])],
+            raw=info,
+        )
+
+
+@dataclass
+class DownloadResult:
+    """下载结果"""
+
+    url: str
+    success: bool
+    filename: Optional[str] = None
+    title: Optional[str] = None
+    error: Optional[str] = None
+    # 播放列表下载的条目统计
+    is_playlist: bool = False
+    downloaded: int = 0
+    total: int = 0
+    raw: dict = field(default_factory=dict, repr=False)
+
+    @classmethod
+    def from_dict(cls, url, result):
+        return cls(
+            url=url,
+            success=bool(result.get('success')),
+            filename=result.get('filename'),
+            title=result.get('title'),
+            error=result.get('error'),
+            is_playlist=bool(result.get('is_playlist')),
+            downloaded=result.get('downloaded', 0),
+            total=result.get('total', 0),
+            raw=result,
+        )
+
+
+# 进度更新：原始数值（字节、字节/秒、秒），显示文本用 speed_text()/eta_text()/size_text() 获取
+ProgressUpdate = ProgressEvent
+
+
+class DownloadTask:
+    """
+    下载任务句柄
+
+    既可以像 concurrent.futures.Future 一样使用（result/done/add_done_callback），
+    也可以在协程中直接 await；progress() 返回进度的异步迭代器
+    """
+
+    def __init__(self, url):
+        self.url = url
+        self.future = None
+        self.latest = None
+        # 与任务的下载器共用的取消令牌
+        self.token = CancelToken()
+        self._listeners = []
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self):
+        """是否已请求取消"""
+        return self.token.is_cancelled
+
+    def cancel(self):
+        """
+        请求取消下载（协作式：尚未开始的任务直接取消，运行中的任务在最近的取消检查点停止）
+        """
+        self.token.cancel()
+        if self.future is not None:
+            self.future.cancel()
+
+    def done(self):
+        return self.future.done()
+
+    def result(self, timeout=None):
+        """
+        等待并返回下载结果
+
+        Args:
+            timeout: 超时时间（秒）
+
+        Returns:
+            DownloadResult: 下载结果
+
+        Raises:
+            DownloadCancelled: 任务被取消
+        """
+        try:
+            return self.future.result(timeout)
+        except CancelledError:
+            raise DownloadCancelled(f"下载已取消: {self.url}")
+
+    def add_done_callback(self, callback):
+        """添加完成回调，回调参数为本任务"""
+        self.future.add_done_callback(lambda _: callback(self))
+
+    def add_progress_listener(self, listener):
+        """
+        添加进度监听函数（在下载线程中调用，参数为 ProgressUpdate）
+
+        Args:
+            listener: 监听函数
+        """
+        with self._lock:
+            self._listeners.append(listener)
+
+    def remove_progress_listener(self, listener):
+        """移除进度监听函数"""
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def _on_progress(self, update):
+        """下载器进度回调（在下载线程中调用）"""
+        self.latest = update
+        with self._lock:
+            listeners = list(self._listeners)
+        for listener in listeners:
+            listener(update)
+
+    def __await__(self):
+        return self._wait_async().__await__()
+
+    async def _wait_async(self):
+        try:
+            return await asyncio.wrap_future(self.future)
+        except asyncio.CancelledError:
+            if self.cancelled:
+                # 任务本身被取消
+                raise DownloadCancelled(f"下载已取消: {self.url}")
+            # 等待方被取消时同时取消下载
+            self.cancel()
+            raise
+
+    async def progress(self):
+        """
+        进度的异步迭代器，任务结束时停止
+
+        只保留最新的进度：消费速度跟不上时会跳过中间的进度，不会积压
+
+        Yields:
+            ProgressUpdate: 进度更新
+        """
+        loop = asyncio.get_running_loop()
+        changed = asyncio.Event()
+        state = {'update': None}
+
+        def deliver(update):
+            state['update'] = update
+            changed.set()
+
+        def listener(update):
+            loop.call_soon_threadsafe(deliver, update)
+
+        self.add_progress_listener(listener)
+        self.future.add_done_callback(lambda _: loop.call_soon_threadsafe(changed.set))
+        try:
+            while True:
+                await changed.wait()
+                changed.clear()
+                update, state['update'] = state['update'], None
+                if update is not None:
+                    yield update
+                if self.future.done() and state['update'] is None:
+                    return
+        finally:
+            self.remove_progress_listener(listener)
+
+
+class DownloaderClient:
+    """下载器客户端"""
+
+    def __init__(self, max_workers=4, proxy=None, executor=None):
+        """
+        初始化客户端
+
+        Args:
+            max_workers: 共享线程池大小（同时进行的解析/下载数）
+            proxy: 代理地址
+            executor: 可选的外部线程池（传入时 max_workers 无效，close 不会关闭它）
+        """
+        self.logger = get_logger()
+        self.proxy = proxy
+        self._own_executor = executor is None
+        self.executor = executor or ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='downloader-api')
+
+    def _create_downloader(self):
+        """为每个任务创建独立的下载器实例"""
+        from .video_downloader import VideoDownloader
+
+        downloader = VideoDownloader()
+        if self.proxy:
+            downloader.set_proxy(self.proxy)
+        return downloader
+
+    # ===== 解析 =====
+
+    def _resolve(self, url, cookie):
+        info = self._create_downloader().get_video_info(url, cookie=cookie)
+        return VideoInfo.from_dict(url, info)
+
+    def resolve(self, url, cookie=None):
+        """
+        解析视频信息
+
+        Args:
+            url: 视频URL
+            cookie: 可选的Cookie字符串
+
+        Returns:
+            concurrent.futures.Future: 结果为 VideoInfo
+        """
+        return self.executor.submit(self._resolve, url, cookie)
+
+    async def resolve_async(self, url, cookie=None):
+        """
+        解析视频信息（协程）
+
+        Args:
+            url: 视频URL
+            cookie: 可选的Cookie字符串
+
+        Returns:
+            VideoInfo: 解析结果
+        """
+        return await asyncio.wrap_future(self.resolve(url, cookie))
+
+    # ===== 下载 =====
+
+    def _download(self, task, output_path, quality, cookie, video_info):
+        if task.cancelled:
+            raise DownloadCancelled(f"下载已取消: {task.url}")
+
+        downloader = self._create_downloader()
+        downloader.cancel_token = task.token
+        downloader.set_progress_callback(task._on_progress)
+        raw_info = video_info.raw if isinstance(video_info, VideoInfo) else video_info
+        result = downloader.download_video(task.url, output_path, quality, raw_info, cookie=cookie)
+
+        if result.get('cancelled') or task.cancelled:
+            raise DownloadCancelled(f"下载已取消: {task.url}")
+        return DownloadResult.from_dict(task.url, result)
+
+    def download(self, url, output_path='.', quality='best', cookie=None, video_info=None):
+        """
+        提交下载任务
+
+        Args:
+            url: 视频URL
+            output_path: 保存路径
+            quality: 视频质量
+            cookie: 可选的Cookie字符串
+            video_info: 可选的解析结果（VideoInfo 或原始字典），提供时跳过重复解析
+
+        Returns:
+            DownloadTask: 任务句柄
+        """
+        task = DownloadTask(url)
+        task.future = self.executor.submit(self._download, task, output_path, quality, cookie, video_info)
+        return task
+
+    async def download_async(self, url, output_path='.', quality='best', cookie=None, video_info=None):
+        """
+        下载视频（协程），协程被取消时下载也会被取消
+
+        Args:
+            url: 视频URL
+            output_path: 保存路径
+            quality: 视频质量
+            cookie: 可选的Cookie字符串
+            video_info: 可选的解析结果
+
+        Returns:
+            DownloadResult: 下载结果
+        """
+        return await self.download(url, output_path, quality, cookie, video_info)
+
+    def close(self, wait=True):
+        """
+        关闭客户端（只关闭自己创建的线程池）
+
+        Args:
+            wait: 是否等待进行中的任务结束
+        """
+        if self._own_executor:
+            self.executor.shutdown(wait=wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
@@ -0,0 +1,87 @@
+"""下载取消模块
+
+协作式取消：每个下载器持有一个 CancelToken，各下载路径在检查点
+（yt-dlp 进度钩子、直接MP4的分块循环、M3U8的片段循环和重试等待）检查令牌，
+取消时抛出 DownloadCancelled；取消时还会执行登记的回调（如关闭正在读取的连接），
+让阻塞在网络读取上的线程立即返回，而不是等到超时
+"""
+
+import threading
+from utils.logger import get_logger
+
+
+class DownloadCancelled(Exception):
+    """下载被取消"""
+
+
+class CancelToken:
+    """取消令牌（线程安全）"""
+
+    def __init__(self):
+        self.logger = get_logger()
+        self._event = threading.Event()
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    @property
+    def is_cancelled(self):
+        """是否已请求取消"""
+        return self._event.is_set()
+
+    def cancel(self):
+        """请求取消，并执行所有已登记的回调"""
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                self.logger.debug(f"取消回调执行失败: {str(e)}")
+
+    def raise_if_cancelled(self):
+        """
+        检查点：已请求取消时抛出异常
+
+        Raises:
+            DownloadCancelled: 已请求取消
+        """
+        if self._event.is_set():
+            raise DownloadCancelled("下载已取消")
+
+    def wait(self, timeout):
+        """
+        可被取消的等待
+
+        Args:
+            timeout: 等待时间（秒）
+
+        Returns:
+            bool: 等待期间是否被取消
+        """
+        return self._event.wait(timeout)
+
+    def on_cancel(self, callback):
+        """
+        登记取消时执行的回调（已取消时立即执行）
+
+        Args:
+            callback: 无参数的回调函数
+
+        Returns:
+            callable: 注销函数，资源释放后调用，避免回调作用于已关闭的资源
+        """
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+
+                def unregister():
+                    with self._lock:
+                        if callback in self._callbacks:
+                            self._callbacks.remove(callback)
+                return unregister
+
+        callback()
+        return lambda: None
@@ -0,0 +1,358 @@
+"""下载归档模块
+
+记录已经下载过的视频（按 提取器 + 视频ID 索引，附带文件路径、大小和内容校验和），
+批量下载和播放列表下载在发起任何网络请求之前查询归档，跳过已下载的视频：
+- 归档键在启动时全部载入内存集合，成员判断是 O(1) 的
+- 单个URL在不联网的情况下通过 yt-dlp 提取器的URL规则得到视频ID（与 yt-dlp --download-archive 相同）
+- 支持从已有的输出文件夹和 yt-dlp 归档文件批量导入
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from utils.logger import get_logger
+
+
+# 批量导入的普通媒体文件使用的提取器名称（视频ID为文件名，不含扩展名）
+FILE_EXTRACTOR = 'file'
+
+# M3U8下载器下载的视频使用的提取器名称
+M3U8_EXTRACTOR = 'm3u8'
+
+# 批量导入时识别的媒体文件扩展名
+MEDIA_EXTENSIONS = ('.mp4', '.mkv', '.webm', '.m4a', '.mp3', '.flv', '.ts', '.mov', '.avi')
+
+# 计算校验和时每次读取的字节数
+_CHECKSUM_CHUNK_SIZE = 1024 * 1024
+
+
+def archive_key(extractor, video_id):
+    """
+    计算归档键（与 yt-dlp 归档文件的行格式相同: "提取器 视频ID"）
+
+    Args:
+        extractor: 提取器名称（如 Youtube、BiliBili）
+        video_id: 视频ID
+
+    Returns:
+        str: 归档键
+    """
+    return f"{extractor.lower()} {video_id}"
+
+
+def file_checksum(path):
+    """
+    计算文件内容的 SHA-256 校验和
+
+    Args:
+        path: 文件路径
+
+    Returns:
+        str: 十六进制校验和，文件不存在返回None
+    """
+    if not path or not os.path.isfile(path):
+        return None
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_CHECKSUM_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+_extractors = None
+_extractors_lock = threading.Lock()
+
+
+def extractor_id_for_url(url):
+    """
+    不联网地根据URL规则确定提取器和视频ID
+
+    Args:
+        url: 视频URL
+
+    Returns:
+        tuple: (提取器名称, 视频ID)，没有专用提取器匹配时返回None
+    """
+    global _extractors
+    with _extractors_lock:
+        if _extractors is None:
+            from yt_dlp.extractor import gen_extractor_classes
+            # 通用提取器匹配所有URL，无法从URL得到视频ID
+            _extractors = [ie for ie in gen_extractor_classes() if ie.ie_key() != 'Generic']
+
+    for ie in _extractors:
+        try:
+            if not ie.suitable(url):
+                continue
+            video_id = ie.get_temp_id(url)
+        except Exception:
+            continue
+        if video_id:
+            return ie.ie_key(), video_id
+        return None
+    return None
+
+
+class DownloadArchive:
+    """下载归档索引"""
+
+    def __init__(self, path=os.path.join('cache', 'archive.db'), checksum=True):
+        """
+        初始化下载归档
+
+        Args:
+            path: SQLite 数据库文件路径，':memory:' 表示只保存在内存中
+            checksum: 记录下载时是否计算文件内容校验和
+        """
+        self.logger = get_logger()
+        self.path = path
+        self.checksum = checksum
+        self.lock = threading.Lock()
+
+        if path != ':memory:':
+            directory = os.path.dirname(path)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory)
+
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        if path != ':memory:':
+            self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS archive (key TEXT PRIMARY KEY, extractor TEXT NOT NULL, '
+            'video_id TEXT NOT NULL, url TEXT, filename TEXT, size INTEGER, checksum TEXT, added_at REAL NOT NULL)'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS idx_archive_checksum ON archive (checksum)')
+        self._conn.commit()
+
+        # 内存中的归档键集合：成员判断不访问数据库
+        self.keys = {row['key'] for row in self._conn.execute('SELECT key FROM archive')}
+        self.logger.info(f"已加载下载归档: {len(self.keys)} 条记录 ({path})")
+
+    def __len__(self):
+        return len(self.keys)
+
+    def contains(self, extractor, video_id):
+        """
+        视频是否已下载过
+
+        Args:
+            extractor: 提取器名称
+            video_id: 视频ID
+
+        Returns:
+            bool: 是否在归档中
+        """
+        if not extractor or not video_id:
+            return False
+        return archive_key(extractor, video_id) in self.keys
+
+    def contains_file(self, name):
+        """
+        是否已有同名的媒体文件（批量导入的文件夹中的文件，按不含扩展名的文件名判断）
+
+        Args:
+            name: 文件名（不含扩展名）
+
+        Returns:
+            bool: 是否在归档中
+        """
+        return self.contains(FILE_EXTRACTOR, name)
+
+    def contains_url(self, url):
+        """
+        不联网地判断URL对应的视频是否已下载过
+
+        Args:
+            url: 视频URL
+
+        Returns:
+            bool: 是否在归档中
+        """
+        match = extractor_id_for_url(url)
+        return bool(match) and self.contains(*match)
+
+    def get(self, extractor, video_id):
+        """
+        获取归档记录
+
+        Returns:
+            dict: 归档记录，不存在返回None
+        """
+        with self.lock:
+            row = self._conn.execute(
+                'SELECT * FROM archive WHERE key = ?', (archive_key(extractor, video_id),)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def find_checksum(self, checksum):
+        """
+        按内容校验和查找归档记录（同一内容的镜像/重新上传）
+
+        Args:
+            checksum: SHA-256 校验和
+
+        Returns:
+            dict: 归档记录，不存在返回None
+        """
+        with self.lock:
+            row = self._conn.execute('SELECT * FROM archive WHERE checksum = ?', (checksum,)).fetchone()
+        return dict(row) if row else None
+
+    def record(self, extractor, video_id, filename=None, url=None, checksum=None):
+        """
+        记录已下载的视频（已存在的记录会被更新）
+
+        Args:
+            extractor: 提取器名称
+            video_id: 视频ID
+            filename: 下载得到的文件路径
+            url: 视频URL
+            checksum: 内容校验和，None且开启校验和时根据文件计算
+        """
+        if not extractor or not video_id:
+            return
+        size = os.path.getsize(filename) if filename and os.path.isfile(filename) else None
+        if checksum is None and self.checksum and size:
+            checksum = file_checksum(filename)
+
+        self._insert([(archive_key(extractor, video_id), extractor, video_id, url, filename, size, checksum)])
+        self.logger.info(f"已记录到下载归档: {extractor} {video_id}")
+
+    def _insert(self, rows):
+        """批量写入归档记录"""
+        now = time.time()
+        with self.lock:
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO archive (key, extractor, video_id, url, filename, size, checksum, added_at) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                [row + (now,) for row in rows]
+            )
+            self._conn.commit()
+            self.keys.update(row[0] for row in rows)
+
+    def remove(self, extractor, video_id):
+        """
+        删除归档记录（需要重新下载该视频时使用）
+
+        Returns:
+            bool: 是否删除了记录
+        """
+        key = archive_key(extractor, video_id)
+        with self.lock:
+            cursor = self._conn.execute('DELETE FROM archive WHERE key = ?', (key,))
+            self._conn.commit()
+            self.keys.discard(key)
+        return cursor.rowcount > 0
+
+    def import_ytdlp_archive(self, path):
+        """
+        导入 yt-dlp 的归档文件（--download-archive，每行 "提取器 视频ID"）
+
+        Args:
+            path: 归档文件路径
+
+        Returns:
+            int: 新导入的记录数
+        """
+        rows = []
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                extractor, _, video_id = line.strip().partition(' ')
+                if extractor and video_id and archive_key(extractor, video_id) not in self.keys:
+                    rows.append((archive_key(extractor, video_id), extractor, video_id, None, None, None, None))
+        if rows:
+            self._insert(rows)
+        self.logger.info(f"已从 yt-dlp 归档文件导入 {len(rows)} 条记录: {path}")
+        return len(rows)
+
+    def import_folder(self, folder, checksum=False):
+        """
+        从已有的输出文件夹批量导入
+
+        yt-dlp 的 .info.json 元数据文件按其中的提取器和视频ID导入；
+        其余媒体文件按文件名导入（M3U8下载的文件名即视频ID，yt-dlp 下载的文件名即标题）
+
+        Args:
+            folder: 输出文件夹（递归扫描）
+            checksum: 是否计算每个文件的校验和（文件很多时较慢）
+
+        Returns:
+            int: 新导入的记录数
+        """
+        rows = []
+        known_files = set()
+        for directory, _, files in os.walk(folder):
+            for name in sorted(files):
+                path = os.path.join(directory, name)
+                if name.endswith('.info.json'):
+                    try:
+                        with open(path, 'r', encoding='utf-8') as f:
+                            info = json.load(f)
+                    except (OSError, ValueError) as e:
+                        self.logger.warning(f"读取元数据文件失败: {path} ({str(e)})")
+                        continue
+                    extractor = info.get('extractor_key') or info.get('extractor')
+                    video_id = info.get('id')
+                    if not extractor or not video_id:
+                        continue
+                    media = self._find_media(directory, name[:-len('.info.json')])
+                    if media:
+                        known_files.add(media)
+                    rows.append(self._import_row(extractor, video_id, media, info.get('webpage_url'), checksum))
+
+        for directory, _, files in os.walk(folder):
+            for name in sorted(files):
+                path = os.path.join(directory, name)
+                stem, ext = os.path.splitext(name)
+                if ext.lower() not in MEDIA_EXTENSIONS or path in known_files:
+                    continue
+                rows.append(self._import_row(FILE_EXTRACTOR, stem, path, None, checksum))
+
+        rows = [row for row in rows if row[0] not in self.keys]
+        if rows:
+            self._insert(rows)
+        self.logger.info(f"已从文件夹导入 {len(rows)} 条下载记录: {folder}")
+        return len(rows)
+
+    def _find_media(self, directory, base):
+        """查找与元数据文件同名的媒体文件"""
+        for ext in MEDIA_EXTENSIONS:
+            path = os.path.join(directory, base + ext)
+            if os.path.isfile(path):
+                return path
+        return None
+
+    def _import_row(self, extractor, video_id, filename, url, checksum):
+        """构造一条导入记录"""
+        size = os.path.getsize(filename) if filename else None
+        digest = file_checksum(filename) if checksum and filename else None
+        return (archive_key(extractor, video_id), extractor, video_id, url, filename, size, digest)
+
+    def close(self):
+        """关闭数据库连接"""
+        with self.lock:
+            self._conn.close()
+
+
+_global_archives = {}
+_global_archives_lock = threading.Lock()
+
+
+def get_archive(path=os.path.join('cache', 'archive.db')):
+    """
+    获取指定路径的共享归档实例（同一进程内同一路径只加载一次）
+
+    Args:
+        path: 归档数据库路径
+
+    Returns:
+        DownloadArchive: 归档实例
+    """
+    with _global_archives_lock:
+        if path not in _global_archives:
+            _global_archives[path] = DownloadArchive(path)
+        return _global_archives[path]
@@ -0,0 +1,253 @@
+"""解析策略路由模块
+
+按 域名 + URL形态 记录每种解析策略的成功/失败次数，
+下次遇到同类URL时优先尝试上次成功的策略，未命中时仍走完整的策略链；
+多个进程（多进程模式的工作进程、同时运行的下载进程）可以共享同一个路由表文件，
+每个进程定期把自己新增的计数合并到文件中
+"""
+
+import atexit
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from urllib.parse import urlparse, parse_qs
+from utils.logger import get_logger
+
+
+# 解析策略名称
+STRATEGY_YTDLP = 'ytdlp'
+STRATEGY_DIRECT_MP4 = 'direct_mp4'
+STRATEGY_VIEWKEY = 'viewkey'
+STRATEGY_NUMERIC_ID = 'numeric_id'
+STRATEGY_PAGE_ID = 'page_id'
+STRATEGY_M3U8_DIRECT = 'm3u8_direct'
+
+# 由M3U8下载器执行的策略
+M3U8_STRATEGIES = (
+    STRATEGY_DIRECT_MP4,
+    STRATEGY_VIEWKEY,
+    STRATEGY_NUMERIC_ID,
+    STRATEGY_PAGE_ID,
+    STRATEGY_M3U8_DIRECT,
+)
+
+# 两次写入路由表文件的最小间隔（秒）
+SAVE_INTERVAL = 5
+
+
+class ExtractionRouter:
+    """解析策略路由表"""
+
+    def __init__(self, path=os.path.join('cache', 'extraction_routes.json')):
+        """
+        初始化路由表
+
+        Args:
+            path: 路由表持久化文件路径，None表示只保存在内存中
+        """
+        self.logger = get_logger()
+        self.path = path
+        self.lock = threading.Lock()
+        # 尚未写入文件的计数（路由键 -> 策略 -> 增量）
+        self._pending = {}
+        self._last_save = time.monotonic()
+        self.routes = self._load()
+        if path:
+            # 进程退出时写入剩余的计数
+            atexit.register(self.flush)
+
+    def _read_file(self):
+        """读取路由表文件，文件不存在或内容损坏时返回空表"""
+        if not self.path or not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except ValueError as e:
+            self.logger.warning(f"路由表文件内容损坏，将重新学习: {str(e)}")
+            return {}
+
+    def _load(self):
+        """从文件加载路由表"""
+        try:
+            routes = self._read_file()
+        except OSError as e:
+            self.logger.warning(f"加载解析路由表失败，将重新学习: {str(e)}")
+            return {}
+        if routes:
+            self.logger.info(f"已加载解析路由表: {len(routes)} 条记录")
+        return routes
+
+    def _save(self):
+        """
+        将未保存的计数合并到路由表文件（调用方需持有锁）
+
+        写入前重新读取文件，只叠加本进程新增的计数，其他进程写入的记录不会被覆盖；
+        每次写入使用唯一的临时文件再原子替换
+        """
+        self._last_save = time.monotonic()
+        if not self.path or not self._pending:
+            return
+        temp_path = None
+        try:
+            routes = self._read_file()
+            for key, pending in self._pending.items():
+                stats = routes.setdefault(key, {})
+                for strategy, delta in pending.items():
+                    record = stats.setdefault(strategy, {'success': 0, 'failure': 0, 'last_success': 0})
+                    record['success'] += delta['success']
+                    record['failure'] += delta['failure']
+                    record['last_success'] = max(record['last_success'], delta['last_success'])
+
+            directory = os.path.dirname(self.path)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(
+                prefix=f"{os.path.basename(self.path)}.", suffix='.tmp', dir=directory or '.'
+            )
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(routes, f, ensure_ascii=False, indent=2)
+            os.replace(temp_path, self.path)
+            temp_path = None
+        except OSError as e:
+            self.logger.warning(f"保存解析路由表失败: {str(e)}")
+            return
+        finally:
+            if temp_path and os.path.exists(temp_path):
+                os.unlink(temp_path)
+
+        # 文件中的记录包含其他进程学到的结果
+        self.routes = routes
+        self._pending = {}
+
+    def flush(self):
+        """立即写入尚未保存的计数（任务结束、进程退出时调用）"""
+        with self.lock:
+            self._save()
+
+    def route_key(self, url):
+        """
+        计算URL的路由键（域名 + URL形态）
+
+        路径中的数字和长ID被替换为占位符，查询参数只保留参数名，
+        例如 https://www.91porn.com/view_video.php?viewkey=abc&page=1
+        得到 91porn.com|/view_video.php?page&viewkey
+
+        Args:
+            url: 视频URL
+
+        Returns:
+            str: 路由键
+        """
+        parsed = urlparse(url)
+        domain = parsed.netloc.lower()
+        if domain.startswith('www.'):
+            domain = domain[4:]
+
+        segments = []
+        for segment in parsed.path.split('/'):
+            if re.fullmatch(r'\d+', segment):
+                segment = '{n}'
+            elif len(segment) >= 8 and re.search(r'\d', segment) and re.fullmatch(r'[\w-]+', segment):
+                segment = '{id}'
+            else:
+                segment = re.sub(r'\d{3,}', '{n}', segment)
+            segments.append(segment)
+        shape = '/'.join(segments)
+
+        params = sorted(parse_qs(parsed.query, keep_blank_values=True))
+        if params:
+            shape += '?' + '&'.join(params)
+
+        return f"{domain}|{shape}"
+
+    def preferred_strategy(self, url):
+        """
+        获取URL对应的首选策略
+
+        Args:
+            url: 视频URL
+
+        Returns:
+            str: 成功次数最多且成功多于失败的策略，没有记录返回None
+        """
+        with self.lock:
+            stats = self.routes.get(self.route_key(url))
+            if not stats:
+                return None
+            best = max(stats.items(), key=lambda item: (item[1]['success'], item[1]['last_success']))
+        name, record = best
+        if record['success'] > record['failure']:
+            return name
+        return None
+
+    def order_strategies(self, url, strategies, preferred=None):
+        """
+        将首选策略调整到策略链最前面
+
+        Args:
+            url: 视频URL
+            strategies: 默认顺序的策略名称列表
+            preferred: 可选的首选策略（不传则查询路由表）
+
+        Returns:
+            list: 调整后的策略名称列表
+        """
+        preferred = preferred or self.preferred_strategy(url)
+        if preferred in strategies:
+            return [preferred] + [name for name in strategies if name != preferred]
+        return list(strategies)
+
+    def _record(self, url, strategy, success):
+        """记录一次策略结果"""
+        key = self.route_key(url)
+        with self.lock:
+            for table in (self.routes, self._pending):
+                stats = table.setdefault(key, {})
+                record = stats.setdefault(strategy, {'success': 0, 'failure': 0, 'last_success': 0})
+                if success:
+                    record['success'] += 1
+                    record['last_success'] = int(time.time())
+                else:
+                    record['failure'] += 1
+            # 批量写入：每次记录都重写整个文件的开销随路由表增大而增加
+            if time.monotonic() - self._last_save >= SAVE_INTERVAL:
+                self._save()
+
+    def record_success(self, url, strategy):
+        """
+        记录策略成功
+
+        Args:
+            url: 视频URL
+            strategy: 成功的策略名称
+        """
+        self.logger.info(f"记录解析路由: {self.route_key(url)} -> {strategy}")
+        self._record(url, strategy, True)
+
+    def record_failure(self, url, strategy):
+        """
+        记录策略失败
+
+        Args:
+            url: 视频URL
+            strategy: 失败的策略名称
+        """
+        self._record(url, strategy, False)
+
+
+# 全局路由表实例（多个下载器实例共享学习结果）
+_global_router = None
+_global_router_lock = threading.Lock()
+
+
+def get_router():
+    """获取全局路由表实例"""
+    global _global_router
+    with _global_router_lock:
+        if _global_router is None:
+            _global_router = ExtractionRouter()
+    return _global_router
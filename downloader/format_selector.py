@@ -0,0 +1,276 @@
+"""格式选择模块
+
+根据约束条件（最大分辨率、首选编码、容器、文件大小/码率预算）
+对 yt-dlp 的完整格式列表打分，选出满足画质下限且传输字节最少的格式
+"""
+
+from utils.logger import get_logger
+
+
+# 编码名称归一化（yt-dlp 的 vcodec 字段形如 avc1.640028、vp09.00.40.08、av01.0.08M.08）
+CODEC_FAMILIES = {
+    'av01': 'av1',
+    'av1': 'av1',
+    'vp09': 'vp9',
+    'vp9': 'vp9',
+    'vp8': 'vp8',
+    'hev1': 'h265',
+    'hvc1': 'h265',
+    'h265': 'h265',
+    'hevc': 'h265',
+    'avc1': 'h264',
+    'avc3': 'h264',
+    'h264': 'h264',
+}
+
+# 容器与音频扩展名的兼容关系（用于 视频+音频 合并）
+CONTAINER_AUDIO_EXTS = {
+    'mp4': ('m4a', 'mp4'),
+    'webm': ('webm',),
+}
+
+
+def codec_family(codec):
+    """
+    将编码字符串归一化为编码族名称
+
+    Args:
+        codec: yt-dlp 的 vcodec/acodec 字段或用户输入（如 'av1', 'vp9'）
+
+    Returns:
+        str: 编码族名称，无法识别时返回原始前缀，无编码返回None
+    """
+    if not codec or codec == 'none':
+        return None
+    prefix = codec.lower().split('.', 1)[0]
+    return CODEC_FAMILIES.get(prefix, prefix)
+
+
+class FormatConstraints:
+    """格式选择约束"""
+
+    def __init__(self, max_height=None, min_height=None, preferred_codecs=None,
+                 container=None, max_filesize=None, max_bitrate=None):
+        """
+        初始化格式约束
+
+        Args:
+            max_height: 最大高度（如1080），None表示不限
+            min_height: 画质下限高度，None表示以可用的最高画质为下限
+            preferred_codecs: 首选编码列表（如 ['av1', 'vp9']），按顺序优先
+            container: 容器格式（'mp4' / 'webm'），None表示不限
+            max_filesize: 文件大小预算（字节），None表示不限
+            max_bitrate: 总码率预算（kbps），None表示不限
+        """
+        self.max_height = max_height
+        self.min_height = min_height
+        if isinstance(preferred_codecs, str):
+            preferred_codecs = [preferred_codecs]
+        self.preferred_codecs = [codec_family(c) for c in (preferred_codecs or [])]
+        self.container = container.lower() if container else None
+        self.max_filesize = max_filesize
+        self.max_bitrate = max_bitrate
+
+    @classmethod
+    def from_dict(cls, data):
+        """从字典创建约束（用于从配置或任务选项恢复）"""
+        data = data or {}
+        return cls(
+            max_height=data.get('max_height'),
+            min_height=data.get('min_height'),
+            preferred_codecs=data.get('preferred_codecs'),
+            container=data.get('container'),
+            max_filesize=data.get('max_filesize'),
+            max_bitrate=data.get('max_bitrate'),
+        )
+
+    def to_dict(self):
+        """转换为可序列化的字典"""
+        return {
+            'max_height': self.max_height,
+            'min_height': self.min_height,
+            'preferred_codecs': list(self.preferred_codecs),
+            'container': self.container,
+            'max_filesize': self.max_filesize,
+            'max_bitrate': self.max_bitrate,
+        }
+
+    def __repr__(self):
+        return f"FormatConstraints({self.to_dict()})"
+
+
+class FormatSelector:
+    """格式选择引擎"""
+
+    def __init__(self):
+        self.logger = get_logger()
+
+    def estimate_size(self, fmt, duration):
+        """
+        估算格式的文件大小
+
+        优先使用 filesize / filesize_approx，缺失时用码率乘以时长估算
+
+        Args:
+            fmt: yt-dlp格式字典
+            duration: 视频时长（秒）
+
+        Returns:
+            int: 估算字节数，无法估算返回None
+        """
+        size = fmt.get('filesize') or fmt.get('filesize_approx')
+        if size:
+            return int(size)
+
+        bitrate = self.estimate_bitrate(fmt)
+        if bitrate and duration:
+            # kbps -> 字节
+            return int(bitrate * 1000 / 8 * duration)
+        return None
+
+    def estimate_bitrate(self, fmt):
+        """
+        获取格式的码率（kbps）
+
+        Args:
+            fmt: yt-dlp格式字典
+
+        Returns:
+            float: 码率，无法获取返回None
+        """
+        has_video = fmt.get('vcodec') not in (None, 'none')
+        has_audio = fmt.get('acodec') not in (None, 'none')
+        if fmt.get('tbr'):
+            return fmt['tbr']
+        total = 0
+        if has_video and fmt.get('vbr'):
+            total += fmt['vbr']
+        if has_audio and fmt.get('abr'):
+            total += fmt['abr']
+        return total or None
+
+    def _pick_audio(self, formats, container, duration):
+        """为纯视频格式挑选合并用的音频格式（兼容容器中码率最高者）"""
+        audios = [
+            f for f in formats
+            if f.get('vcodec') == 'none' and f.get('acodec') not in (None, 'none')
+        ]
+        if container in CONTAINER_AUDIO_EXTS:
+            compatible = [f for f in audios if f.get('ext') in CONTAINER_AUDIO_EXTS[container]]
+            audios = compatible or audios
+        if not audios:
+            return None
+        return max(audios, key=lambda f: (self.estimate_bitrate(f) or 0, self.estimate_size(f, duration) or 0))
+
+    def _build_candidates(self, formats, duration, container):
+        """构造候选列表：纯视频+音频组合，以及自带音频的完整格式"""
+        audio = self._pick_audio(formats, container, duration)
+        audio_size = self.estimate_size(audio, duration) if audio else None
+        audio_bitrate = self.estimate_bitrate(audio) if audio else None
+
+        candidates = []
+        for fmt in formats:
+            vcodec = fmt.get('vcodec')
+            if vcodec in (None, 'none') or not fmt.get('height'):
+                continue
+
+            has_audio = fmt.get('acodec') not in (None, 'none')
+            video_size = self.estimate_size(fmt, duration)
+            video_bitrate = self.estimate_bitrate(fmt)
+
+            if has_audio:
+                size, bitrate, format_string, audio_fmt = video_size, video_bitrate, fmt['format_id'], None
+            elif audio:
+                size = video_size + audio_size if video_size and audio_size else None
+                bitrate = video_bitrate + audio_bitrate if video_bitrate and audio_bitrate else None
+                format_string = f"{fmt['format_id']}+{audio['format_id']}"
+                audio_fmt = audio
+            else:
+                continue
+
+            candidates.append({
+                'format_string': format_string,
+                'video': fmt,
+                'audio': audio_fmt,
+                'height': fmt['height'],
+                'codec': codec_family(vcodec),
+                'ext': fmt.get('ext'),
+                'estimated_size': size,
+                'estimated_bitrate': bitrate,
+            })
+        return candidates
+
+    def _codec_rank(self, codec, constraints):
+        """首选编码排序值，越小越优先"""
+        if codec in constraints.preferred_codecs:
+            return constraints.preferred_codecs.index(codec)
+        return len(constraints.preferred_codecs)
+
+    def select(self, formats, duration, constraints):
+        """
+        按约束选择格式
+
+        1. 过滤掉超出最大高度、容器不符、超出大小/码率预算的候选
+        2. 画质下限取 min_height，未指定时取剩余候选中的最高高度
+        3. 在满足下限的候选中按（首选编码, 估算大小）选出传输字节最少者
+
+        Args:
+            formats: yt-dlp的完整格式列表（info['formats']）
+            duration: 视频时长（秒）
+            constraints: FormatConstraints 实例
+
+        Returns:
+            dict: 选中的候选
+            {
+                'format_string': yt-dlp格式字符串,
+                'video': 视频格式字典,
+                'audio': 音频格式字典（自带音频时为None）,
+                'height': 高度,
+                'codec': 编码族,
+                'ext': 视频扩展名,
+                'estimated_size': 估算字节数,
+                'estimated_bitrate': 估算码率(kbps)
+            }
+            没有满足约束的格式时返回None
+        """
+        candidates = self._build_candidates(formats or [], duration, constraints.container)
+
+        if constraints.max_height:
+            candidates = [c for c in candidates if c['height'] <= constraints.max_height]
+        if constraints.container:
+            candidates = [c for c in candidates if c['ext'] == constraints.container]
+        if constraints.max_filesize:
+            # 有预算时无法估算大小的格式视为不满足
+            candidates = [
+                c for c in candidates
+                if c['estimated_size'] and c['estimated_size'] <= constraints.max_filesize
+            ]
+        if constraints.max_bitrate:
+            candidates = [
+                c for c in candidates
+                if c['estimated_bitrate'] and c['estimated_bitrate'] <= constraints.max_bitrate
+            ]
+
+        if not candidates:
+            self.logger.warning(f"没有满足约束的格式: {constraints}")
+            return None
+
+        floor = constraints.min_height or max(c['height'] for c in candidates)
+        eligible = [c for c in candidates if c['height'] >= floor]
+        if not eligible:
+            self.logger.warning(f"没有达到画质下限 {floor}p 的格式: {constraints}")
+            return None
+
+        unknown_size = float('inf')
+        best = min(eligible, key=lambda c: (
+            self._codec_rank(c['codec'], constraints),
+            c['estimated_size'] or unknown_size,
+            c['height'],
+        ))
+
+        size_str = f"{best['estimated_size'] / (1024 * 1024):.1f} MB" if best['estimated_size'] else "未知"
+        self.logger.info(
+            f"格式选择: {best['format_string']} ({best['height']}p, {best['codec']}, "
+            f"估算大小 {size_str}, 候选 {len(eligible)}/{len(candidates)})"
+        )
+        return best
@@ -0,0 +1,122 @@
+"""HTML快速提取模块
+
+先用廉价的字符串预过滤判断页面中是否可能存在目标元素，
+只有需要时才用 lxml 原生解析，并使用预编译的 XPath 提取，
+结果与原先的 BeautifulSoup 选择器保持一致
+"""
+
+import re
+import threading
+from lxml import etree
+from lxml import html as lxml_html
+from bs4 import BeautifulSoup
+
+
+# 页面中直接MP4 URL的正则表达式
+MP4_URL_PATTERN = re.compile(r'https?://[^\s"\'<>]+\.mp4[^\s"\'<>]*')
+
+# 预过滤：标签名不区分大小写，属性值（class/id）区分大小写，与选择器语义一致
+_VIDEO_TAG_PREFILTER = re.compile(r'<video\b', re.IGNORECASE)
+_SOURCE_TAG_PREFILTER = re.compile(r'<source\b', re.IGNORECASE)
+
+# 预编译的XPath选择器
+# soup.find_all("video") / soup.find_all("source")
+_VIDEO_XPATH = etree.XPath('//video')
+_SOURCE_XPATH = etree.XPath('//source')
+# soup.find_all("div", class_="thumb-overlay")：class 中任意一个类名等于 thumb-overlay
+_THUMB_OVERLAY_XPATH = etree.XPath(
+    "//div[contains(concat(' ', normalize-space(@class), ' '), ' thumb-overlay ')]"
+)
+# soup.select("[id*=video]")
+_VIDEO_ID_XPATH = etree.XPath("//*[contains(@id, 'video')]")
+
+# lxml解析器不能跨线程共享，每个线程持有自己的解析器
+_thread_local = threading.local()
+
+
+def _get_parser():
+    """获取当前线程的HTML解析器"""
+    parser = getattr(_thread_local, 'parser', None)
+    if parser is None:
+        # 统一按UTF-8重新编码后解析，保证与 BeautifulSoup(response.text) 的解码结果一致
+        parser = _thread_local.parser = lxml_html.HTMLParser(encoding='utf-8')
+    return parser
+
+
+class HtmlExtractor:
+    """页面元素提取引擎"""
+
+    def _parse(self, text):
+        """使用lxml原生解析HTML文本"""
+        try:
+            return lxml_html.document_fromstring(text.encode('utf-8'), parser=_get_parser())
+        except (etree.ParserError, ValueError):
+            # 空文档或无法解析的内容
+            return None
+
+    def extract(self, text):
+        """
+        提取页面中的所有目标元素
+
+        Args:
+            text: 页面HTML文本
+
+        Returns:
+            dict: 提取结果
+            {
+                'video_srcs': <video> 的 src 属性列表,
+                'source_srcs': <source> 的 src 属性列表,
+                'thumb_overlay_ids': div.thumb-overlay 的 id 属性列表,
+                'video_element_ids': [id*=video] 元素的 id 属性列表,
+                'mp4_urls': 正则匹配到的MP4 URL列表
+            }
+        """
+        result = {
+            'video_srcs': [],
+            'source_srcs': [],
+            'thumb_overlay_ids': [],
+            'video_element_ids': [],
+            'mp4_urls': MP4_URL_PATTERN.findall(text) if '.mp4' in text else [],
+        }
+
+        # 廉价预过滤：判断每个选择器是否可能命中
+        want_video = bool(_VIDEO_TAG_PREFILTER.search(text))
+        want_source = bool(_SOURCE_TAG_PREFILTER.search(text))
+        want_thumb = 'thumb-overlay' in text
+        want_video_id = 'video' in text
+
+        if not (want_video or want_source or want_thumb or want_video_id):
+            return result
+
+        document = self._parse(text)
+        if document is None:
+            return result
+
+        if want_video:
+            result['video_srcs'] = [elem.get('src') for elem in _VIDEO_XPATH(document)]
+        if want_source:
+            result['source_srcs'] = [elem.get('src') for elem in _SOURCE_XPATH(document)]
+        if want_thumb:
+            result['thumb_overlay_ids'] = [elem.get('id') for elem in _THUMB_OVERLAY_XPATH(document)]
+        if want_video_id:
+            result['video_element_ids'] = [elem.get('id') for elem in _VIDEO_ID_XPATH(document)]
+        return result
+
+    def extract_with_soup(self, text):
+        """
+        使用 BeautifulSoup 的参考实现（原选择器），用于对比测试和性能基准
+
+        Args:
+            text: 页面HTML文本
+
+        Returns:
+            dict: 提取结果（格式同 extract）
+        """
+        soup = BeautifulSoup(text, "lxml")
+        return {
+            'video_srcs': [tag.get("src") for tag in soup.find_all("video")],
+            'source_srcs': [tag.get("src") for tag in soup.find_all("source")],
+            'thumb_overlay_ids': [tag.get("id") for tag in soup.find_all("div", class_="thumb-overlay")],
+            'video_element_ids': [tag.get("id") for tag in soup.select("[id*=video]")],
+            'mp4_urls': MP4_URL_PATTERN.findall(text),
+        }
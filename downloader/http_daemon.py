@@ -0,0 +1,457 @@
+"""本地HTTP控制守护进程模块
+
+基于 asyncio 的轻量HTTP服务（仅使用标准库），包装任务队列和多任务调度器：
+- POST /jobs                  添加任务 {"url": ..., "quality": ..., "output_path": ..., "priority": ...}
+- GET  /jobs                  列出任务（可选 ?state=queued,running）
+- GET  /jobs/<id>             查询任务
+- POST /jobs/<id>/cancel      取消任务
+- POST /jobs/<id>/pause       暂停任务
+- POST /jobs/<id>/resume      恢复任务
+- GET  /nodes                 列出共享同一队列的下载节点
+- GET  /events                以 Server-Sent Events 推送任务进度
+
+进度推送采用“最新状态”广播：下载线程只覆盖每个任务的最新状态（O(1)），
+广播协程按固定间隔把变化的状态序列化一次后分发给所有订阅者，
+慢速订阅者只会跳过中间状态，不会拖慢下载线程或其他订阅者；
+进度中的 downloaded/total 为字节数，speed 为字节/秒，eta 为秒（未知时为 null）
+"""
+
+import asyncio
+import hmac
+import json
+import threading
+from urllib.parse import urlparse, parse_qs
+from .job_queue import STATE_RUNNING, STATE_QUEUED, FINAL_STATES
+from utils.logger import get_logger
+
+
+# 不通过API返回的任务选项（敏感或体积大的字段）
+_HIDDEN_OPTIONS = ('cookie', 'video_info', 'resume_info')
+
+# HTTP状态码说明
+_STATUS_TEXT = {
+    200: 'OK',
+    201: 'Created',
+    400: 'Bad Request',
+    401: 'Unauthorized',
+    404: 'Not Found',
+    405: 'Method Not Allowed',
+    409: 'Conflict',
+    413: 'Payload Too Large',
+    500: 'Internal Server Error',
+}
+
+# 请求体最大字节数
+MAX_BODY_SIZE = 1024 * 1024
+
+
+class HttpError(Exception):
+    """带HTTP状态码的请求错误"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class _Watcher:
+    """一个进度订阅者：只保存每个任务尚未发送的最新状态"""
+
+    def __init__(self):
+        self.pending = {}
+        self.event = asyncio.Event()
+
+
+class ProgressBroadcaster:
+    """最新状态进度广播器"""
+
+    def __init__(self, interval=0.25):
+        """
+        初始化广播器
+
+        Args:
+            interval: 广播间隔（秒）
+        """
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.latest = {}
+        self.dirty = set()
+        self.watchers = set()
+
+    def publish(self, job_id, state):
+        """
+        发布任务的最新状态（线程安全，可在下载线程中调用）
+
+        Args:
+            job_id: 任务ID
+            state: 状态字典
+        """
+        with self.lock:
+            self.latest[job_id] = state
+            self.dirty.add(job_id)
+
+    def subscribe(self):
+        """
+        添加订阅者（在事件循环中调用），先推送所有任务的当前状态
+
+        Returns:
+            _Watcher: 订阅者
+        """
+        watcher = _Watcher()
+        with self.lock:
+            snapshot = dict(self.latest)
+        for job_id, state in snapshot.items():
+            watcher.pending[job_id] = json.dumps(state, ensure_ascii=False)
+        if watcher.pending:
+            watcher.event.set()
+        self.watchers.add(watcher)
+        return watcher
+
+    def unsubscribe(self, watcher):
+        """移除订阅者"""
+        self.watchers.discard(watcher)
+
+    async def run(self):
+        """广播循环：按固定间隔分发变化的状态"""
+        while True:
+            await asyncio.sleep(self.interval)
+            with self.lock:
+                if not self.dirty:
+                    continue
+                changed = {job_id: self.latest[job_id] for job_id in self.dirty}
+                self.dirty.clear()
+                # 已结束任务的最终状态分发后不再保留
+                for job_id, state in changed.items():
+                    if state.get('state') in FINAL_STATES:
+                        self.latest.pop(job_id, None)
+
+            # 每个状态只序列化一次
+            encoded = {job_id: json.dumps(state, ensure_ascii=False) for job_id, state in changed.items()}
+            for watcher in self.watchers:
+                watcher.pending.update(encoded)
+                watcher.event.set()
+
+
+class DownloadDaemon:
+    """本地HTTP控制守护进程"""
+
+    def __init__(self, scheduler, host='127.0.0.1', port=8765, token=None, broadcast_interval=0.25):
+        """
+        初始化守护进程
+
+        Args:
+            scheduler: DownloadScheduler 实例
+            host: 监听地址（默认只监听本机）
+            port: 监听端口
+            token: 可选的访问令牌，设置后请求需带 Authorization: Bearer <token>
+            broadcast_interval: 进度广播间隔（秒）
+        """
+        self.logger = get_logger()
+        self.scheduler = scheduler
+        self.job_queue = scheduler.job_queue
+        self.host = host
+        self.port = port
+        self.token = token
+        self.broadcaster = ProgressBroadcaster(broadcast_interval)
+        self.default_output_path = 'videos'
+        self._server = None
+
+        scheduler.progress_callback = self._on_progress
+        scheduler.job_started_callback = self._on_job_started
+        scheduler.job_finished_callback = self._on_job_finished
+
+    # ===== 调度器回调（在下载线程中调用） =====
+
+    def _on_progress(self, event):
+        # 只发送原始数值（字节、字节/秒、秒），显示格式由客户端决定
+        self.broadcaster.publish(event.job_id, {
+            'id': event.job_id,
+            'state': STATE_RUNNING,
+            'downloaded': event.downloaded,
+            'total': event.total,
+            'percentage': round(event.percentage, 1),
+            'speed': round(event.speed) if event.speed else None,
+            'eta': round(event.eta) if event.eta is not None else None,
+            'started_at': event.started_at,
+        })
+
+    def _on_job_started(self, job):
+        self.broadcaster.publish(job['id'], {'id': job['id'], 'state': STATE_RUNNING, 'url': job['url']})
+
+    def _on_job_finished(self, job, result, state):
+        self.broadcaster.publish(job['id'], {
+            'id': job['id'],
+            'state': state or 'cancelled',
+            'filename': result.get('filename'),
+            'error': None if result.get('success') else result.get('error'),
+        })
+
+    # ===== 服务 =====
+
+    async def serve(self):
+        """启动HTTP服务和调度器，一直运行直到被取消"""
+        self.scheduler.start()
+        # 大量订阅者同时连接时需要较大的 backlog
+        self._server = await asyncio.start_server(self._handle_connection, self.host, self.port, backlog=1024)
+        broadcast_task = asyncio.ensure_future(self.broadcaster.run())
+        self.logger.info(f"下载守护进程已启动: http://{self.host}:{self.port}")
+        try:
+            async with self._server:
+                await self._server.serve_forever()
+        finally:
+            broadcast_task.cancel()
+            self.scheduler.stop()
+
+    async def _call(self, func, *args):
+        """在线程池中执行阻塞调用（数据库操作），避免阻塞事件循环"""
+        return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+    async def _read_request(self, reader):
+        """
+        读取HTTP请求
+
+        Returns:
+            tuple: (method, path, query, headers, body)，连接关闭返回None
+        """
+        request_line = await reader.readline()
+        if not request_line:
+            return None
+        try:
+            method, target, _ = request_line.decode('latin-1').split(' ', 2)
+        except ValueError:
+            raise HttpError(400, '无效的请求行')
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        length = headers.get('content-length') or '0'
+        if not length.isdigit():
+            raise HttpError(400, '无效的 Content-Length')
+        length = int(length)
+        if length > MAX_BODY_SIZE:
+            raise HttpError(413, '请求体过大')
+        body = await reader.readexactly(length) if length else b''
+
+        parsed = urlparse(target)
+        return method.upper(), parsed.path.rstrip('/') or '/', parse_qs(parsed.query), headers, body
+
+    async def _send_json(self, writer, status, payload):
+        """发送JSON响应"""
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        writer.write(
+            f"HTTP/1.1 {status} {_STATUS_TEXT.get(status, '')}\r\n"
+            f"Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: close\r\n\r\n".encode('latin-1') + body
+        )
+        await writer.drain()
+
+    async def _handle_connection(self, reader, writer):
+        """处理一个HTTP连接"""
+        try:
+            request = await self._read_request(reader)
+            if request is None:
+                return
+            method, path, query, headers, body = request
+
+            if self.token and not self._authorized(headers):
+                raise HttpError(401, '缺少或无效的访问令牌')
+
+            if method == 'GET' and path == '/events':
+                await self._stream_events(writer)
+                return
+
+            status, payload = await self._route(method, path, query, body)
+            await self._send_json(writer, status, payload)
+        except HttpError as e:
+            await self._send_json(writer, e.status, {'error': str(e)})
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except Exception as e:
+            self.logger.error(f"处理HTTP请求失败: {str(e)}", exc_info=True)
+            try:
+                await self._send_json(writer, 500, {'error': str(e)})
+            except ConnectionError:
+                pass
+        finally:
+            writer.close()
+
+    def _authorized(self, headers):
+        """请求是否带有正确的访问令牌（常数时间比较，避免按响应时间逐字节猜测令牌）"""
+        provided = headers.get('authorization', '').encode('latin-1')
+        return hmac.compare_digest(provided, f"Bearer {self.token}".encode('utf-8'))
+
+    async def _route(self, method, path, query, body):
+        """
+        分发请求
+
+        Returns:
+            tuple: (状态码, 响应数据)
+        """
+        parts = [part for part in path.split('/') if part]
+
+        if parts == ['jobs']:
+            if method == 'GET':
+                states = query.get('state', [''])[0]
+                jobs = await self._call(self.job_queue.list_jobs, states.split(',') if states else None)
+                return 200, {'jobs': [self._public_job(job) for job in jobs]}
+            if method == 'POST':
+                return 201, await self._enqueue(body)
+            raise HttpError(405, '不支持的请求方法')
+
+        if parts == ['nodes']:
+            if method != 'GET':
+                raise HttpError(405, '不支持的请求方法')
+            return 200, {'nodes': await self._call(self.job_queue.list_nodes)}
+
+        if len(parts) >= 2 and parts[0] == 'jobs':
+            try:
+                job_id = int(parts[1])
+            except ValueError:
+                raise HttpError(404, '任务不存在')
+
+            if len(parts) == 2 and method == 'GET':
+                job = await self._call(self.job_queue.get, job_id)
+                if job is None:
+                    raise HttpError(404, '任务不存在')
+                return 200, self._public_job(job)
+
+            actions = {
+                'cancel': self.scheduler.cancel,
+                'pause': self.scheduler.pause,
+                'resume': self.scheduler.resume,
+            }
+            if len(parts) == 3 and parts[2] in actions:
+                if method != 'POST':
+                    raise HttpError(405, '不支持的请求方法')
+                if await self._call(self.job_queue.get, job_id) is None:
+                    raise HttpError(404, '任务不存在')
+                if not await self._call(actions[parts[2]], job_id):
+                    raise HttpError(409, '任务当前状态不支持该操作')
+                return 200, self._public_job(await self._call(self.job_queue.get, job_id))
+
+        raise HttpError(404, '接口不存在')
+
+    async def _enqueue(self, body):
+        """添加任务"""
+        try:
+            data = json.loads(body.decode('utf-8') or '{}')
+        except ValueError:
+            raise HttpError(400, '请求体不是有效的JSON')
+        if not isinstance(data, dict):
+            raise HttpError(400, '请求体必须是JSON对象')
+
+        urls = data.get('urls') or ([data['url']] if data.get('url') else [])
+        if not urls:
+            raise HttpError(400, '缺少 url 或 urls')
+        if not isinstance(urls, list) or not all(isinstance(url, str) and url for url in urls):
+            raise HttpError(400, 'url 必须是字符串，urls 必须是字符串列表')
+
+        priority = self._int_field(data, 'priority')
+        size_estimate = self._int_field(data, 'size_estimate')
+        deadline = data.get('deadline')
+        if deadline is not None and (isinstance(deadline, bool) or not isinstance(deadline, (int, float))):
+            raise HttpError(400, 'deadline 必须是时间戳数字')
+
+        options = {'quality': data.get('quality', 'best'), 'cookie': data.get('cookie')}
+        output_path = data.get('output_path') or self.default_output_path
+
+        def add_all():
+            return [
+                self.job_queue.add(
+                    url, options, output_path,
+                    priority=priority, size_estimate=size_estimate, deadline=deadline
+                )
+                for url in urls
+            ]
+
+        job_ids = await self._call(add_all)
+        self.scheduler.notify()
+        for job_id in job_ids:
+            self.broadcaster.publish(job_id, {'id': job_id, 'state': STATE_QUEUED})
+        return {'ids': job_ids}
+
+    def _int_field(self, data, name):
+        """
+        读取整数字段（缺省为0）
+
+        Raises:
+            HttpError: 字段不是整数（400）
+        """
+        value = data.get(name, 0)
+        if value is None:
+            return 0
+        if isinstance(value, bool):
+            raise HttpError(400, f"{name} 必须是整数")
+        try:
+            if isinstance(value, float) and not value.is_integer():
+                raise ValueError(value)
+            return int(value)
+        except (TypeError, ValueError, OverflowError):
+            raise HttpError(400, f"{name} 必须是整数")
+
+    def _public_job(self, job):
+        """去掉敏感字段后的任务信息"""
+        job = dict(job)
+        job['options'] = {key: value for key, value in job['options'].items() if key not in _HIDDEN_OPTIONS}
+        return job
+
+    async def _stream_events(self, writer):
+        """以 Server-Sent Events 推送进度，直到客户端断开"""
+        writer.write(
+            b"HTTP/1.1 200 OK\r\n"
+            b"Content-Type: text/event-stream; charset=utf-8\r\n"
+            b"Cache-Control: no-cache\r\n"
+            b"Connection: keep-alive\r\n\r\n"
+        )
+        await writer.drain()
+
+        watcher = self.broadcaster.subscribe()
+        try:
+            while True:
+                try:
+                    await asyncio.wait_for(watcher.event.wait(), timeout=15)
+                except asyncio.TimeoutError:
+                    # 心跳注释，保持连接并检测断开
+                    writer.write(b": keep-alive\n\n")
+                    await writer.drain()
+                    continue
+
+                watcher.event.clear()
+                pending, watcher.pending = watcher.pending, {}
+                writer.write(''.join(
+                    f"event: progress\ndata: {data}\n\n" for data in pending.values()
+                ).encode('utf-8'))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.broadcaster.unsubscribe(watcher)
+
+
+def run_daemon(scheduler, host='127.0.0.1', port=8765, token=None):
+    """
+    运行守护进程（阻塞直到 Ctrl+C）
+
+    Args:
+        scheduler: DownloadScheduler 实例
+        host: 监听地址
+        port: 监听端口
+        token: 可选的访问令牌
+    """
+    daemon = DownloadDaemon(scheduler, host, port, token)
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        loop.run_until_complete(daemon.serve())
+    except KeyboardInterrupt:
+        # 交还运行中的任务，重新启动后立即续传，无需等待租约过期
+        scheduler.stop()
+        scheduler.job_queue.release_leases()
+        daemon.logger.info("下载守护进程已停止")
+    finally:
+        loop.close()
@@ -0,0 +1,700 @@
+"""持久化下载任务队列模块
+
+基于 SQLite 的崩溃安全任务队列：每个任务记录URL、下载选项、状态、尝试次数、
+已下载字节数和输出路径，状态迁移使用带条件的 UPDATE 原子完成，
+程序启动时将中断的任务重新排队，由各下载路径根据磁盘上的部分文件续传；
+同一数据库可以包含多个命名队列，每个队列可以使用不同的调度策略
+
+多节点模式：多台主机上的下载进程共享同一个数据库文件（共享目录），
+领取任务时记录节点租约（lease_owner/lease_expires），运行中的节点定期续约，
+节点宕机后租约过期，任务由其他节点在领取时自动收回重新排队；
+每个节点可以登记容量提示，限制该节点同时持有的任务数
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from .scheduling_policy import get_policy
+from utils.logger import get_logger
+
+
+# 任务状态
+STATE_QUEUED = 'queued'
+STATE_RUNNING = 'running'
+STATE_PAUSED = 'paused'
+STATE_DONE = 'done'
+STATE_FAILED = 'failed'
+STATE_CANCELLED = 'cancelled'
+
+# 终止状态
+FINAL_STATES = (STATE_DONE, STATE_FAILED, STATE_CANCELLED)
+
+# 表结构：列名 -> 类型定义（新增列会在打开旧数据库时自动补齐）
+_COLUMNS = {
+    'id': 'INTEGER PRIMARY KEY AUTOINCREMENT',
+    'queue': "TEXT NOT NULL DEFAULT 'default'",
+    'url': 'TEXT NOT NULL',
+    'options': "TEXT NOT NULL DEFAULT '{}'",
+    'state': f"TEXT NOT NULL DEFAULT '{STATE_QUEUED}'",
+    'attempts': 'INTEGER NOT NULL DEFAULT 0',
+    'max_attempts': 'INTEGER NOT NULL DEFAULT 3',
+    'bytes_done': 'INTEGER NOT NULL DEFAULT 0',
+    'bytes_total': 'INTEGER NOT NULL DEFAULT 0',
+    'output_path': 'TEXT',
+    'priority': 'INTEGER NOT NULL DEFAULT 0',
+    'size_estimate': 'INTEGER NOT NULL DEFAULT 0',
+    'deadline': 'REAL',
+    'filename': 'TEXT',
+    'lease_owner': 'TEXT',
+    'lease_expires': 'REAL',
+    'error': 'TEXT',
+    'created_at': 'REAL NOT NULL',
+    'updated_at': 'REAL NOT NULL',
+}
+
+# JSON 编码存储的列
+_JSON_COLUMNS = ('options',)
+
+# 领取任务时读取的列：调度策略排序和 accept 过滤只需要这些列，不读取和解码下载选项
+_CLAIM_COLUMNS = ('id', 'url', 'priority', 'size_estimate', 'deadline', 'created_at')
+
+
+def default_node_id():
+    """
+    生成本进程的节点标识（主机名:进程ID:随机后缀）
+
+    同一主机上的多个下载进程（GUI、命令行、守护进程）共享 cache/jobs.db 时标识互不相同，
+    重启后的进程也不会沿用上一个进程的标识
+
+    Returns:
+        str: 节点标识
+    """
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class JobQueue:
+    """持久化下载任务队列"""
+
+    def __init__(self, path=os.path.join('cache', 'jobs.db'), name='default', node_id=None,
+                 lease_seconds=60, shared=False):
+        """
+        初始化任务队列
+
+        Args:
+            path: SQLite 数据库文件路径，':memory:' 表示只保存在内存中
+            name: 队列名称（同一数据库中的不同队列互不影响）
+            node_id: 本节点标识（默认为 主机名:进程ID:随机后缀，每个进程不同），
+                     指定时同一时刻只能有一个进程使用该标识
+            lease_seconds: 任务租约时长（秒），节点超过该时间未续约视为宕机
+            shared: 数据库是否位于多台主机共享的目录（网络文件系统不支持 WAL 的共享内存，改用回滚日志）
+        """
+        self.logger = get_logger()
+        self.path = path
+        self.name = name
+        self.node_id = node_id or default_node_id()
+        self.lease_seconds = max(1, lease_seconds)
+        self.shared = shared
+        self._local = threading.local()
+        # 内存数据库无法跨连接共享，所有线程使用同一个连接
+        self._shared_conn = None
+        self._shared_lock = threading.RLock()
+
+        if path != ':memory:':
+            directory = os.path.dirname(path)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory)
+
+        self._init_schema()
+        self.policy = self._load_policy()
+
+    def _connection(self):
+        """获取当前线程的数据库连接"""
+        if self.path == ':memory:':
+            if self._shared_conn is None:
+                self._shared_conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+                self._shared_conn.row_factory = sqlite3.Row
+            return self._shared_conn
+
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # 自动提交模式，事务由 _transaction 显式控制
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            if self.shared:
+                conn.execute('PRAGMA journal_mode=DELETE')
+                conn.execute('PRAGMA synchronous=FULL')
+            else:
+                conn.execute('PRAGMA journal_mode=WAL')
+                conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def _transaction(self):
+        """开启写事务（BEGIN IMMEDIATE，保证读-改-写在多线程/多进程下原子）"""
+        return _Transaction(self)
+
+    def _init_schema(self):
+        """创建任务表并补齐缺失的列"""
+        with self._transaction() as conn:
+            columns = ', '.join(f"{name} {definition}" for name, definition in _COLUMNS.items())
+            conn.execute(f"CREATE TABLE IF NOT EXISTS jobs ({columns})")
+
+            existing = {row['name'] for row in conn.execute('PRAGMA table_info(jobs)')}
+            for name, definition in _COLUMNS.items():
+                if name not in existing:
+                    # 旧版本数据库：补齐新增列（NOT NULL 列都带有默认值）
+                    definition = definition.replace('NOT NULL DEFAULT', 'DEFAULT')
+                    conn.execute(f"ALTER TABLE jobs ADD COLUMN {name} {definition}")
+                    self.logger.info(f"任务队列数据库已添加列: {name}")
+
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_jobs_queue_state ON jobs (queue, state)')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS queue_policies '
+                '(queue TEXT PRIMARY KEY, policy TEXT NOT NULL, aging_seconds REAL NOT NULL)'
+            )
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS nodes (node_id TEXT NOT NULL, queue TEXT NOT NULL, '
+                'capacity INTEGER, heartbeat_at REAL NOT NULL, PRIMARY KEY (node_id, queue))'
+            )
+
+    def _load_policy(self):
+        """加载队列的调度策略（未设置时为 fifo）"""
+        row = self._connection().execute(
+            'SELECT policy, aging_seconds FROM queue_policies WHERE queue = ?', (self.name,)
+        ).fetchone()
+        if row is None:
+            return get_policy('fifo')
+        try:
+            return get_policy(row['policy'], row['aging_seconds'])
+        except ValueError as e:
+            self.logger.warning(f"{str(e)}，使用 fifo")
+            return get_policy('fifo')
+
+    def set_policy(self, policy, aging_seconds=600):
+        """
+        切换队列的调度策略（持久化保存，重启后仍然生效）
+
+        Args:
+            policy: 策略名称（fifo/priority/sjf/deadline）
+            aging_seconds: 老化周期（秒），任务每等待一个周期排序上前进一级
+        """
+        self.policy = get_policy(policy, aging_seconds)
+        with self._transaction() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO queue_policies (queue, policy, aging_seconds) VALUES (?, ?, ?)',
+                (self.name, policy, aging_seconds)
+            )
+        self.logger.info(f"队列 {self.name} 调度策略: {policy} (老化周期 {aging_seconds} 秒)")
+
+    def _to_dict(self, row):
+        """将数据库行转换为任务字典"""
+        if row is None:
+            return None
+        job = dict(row)
+        for column in _JSON_COLUMNS:
+            if column in job:
+                job[column] = json.loads(job[column]) if job[column] else {}
+        return job
+
+    def add(self, url, options=None, output_path=None, max_attempts=3, priority=0, size_estimate=0, deadline=None):
+        """
+        添加下载任务
+
+        Args:
+            url: 视频URL
+            options: 下载选项字典（quality、cookie、video_info 等，需可JSON序列化）
+            output_path: 保存路径
+            max_attempts: 最大尝试次数（中断或失败后自动重试）
+            priority: 优先级（数值越大越先执行，priority 策略使用）
+            size_estimate: 预估下载字节数（sjf 策略使用），0表示未知
+            deadline: 截止时间戳（deadline 策略使用），None表示没有截止时间
+
+        Returns:
+            int: 任务ID
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                'INSERT INTO jobs (queue, url, options, output_path, max_attempts, priority, size_estimate, '
+                'deadline, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (self.name, url, json.dumps(options or {}, ensure_ascii=False), output_path, max_attempts,
+                 priority, int(size_estimate or 0), deadline, now, now)
+            )
+            job_id = cursor.lastrowid
+        self.logger.info(f"已添加下载任务 #{job_id}: {url}")
+        return job_id
+
+    def get(self, job_id):
+        """
+        获取任务
+
+        Args:
+            job_id: 任务ID
+
+        Returns:
+            dict: 任务字典，不存在返回None
+        """
+        row = self._connection().execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return self._to_dict(row)
+
+    def list_jobs(self, states=None):
+        """
+        列出任务
+
+        Args:
+            states: 状态过滤（列表），None表示全部
+
+        Returns:
+            list: 任务字典列表（按ID排序）
+        """
+        if states:
+            placeholders = ', '.join('?' for _ in states)
+            rows = self._connection().execute(
+                f"SELECT * FROM jobs WHERE queue = ? AND state IN ({placeholders}) ORDER BY id",
+                (self.name,) + tuple(states)
+            ).fetchall()
+        else:
+            rows = self._connection().execute(
+                'SELECT * FROM jobs WHERE queue = ? ORDER BY id', (self.name,)
+            ).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def pending(self):
+        """
+        按当前调度策略排序的排队中任务
+
+        Returns:
+            list: 任务字典列表（第一个是下一个将被领取的任务）
+        """
+        return self.policy.order(self.list_jobs([STATE_QUEUED]))
+
+    def counts(self):
+        """
+        统计各状态的任务数
+
+        Returns:
+            dict: 状态 -> 数量
+        """
+        rows = self._connection().execute(
+            'SELECT state, COUNT(*) AS n FROM jobs WHERE queue = ? GROUP BY state', (self.name,)
+        ).fetchall()
+        return {row['state']: row['n'] for row in rows}
+
+    def transition(self, job_id, from_states, to_state, owner=None, **fields):
+        """
+        原子状态迁移：仅当任务当前处于 from_states 之一时才迁移
+
+        Args:
+            job_id: 任务ID
+            from_states: 允许的当前状态（列表）
+            to_state: 目标状态
+            owner: 可选的节点标识，指定时仅当任务的租约属于该节点（或没有租约）时才迁移
+            **fields: 同时更新的其他列
+
+        Returns:
+            bool: 是否迁移成功
+        """
+        assignments = ['state = ?', 'updated_at = ?']
+        values = [to_state, time.time()]
+        for name, value in fields.items():
+            if name not in _COLUMNS:
+                raise ValueError(f"未知的任务字段: {name}")
+            if name in _JSON_COLUMNS:
+                value = json.dumps(value, ensure_ascii=False)
+            assignments.append(f"{name} = ?")
+            values.append(value)
+
+        placeholders = ', '.join('?' for _ in from_states)
+        condition = f"id = ? AND state IN ({placeholders})"
+        params = [job_id] + list(from_states)
+        if owner is not None:
+            # 租约已被其他节点接管的任务，原节点的结果不再生效
+            condition += ' AND (lease_owner IS NULL OR lease_owner = ?)'
+            params.append(owner)
+
+        with self._transaction() as conn:
+            cursor = conn.execute(f"UPDATE jobs SET {', '.join(assignments)} WHERE {condition}", values + params)
+            return cursor.rowcount == 1
+
+    def register_node(self, capacity=None):
+        """
+        登记本节点及其容量提示（同时作为一次心跳）
+
+        Args:
+            capacity: 本节点同时持有的最大任务数，None表示不限制
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            # 每个进程使用不同的默认标识，清理已失联且不再持有任务的旧节点记录
+            conn.execute(
+                'DELETE FROM nodes WHERE queue = ? AND heartbeat_at < ? AND node_id NOT IN '
+                '(SELECT lease_owner FROM jobs WHERE queue = ? AND state = ? AND lease_owner IS NOT NULL)',
+                (self.name, now - self.lease_seconds, self.name, STATE_RUNNING)
+            )
+            conn.execute(
+                'INSERT OR REPLACE INTO nodes (node_id, queue, capacity, heartbeat_at) VALUES (?, ?, ?, ?)',
+                (self.node_id, self.name, capacity, now)
+            )
+        self.logger.info(f"节点 {self.node_id} 已加入队列 {self.name} (容量: {capacity or '不限'})")
+
+    def list_nodes(self):
+        """
+        列出队列中登记过的节点
+
+        Returns:
+            list: 节点字典列表（node_id、capacity、heartbeat_at、alive、running）
+        """
+        conn = self._connection()
+        rows = conn.execute('SELECT * FROM nodes WHERE queue = ? ORDER BY node_id', (self.name,)).fetchall()
+        running = {
+            row['lease_owner']: row['n'] for row in conn.execute(
+                'SELECT lease_owner, COUNT(*) AS n FROM jobs WHERE queue = ? AND state = ? GROUP BY lease_owner',
+                (self.name, STATE_RUNNING)
+            )
+        }
+        now = time.time()
+        nodes = []
+        for row in rows:
+            node = dict(row)
+            node['alive'] = now - node['heartbeat_at'] < self.lease_seconds
+            node['running'] = running.get(node['node_id'], 0)
+            nodes.append(node)
+        return nodes
+
+    def _reclaim_expired(self, conn, now):
+        """
+        收回租约过期的任务（持有节点已宕机或失联），调用方需在写事务中
+
+        未用完尝试次数的任务重新排队，否则标记为失败
+
+        Returns:
+            int: 收回的任务数
+        """
+        base = 'WHERE queue = ? AND state = ? AND lease_expires IS NOT NULL AND lease_expires < ?'
+        params = (self.name, STATE_RUNNING, now)
+        requeued = conn.execute(
+            f"UPDATE jobs SET state = ?, lease_owner = NULL, lease_expires = NULL, error = ?, updated_at = ? "
+            f"{base} AND attempts < max_attempts",
+            (STATE_QUEUED, '节点租约过期', now) + params
+        ).rowcount
+        failed = conn.execute(
+            f"UPDATE jobs SET state = ?, lease_expires = NULL, error = ?, updated_at = ? {base}",
+            (STATE_FAILED, '节点租约过期，已达到最大尝试次数', now) + params
+        ).rowcount
+        if requeued or failed:
+            self.logger.warning(f"已收回 {requeued + failed} 个租约过期的任务 (重新排队 {requeued}, 失败 {failed})")
+        return requeued + failed
+
+    def claim_next(self, accept=None):
+        """
+        按调度策略领取下一个排队中的任务（原子地置为 running、增加尝试次数并记录本节点的租约）
+
+        领取前先收回其他节点租约过期的任务；本节点持有的任务数达到容量提示时不再领取
+
+        Args:
+            accept: 可选的过滤函数，接收只含 id、url 和排序相关列的任务字典，
+                    返回False表示暂时跳过该任务（如所属主机已满）
+
+        Returns:
+            dict: 领取到的任务，没有可领取的任务返回None
+        """
+        with self._transaction() as conn:
+            now = time.time()
+            self._reclaim_expired(conn, now)
+
+            node = conn.execute(
+                'SELECT capacity FROM nodes WHERE node_id = ? AND queue = ?', (self.node_id, self.name)
+            ).fetchone()
+            if node is not None and node['capacity']:
+                held = conn.execute(
+                    'SELECT COUNT(*) FROM jobs WHERE queue = ? AND state = ? AND lease_owner = ?',
+                    (self.name, STATE_RUNNING, self.node_id)
+                ).fetchone()[0]
+                if held >= node['capacity']:
+                    return None
+
+            rows = conn.execute(
+                f"SELECT {', '.join(_CLAIM_COLUMNS)} FROM jobs WHERE queue = ? AND state = ? ORDER BY id",
+                (self.name, STATE_QUEUED)
+            ).fetchall()
+            job = None
+            for candidate in self.policy.order([dict(row) for row in rows]):
+                if accept is None or accept(candidate):
+                    job = candidate
+                    break
+            if job is None:
+                return None
+
+            conn.execute(
+                'UPDATE jobs SET state = ?, attempts = attempts + 1, error = NULL, lease_owner = ?, '
+                'lease_expires = ?, updated_at = ? WHERE id = ? AND state = ?',
+                (STATE_RUNNING, self.node_id, now + self.lease_seconds, now, job['id'], STATE_QUEUED)
+            )
+            job = self._to_dict(conn.execute('SELECT * FROM jobs WHERE id = ?', (job['id'],)).fetchone())
+
+        self.logger.info(f"领取下载任务 #{job['id']} (第 {job['attempts']} 次尝试): {job['url']}")
+        return job
+
+    def renew_leases(self, job_ids):
+        """
+        续约本节点持有的运行中任务（同时更新节点心跳）
+
+        Args:
+            job_ids: 本节点正在执行的任务ID
+
+        Returns:
+            set: 仍由本节点持有的任务ID；不在其中的任务已被取消或被其他节点收回，应停止下载
+        """
+        job_ids = list(job_ids)
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute(
+                'UPDATE nodes SET heartbeat_at = ? WHERE node_id = ? AND queue = ?', (now, self.node_id, self.name)
+            )
+            if not job_ids:
+                return set()
+            placeholders = ', '.join('?' for _ in job_ids)
+            condition = f"queue = ? AND state = ? AND lease_owner = ? AND id IN ({placeholders})"
+            params = (self.name, STATE_RUNNING, self.node_id) + tuple(job_ids)
+            conn.execute(f"UPDATE jobs SET lease_expires = ? WHERE {condition}", (now + self.lease_seconds,) + params)
+            rows = conn.execute(f"SELECT id FROM jobs WHERE {condition}", params).fetchall()
+        return {row['id'] for row in rows}
+
+    def update_progress(self, job_id, bytes_done, bytes_total=None):
+        """
+        更新任务的已下载字节数（仅 running 状态）
+
+        Args:
+            job_id: 任务ID
+            bytes_done: 已下载字节数
+            bytes_total: 总字节数（可选）
+        """
+        fields = {'bytes_done': int(bytes_done)}
+        if bytes_total:
+            # 实际总大小比解析时的估算更准确，任务重新排队时按实际大小调度
+            fields['bytes_total'] = fields['size_estimate'] = int(bytes_total)
+        self.transition(job_id, (STATE_RUNNING,), STATE_RUNNING, owner=self.node_id, **fields)
+
+    def complete(self, job_id, filename=None):
+        """
+        标记任务完成
+
+        Args:
+            job_id: 任务ID
+            filename: 下载得到的文件路径
+
+        Returns:
+            bool: 是否迁移成功
+        """
+        done = self.transition(job_id, (STATE_RUNNING,), STATE_DONE, owner=self.node_id,
+                               filename=filename, error=None, lease_expires=None)
+        if done:
+            self.logger.info(f"下载任务 #{job_id} 已完成: {filename}")
+        return done
+
+    def fail(self, job_id, error, retry=True):
+        """
+        标记任务失败；未达到最大尝试次数时重新排队
+
+        Args:
+            job_id: 任务ID
+            error: 错误信息
+            retry: 是否允许重试
+
+        Returns:
+            str: 任务的新状态（queued/failed），迁移失败返回None
+        """
+        job = self.get(job_id)
+        if job is None:
+            return None
+
+        if retry and job['attempts'] < job['max_attempts']:
+            if self.transition(job_id, (STATE_RUNNING,), STATE_QUEUED, owner=self.node_id,
+                               error=str(error), lease_owner=None, lease_expires=None):
+                self.logger.warning(f"下载任务 #{job_id} 失败，重新排队 ({job['attempts']}/{job['max_attempts']}): {error}")
+                return STATE_QUEUED
+            return None
+
+        if self.transition(job_id, (STATE_RUNNING,), STATE_FAILED, owner=self.node_id,
+                           error=str(error), lease_expires=None):
+            self.logger.error(f"下载任务 #{job_id} 失败: {error}")
+            return STATE_FAILED
+        return None
+
+    def cancel(self, job_id):
+        """
+        取消任务（排队中、运行中或已暂停的任务）
+
+        Args:
+            job_id: 任务ID
+
+        Returns:
+            bool: 是否取消成功
+        """
+        return self.transition(job_id, (STATE_QUEUED, STATE_RUNNING, STATE_PAUSED), STATE_CANCELLED)
+
+    def pause(self, job_id):
+        """
+        暂停排队中或运行中的任务（暂停的任务不会被领取）
+
+        运行中的任务由执行它的调度器停止下载；暂停不计入尝试次数
+
+        Args:
+            job_id: 任务ID
+
+        Returns:
+            bool: 是否暂停成功
+        """
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                'UPDATE jobs SET state = ?, '
+                'attempts = CASE WHEN state = ? AND attempts > 0 THEN attempts - 1 ELSE attempts END, '
+                'lease_owner = NULL, lease_expires = NULL, updated_at = ? WHERE id = ? AND state IN (?, ?)',
+                (STATE_PAUSED, STATE_RUNNING, time.time(), job_id, STATE_QUEUED, STATE_RUNNING)
+            )
+            return cursor.rowcount == 1
+
+    def save_resume_info(self, job_id, resume_info):
+        """
+        保存暂停任务的恢复信息（解析结果），恢复时跳过重新解析
+
+        Args:
+            job_id: 任务ID
+            resume_info: 下载结果中的 resume_info
+
+        Returns:
+            bool: 是否保存成功（任务已被重新领取或已结束时不再保存）
+        """
+        with self._transaction() as conn:
+            row = conn.execute(
+                'SELECT options FROM jobs WHERE id = ? AND state IN (?, ?)', (job_id, STATE_PAUSED, STATE_QUEUED)
+            ).fetchone()
+            if row is None:
+                return False
+            options = json.loads(row['options']) if row['options'] else {}
+            options['resume_info'] = resume_info
+            conn.execute(
+                'UPDATE jobs SET options = ?, updated_at = ? WHERE id = ?',
+                (json.dumps(options, ensure_ascii=False), time.time(), job_id)
+            )
+            return True
+
+    def resume(self, job_id):
+        """
+        恢复已暂停的任务（重新排队）
+
+        Args:
+            job_id: 任务ID
+
+        Returns:
+            bool: 是否恢复成功
+        """
+        return self.transition(job_id, (STATE_PAUSED,), STATE_QUEUED)
+
+    def retry(self, job_id):
+        """
+        将失败或已取消的任务重新排队（重置尝试次数）
+
+        Args:
+            job_id: 任务ID
+
+        Returns:
+            bool: 是否重新排队成功
+        """
+        return self.transition(job_id, (STATE_FAILED, STATE_CANCELLED), STATE_QUEUED, attempts=0, error=None)
+
+    def recover(self):
+        """
+        启动时恢复：将中断（崩溃、重启）的运行中任务重新排队
+
+        只恢复租约已过期（持有进程已停止续约）或没有租约的任务；租约未过期的任务
+        可能正由同一主机或其他主机上的另一个进程执行，不受影响，
+        刚崩溃的进程持有的任务在租约过期后由领取操作自动收回。
+        任务的输出路径和下载选项保持不变，重新执行时各下载路径会从磁盘上的部分文件续传
+        （直接MP4的 .part 文件、M3U8的片段临时文件夹、yt-dlp 的 .part 文件）
+
+        Returns:
+            int: 重新排队的任务数
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                'UPDATE jobs SET state = ?, lease_owner = NULL, lease_expires = NULL, updated_at = ? '
+                'WHERE queue = ? AND state = ? AND (lease_expires IS NULL OR lease_expires < ?)',
+                (STATE_QUEUED, now, self.name, STATE_RUNNING, now)
+            )
+            recovered = cursor.rowcount
+
+        if recovered:
+            self.logger.info(f"已恢复 {recovered} 个中断的下载任务")
+        return recovered
+
+    def release_leases(self):
+        """
+        交还本节点持有的运行中任务（进程被中断退出时调用）
+
+        任务立即重新排队，下次运行（或其他节点）无需等待租约过期即可领取并续传；
+        中断不计入尝试次数
+
+        Returns:
+            int: 重新排队的任务数
+        """
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                'UPDATE jobs SET state = ?, attempts = CASE WHEN attempts > 0 THEN attempts - 1 ELSE 0 END, '
+                'lease_owner = NULL, lease_expires = NULL, updated_at = ? '
+                'WHERE queue = ? AND state = ? AND lease_owner = ?',
+                (STATE_QUEUED, time.time(), self.name, STATE_RUNNING, self.node_id)
+            )
+            released = cursor.rowcount
+
+        if released:
+            self.logger.info(f"已交还 {released} 个运行中的任务")
+        return released
+
+    def purge(self, states=FINAL_STATES):
+        """
+        删除指定状态的任务记录
+
+        Args:
+            states: 要删除的状态（默认所有终止状态）
+
+        Returns:
+            int: 删除的任务数
+        """
+        placeholders = ', '.join('?' for _ in states)
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                f"DELETE FROM jobs WHERE queue = ? AND state IN ({placeholders})", (self.name,) + tuple(states)
+            )
+            return cursor.rowcount
+
+
+class _Transaction:
+    """写事务上下文管理器"""
+
+    def __init__(self, job_queue):
+        self.job_queue = job_queue
+        self.conn = None
+
+    def __enter__(self):
+        if self.job_queue.path == ':memory:':
+            self.job_queue._shared_lock.acquire()
+        self.conn = self.job_queue._connection()
+        self.conn.execute('BEGIN IMMEDIATE')
+        return self.conn
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        try:
+            if exc_type is None:
+                self.conn.execute('COMMIT')
+            else:
+                self.conn.execute('ROLLBACK')
+        finally:
+            if self.job_queue.path == ':memory:':
+                self.job_queue._shared_lock.release()
+        return False
@@ -0,0 +1,198 @@
+"""列表页增量爬取模块
+
+以有界并发分页遍历列表页，按页序流式产出新发现的视频ID，
+遇到大部分ID已记录在本地已见集合中的页面时提前停止（增量同步）
+"""
+
+import os
+import re
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse, parse_qs, urlencode, urlunparse
+from utils.logger import get_logger
+
+
+class SeenStore:
+    """本地已见视频ID集合（追加写入的文本文件，每行一个ID）"""
+
+    def __init__(self, path):
+        """
+        初始化已见集合
+
+        Args:
+            path: 持久化文件路径，None表示只保存在内存中
+        """
+        self.logger = get_logger()
+        self.path = path
+        self.lock = threading.Lock()
+        self.ids = set()
+
+        if path and os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                self.ids.update(line.strip() for line in f if line.strip())
+            self.logger.info(f"已加载已见视频ID: {len(self.ids)} 个 ({path})")
+
+    def __contains__(self, video_id):
+        return video_id in self.ids
+
+    def __len__(self):
+        return len(self.ids)
+
+    def add_many(self, video_ids):
+        """
+        批量记录视频ID（追加写入文件）
+
+        Args:
+            video_ids: 视频ID可迭代对象
+        """
+        with self.lock:
+            new_ids = [video_id for video_id in video_ids if video_id not in self.ids]
+            if not new_ids:
+                return
+            self.ids.update(new_ids)
+            if self.path:
+                directory = os.path.dirname(self.path)
+                if directory and not os.path.exists(directory):
+                    os.makedirs(directory)
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.write(''.join(f"{video_id}\n" for video_id in new_ids))
+
+
+class ListingCrawler:
+    """列表页增量爬取器"""
+
+    def __init__(self, m3u8_downloader, seen_store=None, concurrency=4, max_pages=None, stop_seen_ratio=0.5,
+                 record_seen=True):
+        """
+        初始化爬取器
+
+        Args:
+            m3u8_downloader: M3U8Downloader 实例（提供会话、Cookie和页面分析）
+            seen_store: 可选的 SeenStore，None表示不做增量判断
+            concurrency: 同时获取的页面数
+            max_pages: 最大页数，None表示直到列表结束
+            stop_seen_ratio: 一页中已见ID占比达到该值时停止继续翻页
+            record_seen: 产出ID后是否立即记录到已见集合；为False时由调用方在视频处理成功后记录
+        """
+        self.logger = get_logger()
+        self.m3u8_downloader = m3u8_downloader
+        self.seen_store = seen_store
+        self.concurrency = max(1, concurrency)
+        self.max_pages = max_pages
+        self.stop_seen_ratio = stop_seen_ratio
+        self.record_seen = record_seen
+        self.stats = {'pages': 0, 'new_ids': 0, 'seen_ids': 0}
+
+    def page_url(self, listing_url, page):
+        """
+        构造指定页码的列表页URL
+
+        支持 {page} 占位符；否则设置/替换查询参数 page
+
+        Args:
+            listing_url: 列表页URL
+            page: 页码（从1开始）
+
+        Returns:
+            str: 该页的URL
+        """
+        if '{page}' in listing_url:
+            return listing_url.replace('{page}', str(page))
+
+        parsed = urlparse(listing_url)
+        params = parse_qs(parsed.query, keep_blank_values=True)
+        params['page'] = [str(page)]
+        return urlunparse(parsed._replace(query=urlencode(params, doseq=True)))
+
+    def _start_page(self, listing_url):
+        """从URL中读取起始页码"""
+        if '{page}' in listing_url:
+            return 1
+        page = parse_qs(urlparse(listing_url).query).get('page', ['1'])[0]
+        return int(page) if re.fullmatch(r'\d+', page) else 1
+
+    def _fetch_page(self, listing_url, page):
+        """获取一页的视频ID"""
+        return self.m3u8_downloader.get_video_ids_from_page(self.page_url(listing_url, page))
+
+    def crawl(self, listing_url):
+        """
+        增量爬取列表页（生成器）
+
+        页面按有界并发预取，但按页序处理和产出，保证提前停止的判断是确定的
+
+        Args:
+            listing_url: 列表页URL（可包含 {page} 占位符或 page 查询参数）
+
+        Yields:
+            str: 新发现的视频ID（本地已见集合中不存在的）
+        """
+        start_page = self._start_page(listing_url)
+        end_page = start_page + self.max_pages if self.max_pages else None
+        self.stats = {'pages': 0, 'new_ids': 0, 'seen_ids': 0}
+        crawled_ids = set()
+
+        self.logger.info(f"开始增量爬取列表页: {listing_url} (并发: {self.concurrency})")
+
+        executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='listing')
+        in_flight = deque()
+        next_page = start_page
+
+        try:
+            while True:
+                # 保持并发窗口填满
+                while len(in_flight) < self.concurrency and (end_page is None or next_page < end_page):
+                    in_flight.append((next_page, executor.submit(self._fetch_page, listing_url, next_page)))
+                    next_page += 1
+
+                if not in_flight:
+                    break
+
+                page, future = in_flight.popleft()
+                try:
+                    page_ids = future.result()
+                except Exception as e:
+                    # 中间页失败时无法判断后续页面是否为新内容，停止本次爬取
+                    self.logger.error(f"列表页 {page} 获取失败，停止爬取: {str(e)}")
+                    break
+
+                self.stats['pages'] += 1
+                if not page_ids:
+                    self.logger.info(f"列表页 {page} 没有视频，列表结束")
+                    break
+
+                new_ids = []
+                seen_count = 0
+                for video_id in page_ids:
+                    if video_id in crawled_ids:
+                        # 爬取期间列表更新导致的跨页重复
+                        continue
+                    crawled_ids.add(video_id)
+                    if self.seen_store is not None and video_id in self.seen_store:
+                        seen_count += 1
+                    else:
+                        new_ids.append(video_id)
+
+                self.stats['new_ids'] += len(new_ids)
+                self.stats['seen_ids'] += seen_count
+                self.logger.info(f"列表页 {page}: {len(new_ids)} 个新ID, {seen_count} 个已见ID")
+
+                for video_id in new_ids:
+                    yield video_id
+
+                if self.seen_store is not None:
+                    if self.record_seen:
+                        self.seen_store.add_many(new_ids)
+
+                    if seen_count and seen_count / len(page_ids) >= self.stop_seen_ratio:
+                        self.logger.info(f"列表页 {page} 已到达上次爬取的位置，提前停止")
+                        break
+        finally:
+            for _, future in in_flight:
+                future.cancel()
+            executor.shutdown(wait=False)
+            self.logger.info(
+                f"列表页爬取结束: {self.stats['pages']} 页, "
+                f"{self.stats['new_ids']} 个新ID, {self.stats['seen_ids']} 个已见ID"
+            )
@@ -9,16 +9,85 @@ import os
 import re
 import time
 import random
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from urllib.parse import urlparse, parse_qs
-from bs4 import BeautifulSoup
 from .progress_handler import ProgressHandler
+from .cancellation import CancelToken, DownloadCancelled
+from .page_analyzer import PageAnalyzer
+from .extraction_router import (
+    STRATEGY_DIRECT_MP4, STRATEGY_VIEWKEY, STRATEGY_NUMERIC_ID,
+    STRATEGY_PAGE_ID, STRATEGY_M3U8_DIRECT
+)
 from utils.logger import get_logger
+from utils.single_flight import SingleFlight
+
+
+# 所有下载器共享的请求合并器：多个任务同时请求同一个M3U8播放列表时只下载一次
+_playlist_flight = SingleFlight(retain=10)
+
+
+# 估算总大小时抽样探测的片段数
+SIZE_SAMPLE_COUNT = 3
+
+
+class _RequestFailed(Exception):
+    """请求失败（用于让等待同一请求的其他任务自行重试，不共享失败结果）"""
+
+
+class _SegmentProgress:
+    """按片段的实际字节数统计进度，并结合 #EXTINF 时长估算总大小"""
+
+    def __init__(self, durations, count, estimated_size=0):
+        """
+        初始化片段进度
+
+        Args:
+            durations: 每个片段的时长（秒）列表，未知时为空列表
+            count: 片段总数
+            estimated_size: 下载前抽样估算的总字节数，0表示未知
+        """
+        self.durations = durations if len(durations) == count else []
+        self.count = count
+        self.estimated_size = estimated_size
+        self.total_duration = sum(self.durations)
+        self.downloaded = 0
+        self.done_count = 0
+        self.done_duration = 0.0
+
+    def add(self, index, size):
+        """
+        记录一个已完成的片段
+
+        Args:
+            index: 片段序号（从0开始）
+            size: 片段字节数
+        """
+        self.downloaded += size
+        self.done_count += 1
+        if self.durations:
+            self.done_duration += self.durations[index]
+
+    @property
+    def total(self):
+        """估算的总字节数：已完成片段的实际大小 + 按已完成片段码率推算的剩余大小"""
+        if self.done_count >= self.count:
+            return self.downloaded
+        if self.done_count == 0:
+            return self.estimated_size
+        if self.done_duration > 0:
+            remaining = (self.total_duration - self.done_duration) * self.downloaded / self.done_duration
+        else:
+            remaining = (self.count - self.done_count) * self.downloaded / self.done_count
+        return int(self.downloaded + remaining)
 
 
 class DirectMP4UrlException(Exception):
     """直接MP4 URL异常 - 当找到直接的MP4视频URL时抛出"""
     def __init__(self, mp4_url):
         self.mp4_url = mp4_url
+        self.strategy = STRATEGY_DIRECT_MP4
         super().__init__(f"找到直接MP4 URL: {mp4_url}")
 
 
@@ -59,6 +128,20 @@ class M3U8Downloader:
 
         self.session.headers.update(self.headers)
         self.custom_cookie = None  # 自定义Cookie
+
+        # 页面分析器：同一页面在一次任务内只下载和解析一次
+        self.page_analyzer = PageAnalyzer(self.session, timeout=self.timeout)
+
+        # 策略竞速：同时启动各解析策略，在截止时间内按优先级取第一个有效结果
+        self.race_strategies = True
+        self.race_deadline = 45  # 秒
+
+        # 线程本地状态（竞速时每个策略线程持有自己的取消事件）
+        self._local = threading.local()
+
+        # 下载取消令牌（由 VideoDownloader 共享设置）
+        self.cancel_token = CancelToken()
+
         self.logger.info("M3U8Downloader 初始化 (超时: 30s, 延迟: 0.1-0.3s)")
 
     def set_progress_callback(self, callback):
@@ -66,7 +149,7 @@ class M3U8Downloader:
         设置下载进度回调函数
 
         Args:
-            callback: 回调函数
+            callback: 回调函数，接收参数 (event: ProgressEvent)
         """
         self.progress_handler.set_callback(callback)
 
@@ -114,7 +197,7 @@ class M3U8Downloader:
             self.logger.info(f"已设置代理: {self.proxy}")
         else:
             # 清除代理
-            self.session.proxies = None
+            self.session.proxies = {}
             self.logger.info("已禁用代理")
 
     def set_download_delay(self, min_delay=0.1, max_delay=0.3):
@@ -129,6 +212,18 @@ class M3U8Downloader:
         self.delay_max = max(self.delay_min, max_delay)  # 确保max >= min
         self.logger.info(f"已设置下载延迟: {self.delay_min}-{self.delay_max}秒")
 
+    def set_strategy_racing(self, enabled=True, deadline=45):
+        """
+        设置解析策略竞速模式
+
+        Args:
+            enabled: 是否并发竞速执行解析策略
+            deadline: 竞速截止时间（秒）
+        """
+        self.race_strategies = enabled
+        self.race_deadline = max(1, deadline)
+        self.logger.info(f"策略竞速: {'开启' if enabled else '关闭'} (截止时间: {self.race_deadline}s)")
+
     def set_m3u8_cdn_base(self, cdn_base_url):
         """
         设置M3U8 CDN基础URL
@@ -164,13 +259,83 @@ class M3U8Downloader:
             self.logger.warning(f"提取viewkey失败: {str(e)}")
             return None
 
-    def parse_m3u8_from_url(self, page_url, video_id=None):
+    def url_id_strategy(self, page_url):
+        """
+        不请求页面，判断能否直接从URL得到视频ID
+
+        Args:
+            page_url: 视频页面URL
+
+        Returns:
+            tuple: (策略名称, 视频ID)，viewkey参数优先，其次路径中的数字ID；都没有返回 (None, None)
+        """
+        viewkey = self._extract_viewkey_from_url(page_url)
+        if viewkey:
+            return STRATEGY_VIEWKEY, viewkey
+        id_match = re.search(r'/(\d{6,})', page_url)
+        if id_match:
+            return STRATEGY_NUMERIC_ID, id_match.group(1)
+        return None, None
+
+    def _m3u8_strategies(self, page_url):
+        """
+        获取页面解析策略链（按默认优先级排序）
+
+        每个策略返回M3U8信息字典，无法处理时返回None；
+        找到直接MP4 URL的策略抛出 DirectMP4UrlException
+
+        Args:
+            page_url: 视频页面URL
+
+        Returns:
+            list: [(策略名称, 无参可调用对象), ...]
+        """
+        def direct_mp4():
+            # 从页面HTML中提取直接的MP4 URL（优先级最高）
+            direct_mp4_url = self._extract_direct_mp4_url(page_url)
+            if direct_mp4_url:
+                self.logger.info(f"找到直接MP4 URL，将使用直接下载模式")
+                raise DirectMP4UrlException(direct_mp4_url)
+            return None
+
+        def viewkey():
+            # 从URL参数中提取viewkey（91porn等站点）
+            key = self._extract_viewkey_from_url(page_url)
+            return self._fetch_m3u8_by_id(key) if key else None
+
+        def numeric_id():
+            # 从URL路径中提取数字ID
+            id_match = re.search(r'/(\d{6,})', page_url)
+            if not id_match:
+                return None
+            self.logger.info(f"从URL路径提取到数字ID: {id_match.group(1)}")
+            return self._fetch_m3u8_by_id(id_match.group(1))
+
+        def page_id():
+            # 从页面HTML提取video_id
+            extracted_id = self._extract_video_id_from_page(page_url)
+            return self._fetch_m3u8_by_id(extracted_id) if extracted_id else None
+
+        def m3u8_direct():
+            # 直接M3U8 URL作为fallback
+            return self.parse_m3u8_direct(page_url) if '.m3u8' in page_url.lower() else None
+
+        return [
+            (STRATEGY_DIRECT_MP4, direct_mp4),
+            (STRATEGY_VIEWKEY, viewkey),
+            (STRATEGY_NUMERIC_ID, numeric_id),
+            (STRATEGY_PAGE_ID, page_id),
+            (STRATEGY_M3U8_DIRECT, m3u8_direct),
+        ]
+
+    def parse_m3u8_from_url(self, page_url, video_id=None, preferred_strategy=None):
         """
         从页面URL解析M3U8视频信息（增强错误处理）
 
         Args:
             page_url: 视频页面URL
             video_id: 可选的视频ID
+            preferred_strategy: 可选的首选策略名称（来自解析路由表），会被提前尝试
 
         Returns:
             dict: 包含M3U8信息的字典
@@ -178,60 +343,187 @@ class M3U8Downloader:
                 'm3u8_url': M3U8文件URL,
                 'video_id': 视频ID,
                 'ts_count': TS文件数量,
-                'title': 视频标题
+                'title': 视频标题,
+                'strategy': 成功的策略名称
             }
         """
         self.logger.info(f"开始解析M3U8页面: {page_url}")
 
         try:
-            # 策略1: 如果提供了video_id，直接构造M3U8 URL
+            # 如果提供了video_id，直接构造M3U8 URL
             if video_id:
                 self.logger.info(f"使用提供的video_id: {video_id}")
-                return self._fetch_m3u8_by_id(video_id)
+                m3u8_info = self._fetch_m3u8_by_id(video_id)
+                # 只有ID确实来自URL时才记为对应的策略；调用方另行提供的ID不计入路由表
+                strategy, url_id = self.url_id_strategy(page_url)
+                m3u8_info['strategy'] = strategy if url_id == video_id else None
+                return m3u8_info
+
+            strategies = self._m3u8_strategies(page_url)
+            errors = []
+
+            if preferred_strategy:
+                # 路由表命中时先单独尝试首选策略，命中后无需启动其他策略
+                self.logger.info(f"按路由表优先尝试策略: {preferred_strategy}")
+                preferred = [item for item in strategies if item[0] == preferred_strategy]
+                strategies = [item for item in strategies if item[0] != preferred_strategy]
+                m3u8_info = self._run_strategies_in_order(preferred, errors)
+                if m3u8_info:
+                    return m3u8_info
+
+            if self.race_strategies and len(strategies) > 1:
+                m3u8_info = self._race_strategies(strategies, errors)
+            else:
+                m3u8_info = self._run_strategies_in_order(strategies, errors)
+            if m3u8_info:
+                return m3u8_info
+
+            if errors:
+                raise errors[0]
+            raise Exception(f"无法从URL提取M3U8信息: {page_url}")
 
-            # 策略2: 尝试从页面HTML中提取直接的MP4 URL（优先级最高）
-            self.logger.info("尝试从页面HTML提取直接MP4 URL...")
-            direct_mp4_url = self._extract_direct_mp4_url(page_url)
+        except DirectMP4UrlException:
+            raise
+        except Exception as e:
+            self.logger.error(f"M3U8解析失败: {str(e)}", exc_info=True)
+            raise
 
-            if direct_mp4_url:
-                # 返回特殊的标记，表示这是一个直接的MP4 URL
-                self.logger.info(f"找到直接MP4 URL，将使用直接下载模式")
-                raise DirectMP4UrlException(direct_mp4_url)
+    def _run_strategies_in_order(self, strategies, errors):
+        """
+        依次尝试各策略，失败的策略不会中断策略链
 
-            # 策略3: 尝试从URL参数中提取viewkey（91porn等站点）
-            self.logger.info("尝试从URL参数提取viewkey...")
-            viewkey = self._extract_viewkey_from_url(page_url)
+        Args:
+            strategies: [(策略名称, 可调用对象), ...]
+            errors: 收集失败异常的列表（原地追加）
 
-            if viewkey:
-                self.logger.info(f"成功提取viewkey: {viewkey}")
-                return self._fetch_m3u8_by_id(viewkey)
+        Returns:
+            dict: 第一个成功策略的M3U8信息，全部失败返回None
+        """
+        for name, strategy in strategies:
+            self.logger.info(f"尝试解析策略: {name}")
+            try:
+                m3u8_info = strategy()
+            except DirectMP4UrlException:
+                raise
+            except Exception as e:
+                self.logger.warning(f"解析策略 {name} 失败: {str(e)}")
+                errors.append(e)
+                continue
 
-            # 策略4: 尝试从URL路径中提取数字ID
-            self.logger.info("尝试从URL路径提取数字ID...")
-            id_match = re.search(r'/(\d{6,})', page_url)
-            if id_match:
-                numeric_id = id_match.group(1)
-                self.logger.info(f"从URL路径提取到数字ID: {numeric_id}")
-                return self._fetch_m3u8_by_id(numeric_id)
+            if m3u8_info:
+                m3u8_info['strategy'] = name
+                return m3u8_info
+        return None
 
-            # 策略5: 从页面HTML提取video_id
-            self.logger.info("尝试从页面HTML提取video_id...")
-            extracted_id = self._extract_video_id_from_page(page_url)
+    def _run_raced_strategy(self, strategy, cancel_event):
+        """在竞速线程中执行单个策略，返回 (结果类型, 值)"""
+        self._local.cancel_event = cancel_event
+        try:
+            return 'ok', strategy()
+        except DirectMP4UrlException as e:
+            return 'mp4', e
+        except Exception as e:
+            return 'error', e
+        finally:
+            self._local.cancel_event = None
 
-            if extracted_id:
-                self.logger.info(f"成功提取video_id: {extracted_id}")
-                return self._fetch_m3u8_by_id(extracted_id)
+    def _race_strategies(self, strategies, errors):
+        """
+        并发启动各策略，在截止时间内按优先级取第一个有效结果，并取消其余策略
 
-            # 策略6: 尝试直接M3U8 URL作为fallback
-            if '.m3u8' in page_url.lower():
-                self.logger.info("尝试直接解析M3U8 URL...")
-                return self.parse_m3u8_direct(page_url)
+        高优先级策略未结束前不会采用低优先级策略的结果；
+        到达截止时间后采用已完成策略中优先级最高的有效结果
 
-            raise Exception(f"无法从URL提取M3U8信息: {page_url}")
+        Args:
+            strategies: [(策略名称, 可调用对象), ...]，按优先级排序
+            errors: 收集失败异常的列表（原地追加）
 
-        except Exception as e:
-            self.logger.error(f"M3U8解析失败: {str(e)}", exc_info=True)
-            raise
+        Returns:
+            dict: 选中策略的M3U8信息，全部失败返回None
+
+        Raises:
+            DirectMP4UrlException: 选中的策略找到了直接MP4 URL
+        """
+        names = [name for name, _ in strategies]
+        self.logger.info(f"竞速执行解析策略: {', '.join(names)} (截止 {self.race_deadline}s)")
+
+        cancel_event = threading.Event()
+        # 下载被取消时同样唤醒各策略线程中的等待
+        unregister_cancel = self.cancel_token.on_cancel(cancel_event.set)
+        executor = ThreadPoolExecutor(max_workers=len(strategies), thread_name_prefix='m3u8-race')
+        futures = {
+            name: executor.submit(self._run_raced_strategy, strategy, cancel_event)
+            for name, strategy in strategies
+        }
+        deadline = time.monotonic() + self.race_deadline
+        outcomes = {}
+
+        def collect(name):
+            if name not in outcomes and futures[name].done():
+                kind, value = futures[name].result()
+                if kind == 'error':
+                    self.logger.warning(f"解析策略 {name} 失败: {str(value)}")
+                    errors.append(value)
+                elif kind == 'ok' and not value:
+                    kind = 'empty'
+                outcomes[name] = (kind, value)
+            return outcomes.get(name)
+
+        def accept(name, outcome):
+            kind, value = outcome
+            # 取消其余仍在运行的策略
+            cancel_event.set()
+            self.logger.info(f"竞速结果: 采用策略 {name}")
+            if kind == 'mp4':
+                raise value
+            value['strategy'] = name
+            return value
+
+        try:
+            while True:
+                for name in names:
+                    outcome = collect(name)
+                    if outcome is None:
+                        # 更高优先级的策略尚未结束
+                        break
+                    if outcome[0] in ('ok', 'mp4'):
+                        return accept(name, outcome)
+                else:
+                    # 所有策略都已结束且没有有效结果
+                    return None
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.logger.warning("解析策略竞速已到截止时间")
+                    for name in names:
+                        outcome = collect(name)
+                        if outcome and outcome[0] in ('ok', 'mp4'):
+                            return accept(name, outcome)
+                    errors.append(Exception(f"解析策略竞速超时 ({self.race_deadline}s)"))
+                    return None
+
+                pending = [future for name, future in futures.items() if name not in outcomes]
+                wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+        finally:
+            unregister_cancel()
+            cancel_event.set()
+            for future in futures.values():
+                future.cancel()
+            executor.shutdown(wait=False)
+
+    def _is_cancelled(self):
+        """当前线程的请求是否已被取消（下载被取消，或竞速中落败的策略）"""
+        if self.cancel_token.is_cancelled:
+            return True
+        cancel_event = getattr(self._local, 'cancel_event', None)
+        return cancel_event is not None and cancel_event.is_set()
+
+    def _sleep(self, seconds):
+        """可被取消的等待，返回是否已被取消"""
+        cancel_event = getattr(self._local, 'cancel_event', None)
+        if cancel_event is None:
+            return self.cancel_token.wait(seconds)
+        return cancel_event.wait(seconds) or self.cancel_token.is_cancelled
 
     def _extract_video_id_from_page(self, page_url):
         """
@@ -244,41 +536,14 @@ class M3U8Downloader:
             str: 视频ID，失败返回None
         """
         try:
-            self.logger.info(f"正在获取页面: {page_url}")
-            response = self.session.get(page_url, timeout=self.timeout)
-
-            # 记录响应状态
-            self.logger.info(f"页面响应: status={response.status_code}, size={len(response.content)} bytes")
-
-            if response.status_code == 403:
-                self.logger.error("403 Forbidden - 页面拒绝访问，可能需要登录或Cookie")
+            analysis = self.page_analyzer.analyze(page_url)
+            if not analysis.ok:
                 return None
-            elif response.status_code == 404:
-                self.logger.error(f"404 Not Found - 页面不存在: {page_url}")
-                return None
-
-            response.raise_for_status()
-
-            soup = BeautifulSoup(response.text, "lxml")
-            video_elements = soup.find_all("div", class_="thumb-overlay")
-
-            self.logger.info(f"找到 {len(video_elements)} 个视频元素")
 
-            if not video_elements:
-                # 尝试备用选择器
-                self.logger.info("尝试备用选择器...")
-                video_elements = soup.select("[id*=video]")
-                self.logger.info(f"备用选择器找到 {len(video_elements)} 个元素")
-
-            for elem in video_elements:
-                elem_id = elem.get("id")
-                if elem_id:
-                    # 查找6位以上的数字ID
-                    match = re.search(r"\d{6,}", elem_id)
-                    if match:
-                        video_id = match.group(0)
-                        self.logger.info(f"提取到video_id: {video_id}")
-                        return video_id
+            video_id = analysis.video_id()
+            if video_id:
+                self.logger.info(f"提取到video_id: {video_id}")
+                return video_id
 
             self.logger.warning("未能从页面提取到video_id")
             return None
@@ -301,52 +566,14 @@ class M3U8Downloader:
             str: MP4视频URL，失败返回None
         """
         try:
-            self.logger.info(f"正在获取页面以提取MP4 URL: {page_url}")
-            response = self.session.get(page_url, timeout=self.timeout)
-
-            # 记录响应状态
-            self.logger.info(f"页面响应: status={response.status_code}, size={len(response.content)} bytes")
-
-            if response.status_code == 403:
-                self.logger.error("403 Forbidden - 页面拒绝访问，可能需要登录或Cookie")
-                return None
-            elif response.status_code == 404:
-                self.logger.error(f"404 Not Found - 页面不存在: {page_url}")
+            analysis = self.page_analyzer.analyze(page_url)
+            if not analysis.ok:
                 return None
 
-            response.raise_for_status()
-
-            soup = BeautifulSoup(response.text, "lxml")
-
-            # 方法1: 查找<video>标签的src属性
-            video_tags = soup.find_all("video")
-            self.logger.info(f"找到 {len(video_tags)} 个video标签")
-
-            for video in video_tags:
-                src = video.get("src")
-                if src and ".mp4" in src.lower():
-                    self.logger.info(f"从video标签提取到MP4 URL: {src}")
-                    return src
-
-            # 方法2: 查找<source>标签的src属性
-            source_tags = soup.find_all("source")
-            self.logger.info(f"找到 {len(source_tags)} 个source标签")
-
-            for source in source_tags:
-                src = source.get("src")
-                if src and ".mp4" in src.lower():
-                    self.logger.info(f"从source标签提取到MP4 URL: {src}")
-                    return src
-
-            # 方法3: 使用正则表达式搜索HTML中的MP4 URL
-            mp4_pattern = re.compile(r'https?://[^\s"\'<>]+\.mp4[^\s"\'<>]*')
-            mp4_matches = mp4_pattern.findall(response.text)
-
-            if mp4_matches:
-                self.logger.info(f"通过正则表达式找到 {len(mp4_matches)} 个MP4 URL")
-                # 返回第一个找到的MP4 URL
-                self.logger.info(f"使用第一个MP4 URL: {mp4_matches[0]}")
-                return mp4_matches[0]
+            mp4_url, source = analysis.direct_mp4_url()
+            if mp4_url:
+                self.logger.info(f"从{source}提取到MP4 URL: {mp4_url}")
+                return mp4_url
 
             self.logger.warning("未能从页面提取到MP4 URL")
             return None
@@ -377,11 +604,7 @@ class M3U8Downloader:
             raise Exception(f"无法获取M3U8文件内容 (可能已被删除或URL不正确)")
 
         # 解析TS片段
-        ts_list = re.findall(r"(.+?\.ts)", m3u8_text)
-
-        if not ts_list:
-            self.logger.warning("未找到.ts片段，尝试.m4s格式...")
-            ts_list = re.findall(r"(.*?\.m4s)", m3u8_text)
+        ts_list, durations = self._parse_playlist(m3u8_text)
 
         if not ts_list:
             self.logger.error("M3U8文件中未找到任何视频片段")
@@ -391,13 +614,16 @@ class M3U8Downloader:
 
         self.logger.info(f"成功解析M3U8: video_id={video_id}, 片段数={len(ts_list)}")
 
-        return {
+        m3u8_info = {
             'm3u8_url': m3u8_url,
             'video_id': video_id,
             'ts_count': len(ts_list),
             'title': f'Video_{video_id}',
-            'ts_list': ts_list
+            'ts_list': ts_list,
+            'durations': durations,
+            'duration': sum(durations)
         }
+        return m3u8_info
 
     def parse_m3u8_direct(self, m3u8_url):
         """
@@ -418,29 +644,176 @@ class M3U8Downloader:
                 raise Exception("无法获取M3U8文件内容")
 
             # 解析TS文件列表
-            ts_list = re.findall(r"(.+?\.ts)", m3u8_text)
-
-            if not ts_list:
-                # 尝试匹配其他格式的片段
-                ts_list = re.findall(r"(.*?\.m4s)", m3u8_text)
+            ts_list, durations = self._parse_playlist(m3u8_text)
 
             self.logger.info(f"成功解析M3U8: TS片段数={len(ts_list)}")
 
             # 提取基础URL
             base_url = m3u8_url.rsplit('/', 1)[0] + '/'
 
-            return {
+            m3u8_info = {
                 'm3u8_url': m3u8_url,
                 'base_url': base_url,
                 'ts_count': len(ts_list),
                 'title': f'M3U8_{int(time.time())}',
-                'ts_list': ts_list
+                'ts_list': ts_list,
+                'durations': durations,
+                'duration': sum(durations),
+                'strategy': STRATEGY_M3U8_DIRECT
             }
+            return m3u8_info
 
         except Exception as e:
             self.logger.error(f"解析M3U8失败: {str(e)}", exc_info=True)
             raise Exception(f"解析M3U8失败: {str(e)}")
 
+    def _parse_playlist(self, m3u8_text):
+        """
+        解析M3U8播放列表中的片段和每个片段的时长
+
+        Args:
+            m3u8_text: M3U8文件内容
+
+        Returns:
+            tuple: (片段文件列表, 片段时长列表)，时长不完整时时长列表为空
+        """
+        ts_list = []
+        durations = []
+        duration = None
+        for line in m3u8_text.splitlines():
+            line = line.strip()
+            if line.startswith('#EXTINF:'):
+                try:
+                    duration = float(line[len('#EXTINF:'):].split(',')[0])
+                except ValueError:
+                    duration = None
+            elif line and not line.startswith('#'):
+                match = re.match(r"(.+?\.ts)", line) or re.match(r"(.*?\.m4s)", line)
+                if match:
+                    ts_list.append(match.group(1))
+                    durations.append(duration)
+                duration = None
+
+        if None in durations:
+            durations = []
+        return ts_list, durations
+
+    def _segment_url(self, m3u8_info, ts_file):
+        """构造片段URL"""
+        base_url = m3u8_info.get('base_url', '')
+        if base_url:
+            return base_url + ts_file
+        # 使用CDN基础URL（可配置）
+        video_id = m3u8_info.get('video_id', 'unknown')
+        return f"{self.m3u8_cdn_base}/m3u8/{video_id}/{ts_file}"
+
+    def _probe_size(self, url):
+        """
+        不下载内容地获取片段大小（HEAD请求，服务器不返回长度时用单字节范围请求）
+
+        Returns:
+            int: 字节数，无法获取返回None
+        """
+        headers = {'Cookie': self.custom_cookie} if self.custom_cookie else {}
+        try:
+            response = self.session.head(url, timeout=self.timeout, headers=headers, allow_redirects=True)
+            length = response.headers.get('Content-Length')
+            if response.status_code == 200 and length and int(length) > 0:
+                return int(length)
+
+            headers['Range'] = 'bytes=0-0'
+            response = self.session.get(url, timeout=self.timeout, headers=headers, stream=True)
+            try:
+                content_range = response.headers.get('Content-Range', '')
+                if response.status_code == 206 and '/' in content_range:
+                    total = content_range.rsplit('/', 1)[1]
+                    if total.isdigit():
+                        return int(total)
+            finally:
+                response.close()
+        except (requests.exceptions.RequestException, ValueError) as e:
+            self.logger.debug(f"探测片段大小失败: {url} ({str(e)})")
+        return None
+
+    def estimate_size(self, m3u8_info, samples=SIZE_SAMPLE_COUNT):
+        """
+        下载前估算视频总大小：均匀抽样几个片段探测大小，按 #EXTINF 时长推算码率
+
+        探测请求会发起网络连接，只在开始下载时（磁盘空间预检）调用一次；取消时立即停止
+
+        Args:
+            m3u8_info: M3U8信息字典
+            samples: 抽样片段数
+
+        Returns:
+            int: 估算的总字节数，无法估算返回0
+        """
+        ts_list = m3u8_info.get('ts_list', [])
+        durations = m3u8_info.get('durations') or []
+        if not ts_list or samples <= 0:
+            return 0
+
+        count = min(samples, len(ts_list))
+        indexes = sorted({int(i * (len(ts_list) - 1) / max(1, count - 1)) for i in range(count)})
+        sizes = {}
+        # 取消时关闭连接，阻塞中的探测请求立即返回
+        unregister_cancel = self.cancel_token.on_cancel(self.session.close)
+        try:
+            for index in indexes:
+                if self._is_cancelled():
+                    self.logger.info("下载已取消，停止估算总大小")
+                    return 0
+                size = self._probe_size(self._segment_url(m3u8_info, ts_list[index]))
+                if size:
+                    sizes[index] = size
+        finally:
+            unregister_cancel()
+        if not sizes:
+            self.logger.info("无法探测片段大小，跳过总大小估算")
+            return 0
+
+        sampled_duration = sum(durations[index] for index in sizes) if durations else 0
+        if sampled_duration > 0:
+            estimate = sum(sizes.values()) / sampled_duration * sum(durations)
+        else:
+            estimate = sum(sizes.values()) / len(sizes) * len(ts_list)
+        self.logger.info(f"估算M3U8视频大小: {estimate / (1024 * 1024):.1f} MB (抽样 {len(sizes)} 个片段)")
+        return int(estimate)
+
+    def _check_disk_space(self, output_path, temp_folder, m3u8_info):
+        """
+        磁盘空间预检：剩余片段 + 合并后的文件都需要空间
+
+        总大小在第一次下载时估算并保存在 m3u8_info 中（暂停后恢复的任务不再重复探测）
+
+        Args:
+            output_path: 保存路径
+            temp_folder: 片段临时文件夹
+            m3u8_info: M3U8信息字典（原地写入 estimated_size）
+
+        Returns:
+            int: 估算的总字节数，无法估算返回0
+
+        Raises:
+            Exception: 磁盘空间不足
+        """
+        if 'estimated_size' not in m3u8_info:
+            m3u8_info['estimated_size'] = self.estimate_size(m3u8_info)
+        estimated_size = m3u8_info['estimated_size']
+        if not estimated_size:
+            return 0
+        existing = sum(
+            os.path.getsize(os.path.join(temp_folder, name)) for name in os.listdir(temp_folder)
+        ) if os.path.isdir(temp_folder) else 0
+        required = max(0, estimated_size - existing) + estimated_size
+        free = shutil.disk_usage(output_path).free
+        if free < required:
+            raise Exception(
+                f"磁盘空间不足: 预计需要 {required / (1024 * 1024):.1f} MB，"
+                f"可用 {free / (1024 * 1024):.1f} MB"
+            )
+        return estimated_size
+
     def download_m3u8_video(self, m3u8_info, output_path='.', merge=True):
         """
         下载M3U8视频
@@ -455,8 +828,6 @@ class M3U8Downloader:
         """
         video_id = m3u8_info.get('video_id', 'unknown')
         ts_list = m3u8_info.get('ts_list', [])
-        m3u8_url = m3u8_info.get('m3u8_url', '')
-        base_url = m3u8_info.get('base_url', '')
 
         self.logger.info(f"开始下载M3U8视频: {video_id}")
         self.logger.info(f"保存路径: {output_path}")
@@ -468,83 +839,79 @@ class M3U8Downloader:
 
         # 创建临时文件夹存放TS文件
         temp_folder = os.path.join(output_path, f"{video_id}_temp")
+        estimated_size = self._check_disk_space(output_path, temp_folder, m3u8_info)
         if not os.path.exists(temp_folder):
             os.makedirs(temp_folder)
 
+        # 按实际字节数统计进度，总大小随已完成片段的码率不断修正
+        self.progress_handler.reset()
+        progress = _SegmentProgress(m3u8_info.get('durations') or [], len(ts_list), estimated_size)
+
         total_ts = len(ts_list)
         downloaded_ts = 0
         failed_ts = []
         output_file = None
+        # 取消时关闭连接池中的连接
+        unregister_cancel = self.cancel_token.on_cancel(self.session.close)
 
         try:
             # 下载所有TS片段
             for index, ts_file in enumerate(ts_list, 1):
+                # 取消检查点：已完成的片段保留在临时文件夹中，重新下载时跳过
+                self.cancel_token.raise_if_cancelled()
                 ts_filename = os.path.join(temp_folder, f"{ts_file}")
+                ts_url = self._segment_url(m3u8_info, ts_file)
 
-                # 构造TS文件URL
-                if base_url:
-                    ts_url = base_url + ts_file
-                else:
-                    # 使用CDN基础URL（可配置）
-                    ts_url = f"{self.m3u8_cdn_base}/m3u8/{video_id}/{ts_file}"
+                # 断点续传：跳过上次已完整下载的片段
+                if os.path.exists(ts_filename) and os.path.getsize(ts_filename) > 0:
+                    downloaded_ts += 1
+                    progress.add(index - 1, os.path.getsize(ts_filename))
+                    continue
 
                 try:
                     self.logger.info(f"正在下载 [{index}/{total_ts}]: {ts_file}")
-
-                    # 更新进度
-                    progress_percentage = (index - 1) / total_ts * 100
-                    self.progress_handler.progress_hook({
-                        'downloaded_bytes': index - 1,
-                        'total_bytes': total_ts,
-                        'status': 'downloading',
-                        'speed': 'N/A',
-                        'eta': 'N/A'
-                    })
-
                     content = self._request_content(ts_url)
+                    self.cancel_token.raise_if_cancelled()
 
                     if content:
-                        # 保存TS文件
-                        with open(ts_filename, "wb") as f:
+                        # 保存TS文件（先写临时文件再重命名，中断时不会留下不完整的片段）
+                        with open(f"{ts_filename}.part", "wb") as f:
                             f.write(content)
+                        os.replace(f"{ts_filename}.part", ts_filename)
 
                         downloaded_ts += 1
+                        # 更新进度（字节数，速度和剩余时间由进度处理器估算）
+                        progress.add(index - 1, len(content))
+                        self.progress_handler.report(progress.downloaded, progress.total)
                         self.logger.info(f"下载完成 [{index}/{total_ts}]: {ts_file}")
 
                         # 随机延迟，避免请求过快被封（使用配置的延迟时间）
                         sleep_time = random.uniform(self.delay_min, self.delay_max)
-                        time.sleep(sleep_time)
+                        self.cancel_token.wait(sleep_time)
                     else:
                         failed_ts.append(ts_file)
                         self.logger.warning(f"下载失败: {ts_file}")
 
+                except DownloadCancelled:
+                    self.logger.info(f"M3U8下载已取消: {video_id} ({downloaded_ts}/{total_ts} 片段已完成)")
+                    raise
                 except Exception as e:
                     failed_ts.append(ts_file)
                     self.logger.error(f"下载TS文件失败 [{ts_file}]: {str(e)}")
 
             # 更新完成进度
-            self.progress_handler.progress_hook({
-                'downloaded_bytes': total_ts,
-                'total_bytes': total_ts,
-                'status': 'finished',
-                'speed': 'N/A',
-                'eta': 'N/A'
-            })
+            self.progress_handler.report(progress.downloaded, progress.downloaded, finished=True)
 
             # 合并TS文件
             if merge and downloaded_ts > 0:
-                output_file = os.path.join(output_path, f"{video_id}.mp4")
-                self._merge_ts_files(temp_folder, output_file, ts_list)
+                output_file = self._merge_temp_folder(m3u8_info, temp_folder, output_path)
 
         finally:
-            # 无论成功失败，都清理临时文件（仅在merge=True时）
-            if merge and os.path.exists(temp_folder):
-                try:
-                    import shutil
-                    shutil.rmtree(temp_folder)
-                    self.logger.info(f"已清理临时文件夹: {temp_folder}")
-                except Exception as e:
-                    self.logger.warning(f"清理临时文件夹失败: {str(e)}")
+            unregister_cancel()
+            # 全部片段下载成功时清理临时文件（仅在merge=True时）；
+            # 有片段失败或下载中断时保留，重新执行任务时从已下载的片段续传
+            if merge and (output_file and not failed_ts or downloaded_ts == 0):
+                self._cleanup_temp_folder(temp_folder)
 
         return {
             'success': len(failed_ts) == 0,
@@ -555,10 +922,69 @@ class M3U8Downloader:
             'output_file': output_file if merge else temp_folder
         }
 
+    def _merge_temp_folder(self, m3u8_info, temp_folder, output_path):
+        """将临时文件夹中的片段合并为 {video_id}.mp4，返回输出文件路径"""
+        video_id = m3u8_info.get('video_id', 'unknown')
+        output_file = os.path.join(output_path, f"{video_id}.mp4")
+        self._merge_ts_files(temp_folder, output_file, m3u8_info.get('ts_list', []))
+        return output_file
+
+    def _cleanup_temp_folder(self, temp_folder):
+        """清理片段临时文件夹"""
+        if os.path.exists(temp_folder):
+            try:
+                shutil.rmtree(temp_folder)
+                self.logger.info(f"已清理临时文件夹: {temp_folder}")
+            except Exception as e:
+                self.logger.warning(f"清理临时文件夹失败: {str(e)}")
+
+    def merge_m3u8_video(self, m3u8_info, temp_folder, output_path='.', cleanup=True):
+        """
+        合并已下载的片段（配合 download_m3u8_video(merge=False) 使用）
+
+        Args:
+            m3u8_info: M3U8信息字典
+            temp_folder: 片段所在的临时文件夹
+            output_path: 保存路径
+            cleanup: 合并成功后是否删除临时文件夹（有片段缺失时应保留，以便之后续传）
+
+        Returns:
+            str: 合并后的文件路径
+        """
+        output_file = self._merge_temp_folder(m3u8_info, temp_folder, output_path)
+        # 合并失败时保留片段，重新执行任务时不必重新下载
+        if cleanup:
+            self._cleanup_temp_folder(temp_folder)
+        return output_file
+
+    def _worker_copy(self):
+        """
+        创建配置相同的下载器（独立的会话和进度处理器），供并发下载线程各自使用
+
+        Returns:
+            M3U8Downloader: 新的下载器实例，共享取消令牌和进度回调
+        """
+        worker = M3U8Downloader()
+        worker.timeout = self.timeout
+        worker.delay_min = self.delay_min
+        worker.delay_max = self.delay_max
+        worker.m3u8_cdn_base = self.m3u8_cdn_base
+        worker.proxy = self.proxy
+        worker.custom_cookie = self.custom_cookie
+        worker.session.headers.update(self.session.headers)
+        worker.session.cookies.update(self.session.cookies)
+        worker.session.proxies = dict(self.session.proxies or {})
+        worker.cancel_token = self.cancel_token
+        worker.set_progress_callback(self.progress_handler.progress_callback)
+        return worker
+
     def _request_content(self, url, is_text=False, max_retries=3):
         """
         请求URL内容（带增强重试机制和详细日志）
 
+        文本请求（M3U8播放列表）在任务之间合并：相同URL、Cookie和代理的并发请求只下载一次；
+        片段等二进制内容各自请求
+
         Args:
             url: 请求的URL
             is_text: 是否返回文本内容
@@ -567,7 +993,35 @@ class M3U8Downloader:
         Returns:
             内容或None
         """
+        if not is_text:
+            return self._fetch_content(url, is_text, max_retries)
+
+        def fetch():
+            content = self._fetch_content(url, is_text, max_retries)
+            if content is None:
+                raise _RequestFailed(url)
+            return content
+
+        key = (
+            url, self.custom_cookie,
+            tuple(sorted(self.session.cookies.items())),
+            tuple(sorted((self.session.proxies or {}).items()))
+        )
+        try:
+            content, shared = _playlist_flight.do(key, fetch)
+        except _RequestFailed:
+            return None
+        if shared:
+            self.logger.info(f"复用其他任务的请求结果: {url}")
+        return content
+
+    def _fetch_content(self, url, is_text, max_retries):
+        """请求URL内容（重试直到成功、取消或用完重试次数），失败返回None"""
         for attempt in range(max_retries + 1):
+            if self._is_cancelled():
+                self.logger.info(f"请求已取消: {url}")
+                return None
+
             try:
                 self.logger.info(f"请求 {url} (尝试 {attempt + 1}/{max_retries + 1})")
 
@@ -603,7 +1057,8 @@ class M3U8Downloader:
                     if attempt < max_retries:
                         delay = min(2 ** attempt, 30)  # 指数退避，最大30秒
                         self.logger.info(f"等待 {delay:.1f}秒后重试...")
-                        time.sleep(delay)
+                        if self._sleep(delay):
+                            return None
                         continue
 
                 response.raise_for_status()
@@ -619,7 +1074,9 @@ class M3U8Downloader:
             if attempt < max_retries:
                 delay = min(2 ** attempt, 30)  # 2s, 4s, 8s, 16s, 30s...
                 self.logger.info(f"等待 {delay:.1f}秒后重试...")
-                time.sleep(delay)
+                if self._sleep(delay):
+                    self.logger.info(f"请求已取消: {url}")
+                    return None
 
         self.logger.error(f"请求失败，已尝试 {max_retries + 1} 次: {url}")
         return None
@@ -717,19 +1174,11 @@ class M3U8Downloader:
         self.logger.info(f"开始获取页面视频ID列表: {page_url}")
 
         try:
-            response = self.session.get(page_url, timeout=self.timeout)
-            response.raise_for_status()
-
-            soup = BeautifulSoup(response.text, "lxml")
-            video_id_list = soup.find_all("div", class_="thumb-overlay")
+            analysis = self.page_analyzer.analyze(page_url)
+            if not analysis.ok:
+                raise Exception(f"页面请求失败: HTTP {analysis.status_code}")
 
-            result = []
-            for video_id_element in video_id_list:
-                id_attr = video_id_element.get("id")
-                if id_attr:
-                    match = re.findall(r"\d+", id_attr)
-                    if match:
-                        result.append(match[0])
+            result = analysis.listing_video_ids()
 
             self.logger.info(f"找到 {len(result)} 个视频ID")
             return result
@@ -737,3 +1186,115 @@ class M3U8Downloader:
         except Exception as e:
             self.logger.error(f"获取视频ID列表失败: {str(e)}", exc_info=True)
             raise Exception(f"获取视频ID列表失败: {str(e)}")
+
+    def crawl_listing(self, listing_url, seen_path=None, concurrency=4, max_pages=None, seen_store=None,
+                      record_seen=True):
+        """
+        增量爬取分页列表，流式返回新视频ID（生成器）
+
+        Args:
+            listing_url: 列表页URL（可包含 {page} 占位符或 page 查询参数）
+            seen_path: 已见ID集合文件路径，None表示不做增量判断
+            concurrency: 同时获取的页面数
+            max_pages: 最大页数
+            seen_store: 已打开的 SeenStore（提供时忽略 seen_path）
+            record_seen: 产出ID时是否立即记录到已见集合；为False时由调用方在处理成功后记录
+
+        Yields:
+            str: 新发现的视频ID
+        """
+        from .listing_crawler import ListingCrawler, SeenStore
+
+        if seen_store is None and seen_path:
+            seen_store = SeenStore(seen_path)
+        crawler = ListingCrawler(self, seen_store=seen_store, concurrency=concurrency, max_pages=max_pages,
+                                 record_seen=record_seen)
+        yield from crawler.crawl(listing_url)
+
+    def download_listing(self, listing_url, output_path='.', seen_path=None, crawl_concurrency=4,
+                         resolve_workers=4, download_workers=3, merge_workers=1, max_pages=None):
+        """
+        流水线方式下载整个列表：爬取 -> 解析ID -> 下载片段 -> 合并
+
+        各阶段之间为有界队列，不同视频的网络、CPU和磁盘工作互相重叠；
+        每个下载线程使用独立的下载器（会话和进度处理器互不干扰）。
+        视频完整合并后才记录到已见集合，解析、下载失败或被取消的视频在下次增量同步时重试
+
+        Args:
+            listing_url: 列表页URL
+            output_path: 保存路径
+            seen_path: 已见ID集合文件路径（增量同步）
+            crawl_concurrency: 列表页并发数
+            resolve_workers: 解析M3U8的工作线程数
+            download_workers: 下载片段的工作线程数
+            merge_workers: 合并片段的工作线程数
+            max_pages: 最大页数
+
+        Returns:
+            dict: 下载结果
+            {
+                'success': 是否全部成功,
+                'cancelled': 是否被取消,
+                'downloaded': 成功数量,
+                'results': 每个视频的结果,
+                'failures': 失败的条目,
+                'stats': 各阶段统计
+            }
+        """
+        from .listing_crawler import SeenStore
+        from .pipeline import Pipeline, Stage
+
+        seen_store = SeenStore(seen_path) if seen_path else None
+        workers = threading.local()
+
+        def resolve(video_id):
+            self.cancel_token.raise_if_cancelled()
+            return self._fetch_m3u8_by_id(video_id)
+
+        def download(m3u8_info):
+            downloader = getattr(workers, 'downloader', None)
+            if downloader is None:
+                downloader = workers.downloader = self._worker_copy()
+            result = downloader.download_m3u8_video(m3u8_info, output_path, merge=False)
+            if result['downloaded'] == 0:
+                self._cleanup_temp_folder(result['output_file'])
+                raise Exception(f"视频 {m3u8_info.get('video_id')} 没有下载到任何片段")
+            result['m3u8_info'] = m3u8_info
+            return result
+
+        def merge(result):
+            # 有片段缺失时仍然合并已有部分，但保留临时文件夹并且不记为已见，下次同步时续传
+            result['output_file'] = self.merge_m3u8_video(
+                result['m3u8_info'], result['output_file'], output_path, cleanup=not result['failed']
+            )
+            result.pop('m3u8_info')
+            if seen_store is not None and result['success']:
+                seen_store.add_many([result['video_id']])
+            return result
+
+        pipeline = Pipeline(
+            self.crawl_listing(listing_url, concurrency=crawl_concurrency, max_pages=max_pages,
+                               seen_store=seen_store, record_seen=False),
+            [
+                Stage('resolve', resolve, workers=resolve_workers),
+                Stage('download', download, workers=download_workers),
+                Stage('merge', merge, workers=merge_workers),
+            ]
+        )
+
+        # 取消时停止流水线（各下载线程的下载器共享同一个取消令牌，正在下载的片段同时停止）
+        unregister_cancel = self.cancel_token.on_cancel(pipeline.stop)
+        try:
+            results = list(pipeline.run())
+        finally:
+            unregister_cancel()
+        downloaded = sum(1 for result in results if result['success'])
+        cancelled = self.cancel_token.is_cancelled
+        return {
+            'success': not cancelled and not pipeline.failures and downloaded == len(results),
+            'cancelled': cancelled,
+            'downloaded': downloaded,
+            'results': results,
+            'failures': pipeline.failures,
+            'stats': pipeline.stats()
+        }
@@ -0,0 +1,214 @@
+"""页面分析模块
+
+每个页面只下载一次、只解析一次，所有提取器（video/source标签、MP4正则、
+thumb-overlay ID、[id*=video]）在同一个文档上运行，结果在任务内短时间缓存；
+不同任务同时分析同一页面时（批量列表重叠、镜像站点）合并为一次请求
+"""
+
+import re
+import threading
+import time
+from collections import OrderedDict
+from .html_extractor import HtmlExtractor
+from utils.logger import get_logger
+from utils.single_flight import SingleFlight
+
+
+# 页面提取引擎（无状态，可在线程间共享）
+_extractor = HtmlExtractor()
+
+# 所有分析器共享的请求合并器：相同页面（及相同Cookie和代理）的并发请求只下载和解析一次
+_page_flight = SingleFlight(retain=10)
+
+
+class PageAnalysis:
+    """单个页面的分析结果"""
+
+    def __init__(self, url, status_code, text, size):
+        """
+        初始化页面分析结果
+
+        Args:
+            url: 页面URL
+            status_code: HTTP状态码
+            text: 页面HTML文本
+            size: 页面字节数
+        """
+        self.url = url
+        self.status_code = status_code
+        self.size = size
+        self.created_at = time.monotonic()
+
+        # 各提取器的结果
+        self.video_srcs = []          # <video src>
+        self.source_srcs = []         # <source src>
+        self.mp4_urls = []            # 正则匹配到的MP4 URL
+        self.thumb_overlay_ids = []   # div.thumb-overlay 的 id 属性
+        self.video_element_ids = []   # [id*=video] 元素的 id 属性
+
+        if self.ok and text:
+            self._extract(text)
+
+    @property
+    def ok(self):
+        """页面是否获取成功"""
+        return 200 <= self.status_code < 300
+
+    def _extract(self, text):
+        """在同一份解析结果上运行所有提取器"""
+        result = _extractor.extract(text)
+        self.video_srcs = result['video_srcs']
+        self.source_srcs = result['source_srcs']
+        self.thumb_overlay_ids = result['thumb_overlay_ids']
+        self.video_element_ids = result['video_element_ids']
+        self.mp4_urls = result['mp4_urls']
+
+    def direct_mp4_url(self):
+        """
+        按优先级获取直接MP4 URL: video标签 > source标签 > 正则匹配
+
+        Returns:
+            tuple: (MP4 URL, 来源描述)，未找到返回 (None, None)
+        """
+        for src in self.video_srcs:
+            if src and ".mp4" in src.lower():
+                return src, "video标签"
+        for src in self.source_srcs:
+            if src and ".mp4" in src.lower():
+                return src, "source标签"
+        if self.mp4_urls:
+            return self.mp4_urls[0], "正则表达式"
+        return None, None
+
+    def video_id(self):
+        """
+        获取页面中的视频ID（thumb-overlay 优先，其次 [id*=video]）
+
+        Returns:
+            str: 6位以上的数字ID，未找到返回None
+        """
+        element_ids = self.thumb_overlay_ids or self.video_element_ids
+        for elem_id in element_ids:
+            if elem_id:
+                match = re.search(r"\d{6,}", elem_id)
+                if match:
+                    return match.group(0)
+        return None
+
+    def listing_video_ids(self):
+        """
+        获取列表页中所有视频ID（thumb-overlay 元素ID中的第一段数字）
+
+        Returns:
+            list: 视频ID列表
+        """
+        result = []
+        for elem_id in self.thumb_overlay_ids:
+            if elem_id:
+                match = re.findall(r"\d+", elem_id)
+                if match:
+                    result.append(match[0])
+        return result
+
+
+class PageAnalyzer:
+    """页面分析器（带短时缓存）"""
+
+    def __init__(self, session, timeout=30, ttl=60, max_entries=32):
+        """
+        初始化页面分析器
+
+        Args:
+            session: requests.Session 实例
+            timeout: 请求超时（秒）
+            ttl: 分析结果缓存时间（秒）
+            max_entries: 最多缓存的页面数，超出时淘汰最久未使用的结果
+        """
+        self.logger = get_logger()
+        self.session = session
+        self.timeout = timeout
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # URL -> PageAnalysis，按最近使用顺序排列
+        self._cache = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+    def _flight_key(self, url):
+        """请求合并键：URL以及影响响应内容的Cookie和代理"""
+        return (
+            url,
+            tuple(sorted(self.session.cookies.items())),
+            tuple(sorted((self.session.proxies or {}).items()))
+        )
+
+    def _cached(self, url):
+        """获取未过期的缓存结果"""
+        with self._cache_lock:
+            analysis = self._cache.get(url)
+            if analysis and time.monotonic() - analysis.created_at < self.ttl:
+                self._cache.move_to_end(url)
+                return analysis
+            self._cache.pop(url, None)
+            return None
+
+    def analyze(self, url):
+        """
+        获取并分析页面（同一URL在缓存有效期内只下载和解析一次）
+
+        Args:
+            url: 页面URL
+
+        Returns:
+            PageAnalysis: 分析结果（403/404等状态也会返回结果，ok为False）
+
+        Raises:
+            requests.exceptions.RequestException: 网络错误
+        """
+        analysis = self._cached(url)
+        if analysis:
+            self.logger.info(f"使用缓存的页面分析结果: {url}")
+            return analysis
+
+        analysis, shared = _page_flight.do(self._flight_key(url), lambda: self._fetch(url))
+        if shared:
+            self.logger.info(f"复用其他任务的页面分析结果: {url}")
+
+        self._store(url, analysis)
+        return analysis
+
+    def _store(self, url, analysis):
+        """写入缓存，同时清理过期结果并限制缓存大小"""
+        now = time.monotonic()
+        with self._cache_lock:
+            expired = [key for key, cached in self._cache.items() if now - cached.created_at >= self.ttl]
+            for key in expired:
+                del self._cache[key]
+            self._cache[url] = analysis
+            self._cache.move_to_end(url)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+    def _fetch(self, url):
+        """下载并分析页面"""
+        self.logger.info(f"正在获取页面: {url}")
+        response = self.session.get(url, timeout=self.timeout)
+        self.logger.info(f"页面响应: status={response.status_code}, size={len(response.content)} bytes")
+
+        if response.status_code == 403:
+            self.logger.error("403 Forbidden - 页面拒绝访问，可能需要登录或Cookie")
+        elif response.status_code == 404:
+            self.logger.error(f"404 Not Found - 页面不存在: {url}")
+        elif response.status_code != 200:
+            response.raise_for_status()
+
+        analysis = PageAnalysis(url, response.status_code, response.text, len(response.content))
+        self.logger.info(
+            f"页面分析完成: video标签={len(analysis.video_srcs)}, source标签={len(analysis.source_srcs)}, "
+            f"MP4链接={len(analysis.mp4_urls)}, thumb-overlay={len(analysis.thumb_overlay_ids)}"
+        )
+        return analysis
+
+    def clear(self):
+        """清空缓存（任务结束时调用）"""
+        with self._cache_lock:
+            self._cache.clear()
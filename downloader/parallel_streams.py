@@ -0,0 +1,177 @@
+"""音视频流并行下载模块
+
+对 bestvideo+bestaudio 这类需要合并的格式，同时下载视频流和音频流，
+两者都完成后立即用 ffmpeg 合并，而不是 yt-dlp 默认的 视频 -> 音频 -> 合并 串行流程
+"""
+
+import copy
+import os
+import shutil
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import yt_dlp
+from utils.logger import get_logger
+
+
+def ffmpeg_available():
+    """
+    检查ffmpeg是否可用
+
+    Returns:
+        bool: ffmpeg是否在PATH中
+    """
+    return shutil.which('ffmpeg') is not None
+
+
+class _CombinedProgress:
+    """将多个流的yt-dlp进度合并为一个进度（线程安全）"""
+
+    def __init__(self, stream_ids, progress_hook):
+        self.progress_hook = progress_hook
+        self.lock = threading.Lock()
+        self.streams = {stream_id: {'downloaded': 0, 'total': 0, 'speed': 0, 'eta': 0, 'finished': False}
+                        for stream_id in stream_ids}
+
+    def hook_for(self, stream_id):
+        """获取指定流使用的yt-dlp进度钩子"""
+        def hook(d):
+            with self.lock:
+                state = self.streams[stream_id]
+                if d['status'] == 'downloading':
+                    state['downloaded'] = d.get('downloaded_bytes', 0) or 0
+                    state['total'] = d.get('total_bytes') or d.get('total_bytes_estimate') or state['total']
+                    state['speed'] = d.get('speed') or 0
+                    state['eta'] = d.get('eta') or 0
+                elif d['status'] == 'finished':
+                    state['finished'] = True
+                    state['downloaded'] = state['total'] = d.get('total_bytes') or state['downloaded']
+                    state['speed'] = state['eta'] = 0
+                else:
+                    return
+                combined = self._combined()
+            # 单个流完成时不转发 finished，等合并完成后由调用方通知
+            self.progress_hook(combined)
+        return hook
+
+    def finished(self):
+        """所有流下载并合并完成后的进度字典（包含合并后的字节总数）"""
+        with self.lock:
+            combined = self._combined()
+        combined['status'] = 'finished'
+        combined['speed'] = combined['eta'] = 0
+        return combined
+
+    def _combined(self):
+        """计算合并后的进度字典"""
+        streams = self.streams.values()
+        return {
+            'status': 'downloading',
+            'downloaded_bytes': sum(s['downloaded'] for s in streams),
+            'total_bytes': sum(s['total'] for s in streams),
+            'speed': sum(s['speed'] for s in streams),
+            'eta': max(s['eta'] for s in streams),
+        }
+
+
+class ParallelStreamDownloader:
+    """音视频流并行下载器"""
+
+    def __init__(self, ydl_opts, progress_hook=None):
+        """
+        初始化并行流下载器
+
+        Args:
+            ydl_opts: 基础yt-dlp选项（outtmpl、代理、Cookie、分片参数等）
+            progress_hook: 合并后的yt-dlp风格进度钩子
+        """
+        self.logger = get_logger()
+        self.ydl_opts = ydl_opts
+        self.progress_hook = progress_hook or (lambda d: None)
+
+    def can_download(self, info):
+        """
+        判断解析结果是否适合并行下载
+
+        Args:
+            info: yt-dlp已处理的信息字典（download=False）
+
+        Returns:
+            bool: 是否为 视频+音频 两路流
+        """
+        requested = info.get('requested_formats') or []
+        return len(requested) == 2 and ffmpeg_available()
+
+    def _download_stream(self, info, fmt, base_path, hook):
+        """下载单路流，返回本地文件路径"""
+        opts = dict(self.ydl_opts)
+        opts['format'] = fmt['format_id']
+        opts['outtmpl'] = f"{base_path}.f%(format_id)s.%(ext)s"
+        opts['progress_hooks'] = [hook]
+        opts.pop('merge_output_format', None)
+        # 两路流同时下载，分片并发数在两路之间均分，任务的总连接数不超过其配额
+        if opts.get('concurrent_fragment_downloads'):
+            opts['concurrent_fragment_downloads'] = max(1, opts['concurrent_fragment_downloads'] // 2)
+
+        with yt_dlp.YoutubeDL(opts) as ydl:
+            # 复用已解析的信息，只重新选择格式，不再发起解析请求
+            stream_info = ydl.process_ie_result(copy.deepcopy(info), download=True)
+            return ydl.prepare_filename(stream_info)
+
+    def _merge(self, video_file, audio_file, output_file):
+        """使用ffmpeg无损合并音视频"""
+        temp_file = f"{os.path.splitext(output_file)[0]}.temp{os.path.splitext(output_file)[1]}"
+        cmd = [
+            'ffmpeg', '-y', '-loglevel', 'error',
+            '-i', video_file, '-i', audio_file,
+            '-map', '0:v:0', '-map', '1:a:0',
+            '-c', 'copy',
+            temp_file
+        ]
+        self.logger.info(f"使用ffmpeg合并音视频: {' '.join(cmd)}")
+        subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
+        os.replace(temp_file, output_file)
+
+    def download(self, info):
+        """
+        并行下载视频流和音频流并合并
+
+        Args:
+            info: yt-dlp已处理的信息字典（download=False），需包含两路 requested_formats
+
+        Returns:
+            str: 合并后的文件路径
+        """
+        with yt_dlp.YoutubeDL(self.ydl_opts) as ydl:
+            output_file = ydl.prepare_filename(info)
+
+        if os.path.exists(output_file):
+            self.logger.info(f"文件已存在，跳过下载: {output_file}")
+            return output_file
+
+        video_fmt, audio_fmt = info['requested_formats']
+        base_path = os.path.splitext(output_file)[0]
+        progress = _CombinedProgress((video_fmt['format_id'], audio_fmt['format_id']), self.progress_hook)
+
+        self.logger.info(f"并行下载音视频流: 视频={video_fmt['format_id']}, 音频={audio_fmt['format_id']}")
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            futures = [
+                executor.submit(self._download_stream, info, fmt, base_path, progress.hook_for(fmt['format_id']))
+                for fmt in (video_fmt, audio_fmt)
+            ]
+            # 任何一路失败都直接抛出异常，已下载的分片/.part 文件保留以便续传
+            video_file, audio_file = [future.result() for future in futures]
+
+        # 两路都完成后立即合并
+        self._merge(video_file, audio_file, output_file)
+
+        for component in (video_file, audio_file):
+            try:
+                os.unlink(component)
+            except OSError as e:
+                self.logger.warning(f"清理分流文件失败: {str(e)}")
+
+        self.progress_hook(progress.finished())
+        self.logger.info(f"音视频并行下载并合并完成: {output_file}")
+        return output_file
@@ -0,0 +1,256 @@
+"""分阶段流水线模块
+
+生产者/消费者流水线：各阶段之间使用有界队列连接，每个阶段有独立的工作线程数，
+下游变慢时上游自动阻塞（背压），不同视频的网络、CPU和磁盘工作可以互相重叠
+"""
+
+import queue
+import threading
+import time
+from utils.logger import get_logger
+
+
+# 队列结束标记
+_END = object()
+
+
+class StageStats:
+    """阶段统计信息（线程安全）"""
+
+    def __init__(self, name, workers):
+        self.name = name
+        self.workers = workers
+        self.lock = threading.Lock()
+        self.items_in = 0
+        self.items_out = 0
+        self.errors = 0
+        self.busy_seconds = 0.0
+        self.blocked_seconds = 0.0
+        self.started_at = None
+        self.finished_at = None
+
+    def record(self, busy, blocked, produced, failed):
+        """记录一次处理结果"""
+        with self.lock:
+            self.items_in += 1
+            self.busy_seconds += busy
+            self.blocked_seconds += blocked
+            if produced:
+                self.items_out += 1
+            if failed:
+                self.errors += 1
+
+    def to_dict(self):
+        """
+        转换为统计字典
+
+        Returns:
+            dict: 包含处理数量、错误数、吞吐量（条/秒）、利用率和背压阻塞时间
+        """
+        with self.lock:
+            end = self.finished_at or time.monotonic()
+            elapsed = end - self.started_at if self.started_at else 0
+            return {
+                'stage': self.name,
+                'workers': self.workers,
+                'items_in': self.items_in,
+                'items_out': self.items_out,
+                'errors': self.errors,
+                'elapsed': round(elapsed, 3),
+                'throughput': round(self.items_out / elapsed, 3) if elapsed > 0 else 0,
+                'utilization': round(self.busy_seconds / (elapsed * self.workers), 3) if elapsed > 0 else 0,
+                'blocked_seconds': round(self.blocked_seconds, 3),
+            }
+
+
+class Stage:
+    """流水线阶段"""
+
+    def __init__(self, name, func, workers=1, queue_size=None):
+        """
+        初始化阶段
+
+        Args:
+            name: 阶段名称
+            func: 处理函数，接收上一阶段的输出，返回本阶段输出；返回None表示丢弃该条目
+            workers: 工作线程数
+            queue_size: 本阶段输入队列容量，None表示使用流水线默认值
+        """
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+        self.queue_size = queue_size
+
+
+class Pipeline:
+    """分阶段流水线"""
+
+    def __init__(self, source, stages, queue_size=8):
+        """
+        初始化流水线
+
+        Args:
+            source: 输入条目的可迭代对象（可以是生成器，按需拉取）
+            stages: Stage 列表
+            queue_size: 阶段之间队列的默认容量
+        """
+        self.logger = get_logger()
+        self.source = source
+        self.stages = stages
+        self.queues = [queue.Queue(maxsize=stage.queue_size or queue_size) for stage in stages]
+        self.output = queue.Queue(maxsize=queue_size)
+        self.source_stats = StageStats('source', 1)
+        self.stage_stats = [StageStats(stage.name, stage.workers) for stage in stages]
+        self.failures = []
+        self._failures_lock = threading.Lock()
+        self._remaining_workers = [stage.workers for stage in stages]
+        self._remaining_lock = threading.Lock()
+        self._stop_event = threading.Event()
+
+    def _put(self, target_queue, item):
+        """放入下游队列（队列满时阻塞），返回阻塞的秒数；流水线停止时放弃"""
+        start = time.monotonic()
+        while not self._stop_event.is_set():
+            try:
+                target_queue.put(item, timeout=0.5)
+                break
+            except queue.Full:
+                continue
+        return time.monotonic() - start
+
+    def _get(self, source_queue):
+        """从上游队列取出条目（队列空时等待）；流水线停止时返回结束标记，线程不会永久阻塞"""
+        while not self._stop_event.is_set():
+            try:
+                return source_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+        return _END
+
+    def _next_queue(self, index):
+        """第 index 个阶段的输出队列"""
+        return self.queues[index + 1] if index + 1 < len(self.stages) else self.output
+
+    def _finish_stage_worker(self, index):
+        """阶段的一个工作线程结束；最后一个结束时向下游发送结束标记"""
+        with self._remaining_lock:
+            self._remaining_workers[index] -= 1
+            last = self._remaining_workers[index] == 0
+        if not last:
+            return
+
+        self.stage_stats[index].finished_at = time.monotonic()
+        next_index = index + 1
+        count = self.stages[next_index].workers if next_index < len(self.stages) else 1
+        for _ in range(count):
+            self._put(self._next_queue(index), _END)
+
+    def _run_source(self):
+        """源线程：从输入迭代器拉取条目放入第一个队列"""
+        stats = self.source_stats
+        stats.started_at = time.monotonic()
+        iterator = None
+        try:
+            iterator = iter(self.source)
+            while not self._stop_event.is_set():
+                start = time.monotonic()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    break
+                busy = time.monotonic() - start
+                blocked = self._put(self.queues[0], item)
+                stats.record(busy, blocked, True, False)
+        except Exception as e:
+            self.logger.error(f"流水线输入源失败: {str(e)}", exc_info=True)
+            with self._failures_lock:
+                self.failures.append({'stage': 'source', 'item': None, 'error': str(e)})
+            with stats.lock:
+                stats.errors += 1
+        finally:
+            stats.finished_at = time.monotonic()
+            # 提前停止时关闭输入生成器（释放爬取线程等资源）
+            close = getattr(iterator, 'close', None)
+            if close:
+                close()
+            for _ in range(self.stages[0].workers):
+                self._put(self.queues[0], _END)
+
+    def _run_worker(self, index):
+        """阶段工作线程：处理输入队列中的条目并放入下游队列"""
+        stage = self.stages[index]
+        stats = self.stage_stats[index]
+        in_queue = self.queues[index]
+        out_queue = self._next_queue(index)
+
+        try:
+            while True:
+                item = self._get(in_queue)
+                if item is _END or self._stop_event.is_set():
+                    break
+
+                start = time.monotonic()
+                try:
+                    result = stage.func(item)
+                except Exception as e:
+                    busy = time.monotonic() - start
+                    self.logger.error(f"流水线阶段 {stage.name} 处理失败: {str(e)}")
+                    with self._failures_lock:
+                        self.failures.append({'stage': stage.name, 'item': item, 'error': str(e)})
+                    stats.record(busy, 0, False, True)
+                    continue
+
+                busy = time.monotonic() - start
+                blocked = self._put(out_queue, result) if result is not None else 0
+                stats.record(busy, blocked, result is not None, False)
+        finally:
+            self._finish_stage_worker(index)
+
+    def run(self):
+        """
+        启动流水线并流式返回最后一个阶段的输出（生成器）
+
+        Yields:
+            最后一个阶段的输出条目
+        """
+        self.logger.info(
+            "启动流水线: " + " -> ".join(f"{stage.name}(x{stage.workers})" for stage in self.stages)
+        )
+
+        now = time.monotonic()
+        for stats in self.stage_stats:
+            stats.started_at = now
+
+        threads = [threading.Thread(target=self._run_source, name='pipeline-source', daemon=True)]
+        for index, stage in enumerate(self.stages):
+            for worker in range(stage.workers):
+                threads.append(threading.Thread(
+                    target=self._run_worker, args=(index,),
+                    name=f"pipeline-{stage.name}-{worker}", daemon=True
+                ))
+        for thread in threads:
+            thread.start()
+
+        try:
+            while True:
+                item = self._get(self.output)
+                if item is _END:
+                    break
+                yield item
+        finally:
+            # 调用方提前结束迭代时通知所有线程停止
+            self._stop_event.set()
+            self.logger.info(f"流水线结束: {self.stats()}")
+
+    def stop(self):
+        """请求流水线停止（已在处理中的条目会完成）"""
+        self._stop_event.set()
+
+    def stats(self):
+        """
+        获取各阶段统计信息
+
+        Returns:
+            list: 每个阶段（含输入源）的统计字典
+        """
+        return [self.source_stats.to_dict()] + [stats.to_dict() for stats in self.stage_stats]
@@ -0,0 +1,189 @@
+"""播放列表/频道展开模块
+
+使用 yt-dlp 的扁平模式分页枚举播放列表和频道条目，
+条目以生成器形式逐页产出，完整解析推迟到真正下载该条目时再进行
+"""
+
+import itertools
+import yt_dlp
+from yt_dlp.utils import PagedList
+from utils.logger import get_logger
+
+
+class PlaylistExpander:
+    """播放列表展开器"""
+
+    # 跟随URL跳转（如频道首页 -> /videos 标签页）的最大次数
+    MAX_REDIRECTS = 5
+
+    def __init__(self, page_size=50, proxy=None, cookiefile=None):
+        """
+        初始化播放列表展开器
+
+        Args:
+            page_size: 每页条目数
+            proxy: 可选的代理URL
+            cookiefile: 可选的Cookie文件路径（Netscape格式）
+        """
+        self.logger = get_logger()
+        self.page_size = max(1, int(page_size))
+        self.proxy = proxy
+        self.cookiefile = cookiefile
+
+    def _build_ydl_opts(self):
+        """构造扁平枚举使用的yt-dlp选项"""
+        ydl_opts = {
+            'quiet': True,
+            'no_warnings': True,
+            'extract_flat': 'in_playlist',
+            'lazy_playlist': True,
+        }
+        if self.proxy:
+            ydl_opts['proxy'] = self.proxy
+        if self.cookiefile:
+            ydl_opts['cookiefile'] = self.cookiefile
+        return ydl_opts
+
+    def _resolve_root(self, ydl, url):
+        """
+        获取未处理的顶层结果，并跟随URL类型的跳转
+
+        Args:
+            ydl: YoutubeDL实例
+            url: 播放列表或频道URL
+
+        Returns:
+            dict: yt-dlp未处理的信息字典（process=False）
+        """
+        info = ydl.extract_info(url, download=False, process=False)
+        for _ in range(self.MAX_REDIRECTS):
+            if not info or info.get('_type') not in ('url', 'url_transparent'):
+                break
+            self.logger.info(f"播放列表跳转: {info.get('url')}")
+            info = ydl.extract_info(info['url'], download=False, process=False,
+                                    ie_key=info.get('ie_key'))
+        return info
+
+    def _iter_raw_pages(self, entries):
+        """
+        将各种形式的entries（列表、生成器、PagedList）按页切分
+
+        Args:
+            entries: yt-dlp返回的entries对象
+
+        Yields:
+            list: 一页原始条目
+        """
+        if isinstance(entries, PagedList):
+            # PagedList 支持按需分页获取，只请求需要的那一页
+            start = 0
+            while True:
+                page = entries.getslice(start, start + self.page_size)
+                if not page:
+                    return
+                yield page
+                if len(page) < self.page_size:
+                    return
+                start += self.page_size
+
+        iterator = iter(entries or [])
+        while True:
+            page = list(itertools.islice(iterator, self.page_size))
+            if not page:
+                return
+            yield page
+
+    def _normalize_entry(self, entry, index, playlist_info):
+        """将原始扁平条目转换为统一格式"""
+        url = entry.get('webpage_url') or entry.get('url')
+        return {
+            'index': index,
+            'id': entry.get('id'),
+            'url': url,
+            'ie_key': entry.get('ie_key'),
+            'title': entry.get('title') or entry.get('id') or f'条目_{index}',
+            'duration': entry.get('duration') or 0,
+            'playlist_title': playlist_info.get('title', ''),
+        }
+
+    def is_playlist(self, info):
+        """
+        判断yt-dlp信息字典是否为播放列表
+
+        Args:
+            info: yt-dlp信息字典
+
+        Returns:
+            bool: 是否为播放列表
+        """
+        return bool(info) and info.get('_type') in ('playlist', 'multi_video')
+
+    def iter_pages(self, url):
+        """
+        分页枚举播放列表条目（生成器）
+
+        每产出一页只会触发获取这一页所需的网络请求，
+        调用方可以在第一页到达后立即开始下载
+
+        Args:
+            url: 播放列表或频道URL
+
+        Yields:
+            list: 一页条目，每个条目为
+            {
+                'index': 在播放列表中的序号(从1开始),
+                'id': 视频ID,
+                'url': 视频页面URL,
+                'ie_key': yt-dlp提取器名称,
+                'title': 标题,
+                'duration': 时长(秒),
+                'playlist_title': 所属播放列表标题
+            }
+        """
+        self.logger.info(f"开始分页枚举播放列表: {url} (每页 {self.page_size} 条)")
+
+        with yt_dlp.YoutubeDL(self._build_ydl_opts()) as ydl:
+            info = self._resolve_root(ydl, url)
+
+            if not self.is_playlist(info):
+                # 单个视频：作为只有一个条目的列表返回
+                self.logger.info("URL不是播放列表，按单个视频处理")
+                if info:
+                    yield [self._normalize_entry(info, 1, {})]
+                return
+
+            index = 0
+            page_number = 0
+            for raw_page in self._iter_raw_pages(info.get('entries')):
+                page_number += 1
+                page = []
+                for entry in raw_page:
+                    if not entry:
+                        continue
+                    index += 1
+                    page.append(self._normalize_entry(entry, index, info))
+
+                self.logger.info(f"播放列表第 {page_number} 页: {len(page)} 个条目")
+                if page:
+                    yield page
+
+            self.logger.info(f"播放列表枚举完成，共 {index} 个条目")
+
+    def iter_entries(self, url, max_entries=None):
+        """
+        逐条枚举播放列表条目（生成器）
+
+        Args:
+            url: 播放列表或频道URL
+            max_entries: 可选的最大条目数
+
+        Yields:
+            dict: 条目信息（格式同 iter_pages）
+        """
+        count = 0
+        for page in self.iter_pages(url):
+            for entry in page:
+                if max_entries is not None and count >= max_entries:
+                    return
+                count += 1
+                yield entry
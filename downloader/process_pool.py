@@ -0,0 +1,185 @@
+"""多进程任务执行模块
+
+把下载任务分派到工作进程中执行，HTML解析、正则提取和合并等
+CPU工作分散到多个核心上，不再受单个解释器GIL的限制；
+工作进程的进度经由一个 multiprocessing.Queue 汇总回父进程，
+子进程端按任务合并进度并限频发送，通道开销很小；
+取消请求通过共享的取消标记表传给子进程，子进程的监视线程发现后取消对应的下载
+"""
+
+import multiprocessing
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from .progress_handler import ProgressEvent
+from utils.logger import get_logger
+
+
+# 子进程中每个任务的进度最小发送间隔（秒）
+PROGRESS_INTERVAL = 0.2
+
+# 子进程检查取消标记的间隔（秒）
+CANCEL_POLL_INTERVAL = 0.5
+
+# 子进程全局：进度通道（由进程池初始化函数设置）
+_progress_queue = None
+
+
+def _init_worker(progress_queue):
+    """工作进程初始化"""
+    global _progress_queue
+    _progress_queue = progress_queue
+
+
+def _watch_cancel(downloader, job_id, cancel_flags, finished):
+    """子进程监视线程：父进程标记取消后取消下载"""
+    while not finished.wait(CANCEL_POLL_INTERVAL):
+        try:
+            if job_id in cancel_flags:
+                downloader.cancel_download()
+                return
+        except (EOFError, OSError):
+            # 父进程已退出
+            downloader.cancel_download()
+            return
+
+
+def _run_job(job, settings, cancel_flags):
+    """
+    在工作进程中执行一个下载任务
+
+    Args:
+        job: 任务字典
+        settings: 下载器设置（proxy、concurrent_fragments、archive 归档路径）
+        cancel_flags: 父进程共享的取消标记表（任务ID -> True）
+
+    Returns:
+        dict: 下载结果
+    """
+    from .video_downloader import VideoDownloader
+    from .download_archive import get_archive
+    from .extraction_router import get_router
+
+    downloader = VideoDownloader()
+    if settings.get('proxy'):
+        downloader.set_proxy(settings['proxy'])
+    if settings.get('archive'):
+        # 每个工作进程只加载一次归档
+        downloader.archive = get_archive(settings['archive'])
+    if settings.get('concurrent_fragments'):
+        downloader.concurrent_fragments = settings['concurrent_fragments']
+
+    job_id = job['id']
+    last_sent = [0.0]
+
+    def progress(event):
+        # 限频发送，完成时总是发送；以原始数值元组传递，格式化由父进程的界面完成
+        now = time.monotonic()
+        if not event.finished and now - last_sent[0] < PROGRESS_INTERVAL:
+            return
+        last_sent[0] = now
+        if _progress_queue is not None:
+            event.job_id = job_id
+            _progress_queue.put(event.to_tuple())
+
+    downloader.set_progress_callback(progress)
+
+    finished = threading.Event()
+    threading.Thread(
+        target=_watch_cancel, args=(downloader, job_id, cancel_flags, finished), daemon=True
+    ).start()
+
+    options = job['options']
+    try:
+        return downloader.download_video(
+            job['url'], job['output_path'] or '.', options.get('quality', 'best'),
+            options.get('video_info'), cookie=options.get('cookie'),
+            resume_info=options.get('resume_info')
+        )
+    except Exception as e:
+        return {'success': False, 'error': f"下载失败: {str(e)}"}
+    finally:
+        finished.set()
+        # 工作进程退出时不会执行 atexit，每个任务结束后写入学到的解析路由
+        get_router().flush()
+
+
+class ProcessJobExecutor:
+    """多进程任务执行器"""
+
+    def __init__(self, max_workers=None, progress_callback=None):
+        """
+        初始化执行器
+
+        Args:
+            max_workers: 工作进程数，None表示CPU核心数
+            progress_callback: 进度回调 (event: ProgressEvent)，在父进程的汇总线程中调用
+        """
+        self.logger = get_logger()
+        self.max_workers = max_workers or multiprocessing.cpu_count()
+        self.progress_callback = progress_callback
+        self._progress_queue = multiprocessing.Queue()
+        # 取消标记表由管理进程持有，代理对象可以随任务传给工作进程
+        self._manager = multiprocessing.Manager()
+        self._cancel_flags = self._manager.dict()
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            initializer=_init_worker,
+            initargs=(self._progress_queue,)
+        )
+        self._stop_event = threading.Event()
+        self._collector = threading.Thread(target=self._collect_progress, name='process-progress', daemon=True)
+        self._collector.start()
+        self.logger.info(f"已启动多进程执行器: {self.max_workers} 个工作进程")
+
+    def _collect_progress(self):
+        """汇总线程：从进度通道读取子进程的进度并转发"""
+        while not self._stop_event.is_set():
+            try:
+                message = self._progress_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                break
+            if self.progress_callback:
+                try:
+                    self.progress_callback(ProgressEvent.from_tuple(message))
+                except Exception as e:
+                    self.logger.warning(f"进度回调失败: {str(e)}")
+
+    def submit(self, job, settings):
+        """
+        提交任务到工作进程
+
+        Args:
+            job: 任务字典
+            settings: 下载器设置
+
+        Returns:
+            concurrent.futures.Future: 结果为下载结果字典
+        """
+        future = self._pool.submit(_run_job, job, settings, self._cancel_flags)
+        future.add_done_callback(lambda _: self._cancel_flags.pop(job['id'], None))
+        return future
+
+    def cancel(self, job_id):
+        """
+        取消在工作进程中运行的任务（子进程在 CANCEL_POLL_INTERVAL 内响应）
+
+        Args:
+            job_id: 任务ID
+        """
+        self._cancel_flags[job_id] = True
+
+    def shutdown(self, wait=True):
+        """
+        关闭执行器
+
+        Args:
+            wait: 是否等待进行中的任务结束
+        """
+        self._pool.shutdown(wait=wait)
+        self._stop_event.set()
+        self._collector.join(timeout=1)
+        self._manager.shutdown()
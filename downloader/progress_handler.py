@@ -1,21 +1,215 @@
-"""进度处理模块"""
+"""进度处理模块
+
+三条下载路径（yt-dlp、直接MP4、M3U8）都通过 ProgressHandler.report 产生进度事件；
+进度事件只保存原始数值（字节数、速度、时间戳），速度、剩余时间和大小的显示文本
+由界面在渲染时格式化，无界面的批量下载不承担每个数据块的字符串格式化开销
+"""
+
+import time
+
+
+# 未给出速度时，按至少该间隔（秒）的采样估算速度
+SPEED_SAMPLE_INTERVAL = 0.5
+
+# 速度估算的平滑系数（新采样的权重）
+SPEED_SMOOTHING = 0.3
+
+
+def format_size(num_bytes):
+    """
+    格式化字节数
+
+    Args:
+        num_bytes: 字节数
+
+    Returns:
+        str: 如 "12.50 MB"
+    """
+    num_bytes = float(num_bytes or 0)
+    for unit in ['B', 'KB', 'MB', 'GB']:
+        if num_bytes < 1024.0:
+            return f"{num_bytes:.2f} {unit}"
+        num_bytes /= 1024.0
+    return f"{num_bytes:.2f} TB"
+
+
+def format_speed(speed):
+    """
+    格式化下载速度
+
+    Args:
+        speed: 速度（字节/秒），None或0表示未知
+
+    Returns:
+        str: 如 "1.20 MB/s"，未知时为 "N/A"
+    """
+    if not speed:
+        return "N/A"
+    for unit in ['B/s', 'KB/s', 'MB/s', 'GB/s']:
+        if speed < 1024.0:
+            return f"{speed:.2f} {unit}"
+        speed /= 1024.0
+    return f"{speed:.2f} TB/s"
+
+
+def format_eta(seconds):
+    """
+    格式化剩余时间
+
+    Args:
+        seconds: 剩余秒数，None表示未知
+
+    Returns:
+        str: 如 "01:05" 或 "01:02:03"，未知时为 "N/A"
+    """
+    if seconds is None or seconds < 0:
+        return "N/A"
+
+    hours = int(seconds // 3600)
+    minutes = int((seconds % 3600) // 60)
+    secs = int(seconds % 60)
+
+    if hours > 0:
+        return f"{hours:02d}:{minutes:02d}:{secs:02d}"
+    return f"{minutes:02d}:{secs:02d}"
+
+
+class ProgressEvent:
+    """进度事件（只含原始数值）"""
+
+    __slots__ = ('job_id', 'downloaded', 'total', 'speed', 'eta', 'started_at', 'timestamp', 'finished')
+
+    def __init__(self, downloaded, total=0, speed=None, eta=None, started_at=None, timestamp=None,
+                 finished=False, job_id=None):
+        """
+        初始化进度事件
+
+        Args:
+            downloaded: 已下载字节数
+            total: 总字节数（含估算），0表示未知
+            speed: 速度（字节/秒），None表示未知
+            eta: 剩余时间（秒），None表示未知
+            started_at: 本次下载开始的时间戳
+            timestamp: 事件产生的时间戳
+            finished: 是否已下载完成
+            job_id: 所属任务ID（由调度器填写）
+        """
+        self.job_id = job_id
+        self.downloaded = downloaded
+        self.total = total
+        self.speed = speed
+        self.eta = eta
+        self.started_at = started_at
+        self.timestamp = timestamp
+        self.finished = finished
+
+    @property
+    def percentage(self):
+        """进度百分比（0-100）"""
+        if self.finished:
+            return 100.0
+        if self.total > 0:
+            return min(100.0, self.downloaded / self.total * 100)
+        return 0.0
+
+    def speed_text(self):
+        """速度的显示文本"""
+        return '完成' if self.finished else format_speed(self.speed)
+
+    def eta_text(self):
+        """剩余时间的显示文本"""
+        return '完成' if self.finished else format_eta(self.eta)
+
+    def size_text(self):
+        """大小的显示文本（已下载 / 总大小）"""
+        if self.total > 0:
+            return f"{format_size(self.downloaded)} / {format_size(self.total)}"
+        return format_size(self.downloaded)
+
+    def to_tuple(self):
+        """转换为元组（跨进程传递）"""
+        return (self.downloaded, self.total, self.speed, self.eta, self.started_at, self.timestamp,
+                self.finished, self.job_id)
+
+    @classmethod
+    def from_tuple(cls, values):
+        """从 to_tuple 的结果还原"""
+        return cls(*values)
+
+    def __repr__(self):
+        return (f"ProgressEvent(job_id={self.job_id}, downloaded={self.downloaded}, total={self.total}, "
+                f"speed={self.speed}, eta={self.eta}, finished={self.finished})")
 
 
 class ProgressHandler:
-    """下载进度处理器"""
+    """下载进度处理器（各下载路径产生进度事件的统一入口）"""
 
     def __init__(self):
         self.progress_callback = None
+        self.reset()
 
     def set_callback(self, callback):
         """
         设置进度回调函数
 
         Args:
-            callback: 回调函数，接收参数 (downloaded_bytes, total_bytes, percentage, speed, eta)
+            callback: 回调函数，接收参数 (event: ProgressEvent)
         """
         self.progress_callback = callback
 
+    def reset(self):
+        """开始新的下载（重新计时和估算速度）"""
+        self.started_at = None
+        self._sample_time = None
+        self._sample_bytes = 0
+        self._speed = None
+
+    def report(self, downloaded, total=0, speed=None, eta=None, finished=False):
+        """
+        报告进度
+
+        Args:
+            downloaded: 已下载字节数
+            total: 总字节数（含估算），0表示未知
+            speed: 速度（字节/秒），None时根据已下载字节数的变化估算
+            eta: 剩余时间（秒），None时根据速度估算
+            finished: 是否已下载完成
+        """
+        if self.progress_callback is None:
+            return
+
+        now = time.time()
+        if self.started_at is None:
+            self.started_at = now
+        if speed is None:
+            speed = self._estimate_speed(now, downloaded)
+        if eta is None and speed and total > downloaded:
+            eta = (total - downloaded) / speed
+
+        self.progress_callback(ProgressEvent(
+            downloaded, total or 0, speed, eta, self.started_at, now, finished
+        ))
+
+    def _estimate_speed(self, now, downloaded):
+        """按采样间隔平滑估算速度（字节/秒）"""
+        if self._sample_time is None or downloaded < self._sample_bytes:
+            # 第一次报告，或开始下载另一个文件
+            self._sample_time = now
+            self._sample_bytes = downloaded
+            self._speed = None
+            return None
+
+        elapsed = now - self._sample_time
+        if elapsed >= SPEED_SAMPLE_INTERVAL:
+            current = (downloaded - self._sample_bytes) / elapsed
+            if self._speed is None:
+                self._speed = current
+            else:
+                self._speed = SPEED_SMOOTHING * current + (1 - SPEED_SMOOTHING) * self._speed
+            self._sample_time = now
+            self._sample_bytes = downloaded
+        return self._speed
+
     def progress_hook(self, d):
         """
         yt-dlp进度钩子函数
@@ -24,66 +218,10 @@ class ProgressHandler:
             d: yt-dlp进度字典
         """
         if d['status'] == 'downloading':
-            downloaded = d.get('downloaded_bytes', 0)
-            total = d.get('total_bytes') or d.get('total_bytes_estimate', 0)
-
-            # 计算进度百分比
-            if total > 0:
-                percentage = (downloaded / total) * 100
-            else:
-                percentage = 0
-
-            # 获取下载速度和ETA
-            speed = d.get('speed', 0)
-            eta = d.get('eta', 0)
-
-            # 格式化信息
-            speed_str = self._format_speed(speed)
-            eta_str = self._format_time(eta)
-            size_str = self._format_bytes(downloaded, total)
-
-            # 调用回调函数
-            if self.progress_callback:
-                self.progress_callback(downloaded, total, percentage, speed_str, eta_str, size_str)
+            total = d.get('total_bytes') or d.get('total_bytes_estimate') or 0
+            self.report(d.get('downloaded_bytes') or 0, total, d.get('speed'), d.get('eta'))
 
         elif d['status'] == 'finished':
             # 下载完成
-            if self.progress_callback:
-                self.progress_callback(0, 0, 100, '完成', '完成', '完成')
-
-    def _format_bytes(self, downloaded, total):
-        """格式化字节数"""
-        def format_size(bytes):
-            for unit in ['B', 'KB', 'MB', 'GB']:
-                if bytes < 1024.0:
-                    return f"{bytes:.2f} {unit}"
-                bytes /= 1024.0
-            return f"{bytes:.2f} TB"
-
-        if total > 0:
-            return f"{format_size(downloaded)} / {format_size(total)}"
-        return format_size(downloaded)
-
-    def _format_speed(self, speed):
-        """格式化下载速度"""
-        if speed is None or speed == 0:
-            return "N/A"
-
-        for unit in ['B/s', 'KB/s', 'MB/s', 'GB/s']:
-            if speed < 1024.0:
-                return f"{speed:.2f} {unit}"
-            speed /= 1024.0
-        return f"{speed:.2f} TB/s"
-
-    def _format_time(self, seconds):
-        """格式化时间（ETA）"""
-        if seconds == 0 or seconds is None:
-            return "N/A"
-
-        hours = int(seconds // 3600)
-        minutes = int((seconds % 3600) // 60)
-        secs = int(seconds % 60)
-
-        if hours > 0:
-            return f"{hours:02d}:{minutes:02d}:{secs:02d}"
-        return f"{minutes:02d}:{secs:02d}"
+            total = d.get('total_bytes') or d.get('downloaded_bytes') or 0
+            self.report(total, total, finished=True)
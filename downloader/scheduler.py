@@ -0,0 +1,387 @@
+"""多任务并发下载调度模块
+
+从持久化任务队列中领取任务，同时运行多个下载任务：
+每个任务使用独立的 VideoDownloader 实例（Cookie临时文件、进度回调互不干扰），
+同时受全局并发数和单主机并发数限制，连接数（分片并发）预算按任务槽位均分，
+每个任务在领取时确定自己的配额；
+启用多进程模式时任务在工作进程中执行（见 process_pool），调度和限流仍在本进程完成；
+多个节点共享同一任务数据库时，续约线程定期为运行中的任务续租，
+失去租约（被取消或被其他节点收回）的任务会被停止
+"""
+
+import threading
+import time
+from urllib.parse import urlparse
+from .job_queue import STATE_QUEUED, STATE_DONE, STATE_PAUSED
+from utils.logger import get_logger
+
+
+class _RunningJob:
+    """运行中的任务"""
+
+    def __init__(self, job, host, downloader):
+        self.job = job
+        self.host = host
+        self.downloader = downloader
+        self.last_progress_save = 0
+        # 下载已返回、正在记录结果
+        self.finished = False
+
+
+class DownloadScheduler:
+    """多任务并发下载调度器"""
+
+    def __init__(self, job_queue, max_workers=3, per_host_limit=2, max_connections=16, use_processes=False):
+        """
+        初始化调度器
+
+        Args:
+            job_queue: JobQueue 实例
+            max_workers: 同时运行的最大任务数
+            per_host_limit: 同一主机同时运行的最大任务数
+            max_connections: 所有任务共享的连接数（分片并发）预算
+            use_processes: 是否在工作进程中执行任务（多核并行，不受GIL限制）
+        """
+        self.logger = get_logger()
+        self.job_queue = job_queue
+        self.max_workers = max(1, max_workers)
+        self.per_host_limit = max(1, per_host_limit)
+        self.max_connections = max(1, max_connections)
+        self.use_processes = use_processes
+        self._process_executor = None
+
+        # 每个任务的下载器使用的设置
+        self.proxy = None
+        self.archive = None
+
+        # 回调
+        self.progress_callback = None   # (event: ProgressEvent，event.job_id 为任务ID)
+        self.job_started_callback = None   # (job)
+        self.job_finished_callback = None  # (job, result, state)，state 为 None 表示已取消
+
+        self.running = {}
+        self._condition = threading.Condition()
+        # 领取任务互斥（SQLite 领取在 _condition 之外进行，不阻塞进度回调）
+        self._claim_lock = threading.Lock()
+        self._threads = []
+        self._stop_event = threading.Event()
+        self._exit_when_idle = False
+
+    def set_proxy(self, proxy_url):
+        """
+        设置新任务使用的代理
+
+        Args:
+            proxy_url: 代理URL，None表示不使用代理
+        """
+        self.proxy = proxy_url
+
+    def set_archive(self, archive):
+        """
+        设置下载归档：已下载过的任务直接完成，不发起网络请求
+
+        Args:
+            archive: DownloadArchive 实例，None表示不使用归档
+        """
+        self.archive = archive
+
+    def start(self, exit_when_idle=False):
+        """
+        启动工作线程
+
+        Args:
+            exit_when_idle: 队列中没有可执行任务时是否退出（批量模式）；
+                            False表示一直等待新任务（GUI模式）
+        """
+        if self._threads:
+            return
+        self._exit_when_idle = exit_when_idle
+        self._stop_event.clear()
+        if self.use_processes and self._process_executor is None:
+            from .process_pool import ProcessJobExecutor
+            self._process_executor = ProcessJobExecutor(self.max_workers, progress_callback=self._on_progress)
+        self.logger.info(
+            f"启动下载调度器: 并发任务={self.max_workers}, 单主机={self.per_host_limit}, "
+            f"连接预算={self.max_connections}, 执行方式={'多进程' if self.use_processes else '多线程'}"
+        )
+        self.job_queue.register_node(self.max_workers)
+        for index in range(self.max_workers):
+            thread = threading.Thread(target=self._worker, name=f"scheduler-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        threading.Thread(target=self._lease_loop, name='scheduler-lease', daemon=True).start()
+
+    def notify(self):
+        """通知工作线程有新任务加入队列"""
+        with self._condition:
+            self._condition.notify_all()
+
+    def stop(self):
+        """停止领取新任务（运行中的任务会完成）"""
+        self._stop_event.set()
+        self.notify()
+
+    def join(self, timeout=None):
+        """
+        等待所有工作线程退出
+
+        Args:
+            timeout: 超时时间（秒），None表示一直等待
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        for thread in self._threads:
+            remaining = deadline - time.monotonic() if deadline is not None else None
+            thread.join(remaining)
+        self._threads = [thread for thread in self._threads if thread.is_alive()]
+        if not self._threads and self._process_executor is not None:
+            self._process_executor.shutdown()
+            self._process_executor = None
+
+    def is_busy(self):
+        """是否有任务正在运行"""
+        with self._condition:
+            return bool(self.running)
+
+    def running_job_ids(self):
+        """
+        获取正在运行的任务ID
+
+        Returns:
+            list: 任务ID列表
+        """
+        with self._condition:
+            return list(self.running)
+
+    def cancel(self, job_id):
+        """
+        取消任务（排队中的任务直接取消，运行中的任务通知其下载器停止）
+
+        Args:
+            job_id: 任务ID
+
+        Returns:
+            bool: 是否取消成功
+        """
+        cancelled = self.job_queue.cancel(job_id)
+        with self._condition:
+            running = self.running.get(job_id)
+        if running and cancelled:
+            self._stop_running(running)
+        if cancelled:
+            self.logger.info(f"已取消下载任务 #{job_id}")
+        return cancelled
+
+    def pause(self, job_id):
+        """
+        暂停任务
+
+        运行中的任务立即停止下载，释放的任务槽位和连接配额马上分给其他任务；
+        部分下载的文件和解析结果保留，恢复后从中断处继续
+
+        Args:
+            job_id: 任务ID
+
+        Returns:
+            bool: 是否暂停成功
+        """
+        paused = self.job_queue.pause(job_id)
+        with self._condition:
+            running = self.running.get(job_id)
+        if running and paused:
+            self._stop_running(running)
+        if paused:
+            self.logger.info(f"已暂停下载任务 #{job_id}")
+        return paused
+
+    def resume(self, job_id):
+        """
+        恢复已暂停的任务
+
+        Args:
+            job_id: 任务ID
+
+        Returns:
+            bool: 是否恢复成功
+        """
+        resumed = self.job_queue.resume(job_id)
+        if resumed:
+            self.logger.info(f"已恢复下载任务 #{job_id}")
+            self.notify()
+        return resumed
+
+    def _stop_running(self, running):
+        """停止运行中任务的下载（线程模式取消下载器，多进程模式通知工作进程）"""
+        running.downloader.cancel_download()
+        if self._process_executor is not None:
+            self._process_executor.cancel(running.job['id'])
+
+    def _host_of(self, url):
+        """获取URL的主机名"""
+        return (urlparse(url).hostname or '').lower()
+
+    def _host_available(self, job):
+        """任务所属主机的运行任务数是否未达到上限"""
+        host = self._host_of(job['url'])
+        with self._condition:
+            return sum(1 for running in self.running.values() if running.host == host) < self.per_host_limit
+
+    def _connection_share(self):
+        """
+        每个任务的连接数配额
+
+        yt-dlp 的分片并发数在下载开始时确定，运行中无法调整，所以配额在领取任务时固定，
+        并按任务槽位数（而不是当前运行任务数）均分：所有槽位都在运行时连接总数也不超过预算。
+        M3U8 和直接MP4 下载按顺序使用单个连接，不会超过配额
+        """
+        return max(1, self.max_connections // self.max_workers)
+
+    def _create_downloader(self, job_id):
+        """为任务创建独立的下载器实例"""
+        from .video_downloader import VideoDownloader
+
+        downloader = VideoDownloader()
+        if self.proxy:
+            downloader.set_proxy(self.proxy)
+        downloader.archive = self.archive
+
+        def progress(event):
+            event.job_id = job_id
+            self._on_progress(event)
+
+        downloader.set_progress_callback(progress)
+        return downloader
+
+    def _claim(self):
+        """
+        领取一个可执行的任务并登记为运行中
+
+        Returns:
+            _RunningJob: 运行中的任务，没有可执行任务返回None
+        """
+        # 领取互斥保证主机并发判断和登记之间不会有其他线程领取同一主机的任务
+        with self._claim_lock:
+            job = self.job_queue.claim_next(accept=self._host_available)
+            if job is None:
+                return None
+
+            downloader = self._create_downloader(job['id'])
+            downloader.concurrent_fragments = self._connection_share()
+            running = _RunningJob(job, self._host_of(job['url']), downloader)
+            with self._condition:
+                self.running[job['id']] = running
+            return running
+
+    def _release(self, job_id):
+        """任务结束，释放主机槽位"""
+        with self._condition:
+            self.running.pop(job_id, None)
+            self._condition.notify_all()
+
+    def _worker(self):
+        """工作线程：循环领取并执行任务"""
+        while not self._stop_event.is_set():
+            running = self._claim()
+            if running is None:
+                with self._condition:
+                    # 队列中还有任务但主机已满时，等待运行中的任务结束
+                    if self._exit_when_idle and not self.running \
+                            and not self.job_queue.counts().get(STATE_QUEUED):
+                        break
+                    self._condition.wait(timeout=1)
+                continue
+
+            try:
+                self._run_job(running)
+            finally:
+                self._release(running.job['id'])
+
+        self.logger.info(f"调度器工作线程退出: {threading.current_thread().name}")
+
+    def _run_job(self, running):
+        """执行一个下载任务并记录结果"""
+        job = running.job
+        options = job['options']
+        self.logger.info(
+            f"开始执行下载任务 #{job['id']} (主机: {running.host}, 连接数: {running.downloader.concurrent_fragments})"
+        )
+        if self.job_started_callback:
+            self.job_started_callback(job)
+
+        try:
+            if self._process_executor is not None:
+                # 工作进程中创建自己的下载器，连接配额按领取时的份额传入
+                settings = {'proxy': self.proxy, 'concurrent_fragments': running.downloader.concurrent_fragments,
+                            'archive': self.archive.path if self.archive else None}
+                result = self._process_executor.submit(job, settings).result()
+            else:
+                result = running.downloader.download_video(
+                    job['url'], job['output_path'] or '.', options.get('quality', 'best'),
+                    options.get('video_info'), cookie=options.get('cookie'),
+                    resume_info=options.get('resume_info')
+                )
+        except Exception as e:
+            self.logger.error(f"下载任务 #{job['id']} 异常: {str(e)}", exc_info=True)
+            result = {'success': False, 'error': f"下载失败: {str(e)}"}
+        running.finished = True
+
+        if result.get('cancelled'):
+            # 任务状态已由取消/暂停操作更新（或租约已被其他节点收回）
+            state = None
+            current = self.job_queue.get(job['id'])
+            if current and current['state'] == STATE_PAUSED:
+                state = STATE_PAUSED
+                if result.get('resume_info'):
+                    self.job_queue.save_resume_info(job['id'], result['resume_info'])
+        elif result.get('success'):
+            state = STATE_DONE if self.job_queue.complete(job['id'], result.get('filename')) else None
+        else:
+            state = self.job_queue.fail(job['id'], result.get('error', '未知错误'))
+
+        if self.job_finished_callback:
+            self.job_finished_callback(job, result, state)
+
+    def _lease_loop(self):
+        """
+        续约线程：每三分之一个租约周期为运行中的任务续租一次
+
+        停止领取新任务后仍为运行中的任务续租，直到它们全部结束，
+        否则运行时间超过租约的任务会被其他节点收回并重复下载
+        """
+        interval = self.job_queue.lease_seconds / 3
+        while True:
+            with self._condition:
+                self._condition.wait_for(self._lease_loop_done, timeout=interval)
+                if self._lease_loop_done():
+                    break
+                running = dict(self.running)
+            try:
+                held = self.job_queue.renew_leases(list(running))
+            except Exception as e:
+                self.logger.warning(f"任务租约续约失败: {str(e)}")
+                continue
+            for job_id, running_job in running.items():
+                if job_id not in held and not running_job.finished:
+                    self.logger.warning(f"下载任务 #{job_id} 的租约已失效（已取消或被其他节点收回），停止下载")
+                    self._stop_running(running_job)
+
+    def _lease_loop_done(self):
+        """续约线程是否可以退出：没有运行中的任务，且调度器已停止或工作线程已全部退出（调用方需持有锁）"""
+        if self.running:
+            return False
+        return self._stop_event.is_set() or not any(thread.is_alive() for thread in self._threads)
+
+    def _on_progress(self, event):
+        """任务进度回调：每秒最多记录一次到任务队列，并转发给调用方"""
+        job_id = event.job_id
+        with self._condition:
+            running = self.running.get(job_id)
+        if running is None or running.finished:
+            # 任务结束后迟到的进度（多进程模式下进度和结果经由不同通道返回）不再转发
+            return
+        now = time.monotonic()
+        if now - running.last_progress_save >= 1:
+            running.last_progress_save = now
+            self.job_queue.update_progress(job_id, event.downloaded, event.total)
+
+        if self.progress_callback:
+            self.progress_callback(event)
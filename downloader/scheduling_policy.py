@@ -0,0 +1,188 @@
+"""任务调度策略模块
+
+决定任务队列中排队任务的领取顺序：
+- fifo: 按加入顺序
+- priority: 显式优先级高的先执行
+- sjf: 预估体积小的先执行（体积来自格式元数据或播放列表条目数）
+- deadline: 截止时间早的先执行
+
+除 fifo 外的策略都带有老化机制：任务等待越久排序越靠前，避免大任务/低优先级任务饿死
+"""
+
+import math
+import time
+
+
+# 体积估算的默认值
+# 播放列表每个条目的平均体积（无法逐条解析时使用）
+AVERAGE_ENTRY_SIZE = 100 * 1024 * 1024
+# M3U8 每个TS片段的平均体积
+AVERAGE_SEGMENT_SIZE = 1024 * 1024
+# 只知道时长时使用的平均码率（字节/秒，约2Mbps）
+AVERAGE_BYTES_PER_SECOND = 256 * 1024
+
+
+def estimate_job_size(video_info, quality='best'):
+    """
+    根据解析结果估算任务的下载体积
+
+    Args:
+        video_info: get_video_info 返回的视频信息字典
+        quality: 下载质量
+
+    Returns:
+        int: 估算的字节数，无法估算返回0
+    """
+    if not video_info:
+        return 0
+
+    if video_info.get('is_playlist'):
+        count = video_info.get('playlist_count') or len(video_info.get('preview_entries', []))
+        return count * AVERAGE_ENTRY_SIZE
+
+    if video_info.get('is_m3u8'):
+        m3u8_info = video_info.get('m3u8_info') or {}
+        if m3u8_info.get('estimated_size'):
+            # 下载预检时按抽样片段大小和 #EXTINF 时长估算的大小（恢复的任务）
+            return m3u8_info['estimated_size']
+        if m3u8_info.get('duration'):
+            return int(m3u8_info['duration'] * AVERAGE_BYTES_PER_SECOND)
+        return len(m3u8_info.get('ts_list', [])) * AVERAGE_SEGMENT_SIZE
+
+    sizes = [fmt.get('estimated_size') or fmt.get('filesize') or 0 for fmt in video_info.get('formats', [])]
+    sizes = [size for size in sizes if size]
+    if sizes:
+        # 省流量模式会选择体积更小的编码，其余模式按最大格式估算
+        return min(sizes) if quality in ('economy', 'best-audio') else max(sizes)
+
+    duration = video_info.get('duration') or 0
+    return int(duration * AVERAGE_BYTES_PER_SECOND)
+
+
+class SchedulingPolicy:
+    """调度策略基类：排序键越小越先执行"""
+
+    name = 'fifo'
+
+    def __init__(self, aging_seconds=600):
+        """
+        初始化调度策略
+
+        Args:
+            aging_seconds: 老化周期（秒），任务每等待一个周期排序上前进一级
+        """
+        self.aging_seconds = max(1, aging_seconds)
+
+    def waited_periods(self, job, now):
+        """任务已等待的老化周期数"""
+        return max(0.0, now - job['created_at']) / self.aging_seconds
+
+    def sort_key(self, job, now, context):
+        """
+        计算任务的排序键
+
+        Args:
+            job: 任务字典
+            now: 当前时间戳
+            context: 本次排序的上下文（如已知体积的中位数）
+
+        Returns:
+            tuple: 排序键
+        """
+        return (job['id'],)
+
+    def order(self, jobs, now=None):
+        """
+        按策略对排队中的任务排序
+
+        Args:
+            jobs: 任务字典列表
+            now: 当前时间戳，None表示使用当前时间
+
+        Returns:
+            list: 排序后的任务列表
+        """
+        now = time.time() if now is None else now
+        context = self.build_context(jobs)
+        return sorted(jobs, key=lambda job: self.sort_key(job, now, context))
+
+    def build_context(self, jobs):
+        """构建排序上下文"""
+        return {}
+
+
+class FifoPolicy(SchedulingPolicy):
+    """先进先出"""
+
+    name = 'fifo'
+
+
+class PriorityPolicy(SchedulingPolicy):
+    """显式优先级（数值越大越先执行），每等待一个老化周期优先级加1"""
+
+    name = 'priority'
+
+    def sort_key(self, job, now, context):
+        effective = (job.get('priority') or 0) + self.waited_periods(job, now)
+        return (-effective, job['id'])
+
+
+class ShortestJobFirstPolicy(SchedulingPolicy):
+    """
+    预估体积最小的先执行
+
+    未知体积的任务按已知体积的中位数处理；每等待一个老化周期，有效体积减半，
+    大任务最终也会被调度（按 log2(体积) - 等待周期数 比较，等待很久的任务不会溢出）
+    """
+
+    name = 'sjf'
+
+    def build_context(self, jobs):
+        sizes = sorted(job['size_estimate'] for job in jobs if job.get('size_estimate'))
+        return {'median_size': sizes[len(sizes) // 2] if sizes else 0}
+
+    def sort_key(self, job, now, context):
+        size = job.get('size_estimate') or context['median_size']
+        # 等价于 size / 2**periods，但周期数很大时不会溢出
+        effective = (math.log2(size) if size > 0 else float('-inf')) - self.waited_periods(job, now)
+        return (effective, job['id'])
+
+
+class DeadlinePolicy(SchedulingPolicy):
+    """
+    最早截止时间优先
+
+    没有截止时间的任务视为截止时间为 加入时间 + 两个老化周期，保证最终会被调度
+    """
+
+    name = 'deadline'
+
+    def sort_key(self, job, now, context):
+        deadline = job.get('deadline') or job['created_at'] + 2 * self.aging_seconds
+        return (deadline, job['id'])
+
+
+# 策略名称 -> 策略类
+POLICIES = {
+    policy.name: policy
+    for policy in (FifoPolicy, PriorityPolicy, ShortestJobFirstPolicy, DeadlinePolicy)
+}
+
+
+def get_policy(name, aging_seconds=600):
+    """
+    按名称创建调度策略
+
+    Args:
+        name: 策略名称（fifo/priority/sjf/deadline）
+        aging_seconds: 老化周期（秒）
+
+    Returns:
+        SchedulingPolicy: 策略实例
+
+    Raises:
+        ValueError: 未知的策略名称
+    """
+    if name not in POLICIES:
+        raise ValueError(f"未知的调度策略: {name}（可选: {', '.join(POLICIES)}）")
+    return POLICIES[name](aging_seconds)
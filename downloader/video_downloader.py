@@ -1,11 +1,22 @@
 """视频下载器核心模块"""
 
 import yt_dlp
+import copy
 import os
-import re
 import time
+import queue
+import threading
 from .progress_handler import ProgressHandler
+from .cancellation import CancelToken, DownloadCancelled
+from .download_archive import extractor_id_for_url, FILE_EXTRACTOR, M3U8_EXTRACTOR
+from .extraction_router import get_router, M3U8_STRATEGIES, STRATEGY_YTDLP
 from utils.logger import get_logger
+from utils.url_validator import URLValidator
+from utils.single_flight import SingleFlight
+
+
+# 所有下载器共享的请求合并器：多个任务同时解析同一视频时只解析一次，各自得到独立副本
+_info_flight = SingleFlight(retain=10)
 
 
 class VideoDownloader:
@@ -19,44 +30,72 @@ class VideoDownloader:
         # 延迟导入M3U8Downloader，避免循环导入
         self._m3u8_downloader = None
 
+        # 解析策略路由表（全局共享）
+        self.router = get_router()
+        self.url_validator = URLValidator()
+
         # 临时Cookie文件路径（用于清理）
         self._temp_cookie_file = None
 
         # 代理设置
         self.proxy = None
 
+        # 播放列表分页大小（扁平枚举时每页条目数）
+        self.playlist_page_size = 50
+
+        # 格式选择约束（None表示使用固定的质量映射）
+        self.format_constraints = None
+
+        # yt-dlp 高吞吐下载参数（DASH/HLS 分片并发下载）
+        # 逐个下载分片时每个分片的往返延迟都会浪费带宽，多路并发可以掩盖延迟；
+        # 并发过高容易触发网站限流，默认值可通过 set_fragment_options 按网站调整
+        self.concurrent_fragments = 8
+        # HTTP分块大小：10MB，避免 YouTube 对大范围请求限速，同时减少请求次数
+        self.http_chunk_size = 10 * 1024 * 1024
+        # 分片重试次数（带指数退避）
+        self.fragment_retries = 10
+        # 整个文件请求的重试次数，None表示使用 yt-dlp 的默认值
+        self.retries = None
+        # 分片用完重试次数后是否跳过该分片继续下载（会生成缺少片段的文件）；
+        # 默认不跳过，下载失败后由任务重试从已下载的部分续传
+        self.skip_unavailable_fragments = False
+
+        # 视频+音频格式是否并行下载两路流（需要ffmpeg）
+        self.parallel_streams = True
+
+        # 取消令牌（cancel_download 触发，各下载路径在检查点响应）
+        self.cancel_token = CancelToken()
+
+        # 最近一次下载的解析结果（暂停/取消后恢复下载时复用，无需重新解析）
+        self.resume_info = None
+
+        # 下载归档（DownloadArchive），设置后跳过已下载的视频并记录新下载的视频
+        self.archive = None
+
     @property
     def m3u8_downloader(self):
         """延迟加载M3U8下载器"""
         if self._m3u8_downloader is None:
             from .m3u8_downloader import M3U8Downloader
             self._m3u8_downloader = M3U8Downloader()
-            # 设置相同的进度回调
+            # 设置相同的进度回调（M3U8下载器直接产生字节级进度事件）
             if self.progress_handler.progress_callback:
-                self._m3u8_downloader.set_progress_callback(self._wrap_m3u8_callback())
+                self._m3u8_downloader.set_progress_callback(self.progress_handler.progress_callback)
+        # 与本下载器共用取消令牌
+        self._m3u8_downloader.cancel_token = self.cancel_token
         return self._m3u8_downloader
 
-    def _wrap_m3u8_callback(self):
-        """包装M3U8进度回调以适配GUI格式"""
-        def callback(downloaded, total, percentage, speed, eta, size):
-            if self.progress_handler.progress_callback:
-                # M3U8下载器返回的是片段数，转换为字节格式
-                self.progress_handler.progress_callback(
-                    downloaded * 1024 * 1024,  # 假设每个片段1MB
-                    total * 1024 * 1024,
-                    percentage,
-                    speed,
-                    eta,
-                    f"{downloaded}/{total} 片段"
-                )
-        return callback
+    def _ytdlp_progress_hook(self, d):
+        """yt-dlp进度钩子：同时是取消检查点（抛出的异常会中止 yt-dlp 的下载）"""
+        self.cancel_token.raise_if_cancelled()
+        self.progress_handler.progress_hook(d)
 
     def set_progress_callback(self, callback):
         """
-       设置下载进度回调函数
+        设置下载进度回调函数
 
         Args:
-            callback: 回调函数
+            callback: 回调函数，接收参数 (event: ProgressEvent)
         """
         self.progress_handler.set_callback(callback)
 
@@ -97,9 +136,75 @@ class VideoDownloader:
 
         return self.proxy
 
+    def set_fragment_options(self, concurrent_fragments=None, http_chunk_size=None, fragment_retries=None,
+                             retries=None, skip_unavailable_fragments=None):
+        """
+        设置yt-dlp分片下载参数
+
+        Args:
+            concurrent_fragments: 并发下载的分片数，默认8
+            http_chunk_size: HTTP分块大小（字节），默认10MB，0表示不分块
+            fragment_retries: 分片重试次数，默认10
+            retries: 整个文件请求的重试次数，默认使用 yt-dlp 的设置
+            skip_unavailable_fragments: 分片多次重试仍失败时是否跳过（生成缺少片段的文件），默认False
+        """
+        if concurrent_fragments is not None:
+            self.concurrent_fragments = max(1, int(concurrent_fragments))
+        if http_chunk_size is not None:
+            self.http_chunk_size = max(0, int(http_chunk_size))
+        if fragment_retries is not None:
+            self.fragment_retries = max(0, int(fragment_retries))
+        if retries is not None:
+            self.retries = max(0, int(retries))
+        if skip_unavailable_fragments is not None:
+            self.skip_unavailable_fragments = bool(skip_unavailable_fragments)
+        self.logger.info(
+            f"已设置分片下载参数: 并发={self.concurrent_fragments}, "
+            f"分块={self.http_chunk_size / (1024 * 1024):.1f}MB, 分片重试={self.fragment_retries}, "
+            f"请求重试={self.retries if self.retries is not None else '默认'}, "
+            f"跳过失败分片={'是' if self.skip_unavailable_fragments else '否'}"
+        )
+
+    def _apply_throughput_options(self, ydl_opts):
+        """
+        将高吞吐下载参数添加到yt-dlp选项
+
+        Args:
+            ydl_opts: yt-dlp选项字典（原地修改）
+
+        Returns:
+            dict: 修改后的选项字典
+        """
+        ydl_opts['concurrent_fragment_downloads'] = self.concurrent_fragments
+        ydl_opts['fragment_retries'] = self.fragment_retries
+        if self.retries is not None:
+            ydl_opts['retries'] = self.retries
+        ydl_opts['skip_unavailable_fragments'] = self.skip_unavailable_fragments
+        # 分片重试使用指数退避（1s, 2s, 4s... 最大10秒）
+        ydl_opts['retry_sleep_functions'] = {'fragment': lambda n: min(2 ** n, 10)}
+        if self.http_chunk_size:
+            ydl_opts['http_chunk_size'] = self.http_chunk_size
+        return ydl_opts
+
+    def set_format_constraints(self, constraints):
+        """
+        设置格式选择约束
+
+        设置后，下载视频时会先获取完整格式列表，按约束选择满足画质下限且字节最少的格式
+
+        Args:
+            constraints: FormatConstraints 实例或等价的字典，None表示取消约束
+        """
+        from .format_selector import FormatConstraints
+
+        if constraints is not None and not isinstance(constraints, FormatConstraints):
+            constraints = FormatConstraints.from_dict(constraints)
+        self.format_constraints = constraints
+        self.logger.info(f"已设置格式约束: {constraints}")
+
     def get_video_info(self, url, use_m3u8_fallback=True, cookie=None):
         """
-        获取视频信息
+        获取视频信息（相同URL、Cookie和代理的并发请求合并为一次解析）
 
         Args:
             url: 视频URL
@@ -115,9 +220,19 @@ class VideoDownloader:
                 'uploader': 上传者,
                 'view_count': 观看次数,
                 'formats': 可用格式列表,
-                'is_m3u8': 是否为M3U8视频
+                'is_m3u8': 是否为M3U8视频,
+                'is_playlist': 是否为播放列表/频道
             }
         """
+        key = ('info', url, use_m3u8_fallback, cookie, self.proxy, self.playlist_page_size)
+        info, shared = _info_flight.do(key, lambda: self._get_video_info(url, use_m3u8_fallback, cookie))
+        if shared:
+            self.logger.info(f"复用其他任务的解析结果: {url}")
+        # 调用方可能修改返回的字典，每次返回独立副本
+        return copy.deepcopy(info)
+
+    def _get_video_info(self, url, use_m3u8_fallback, cookie):
+        """获取视频信息（实际解析）"""
         self.logger.info(f"开始解析视频URL: {url}")
         if cookie:
             self.logger.info("使用自定义Cookie")
@@ -130,18 +245,36 @@ class VideoDownloader:
         ydl_opts = {
             'quiet': True,
             'no_warnings': True,
-            'extract_flat': False,
+            # 播放列表只扁平枚举第一页用于预览，条目的完整解析推迟到下载时
+            'extract_flat': 'in_playlist',
+            'lazy_playlist': True,
+            'playlistend': self.playlist_page_size,
         }
 
+        # 路由表命中M3U8策略（或已知M3U8站点）时优先走M3U8解析，跳过必然失败的yt-dlp尝试
+        route = self.router.preferred_strategy(url)
+        m3u8_error = None
+        if use_m3u8_fallback and self._prefers_m3u8(url, route):
+            self.logger.info(f"优先使用M3U8解析 (路由策略: {route or '已知M3U8站点'})")
+            try:
+                return self._get_m3u8_video_info(url, cookie=cookie, preferred_strategy=route)
+            except Exception as e:
+                m3u8_error = e
+                self.logger.warning(f"M3U8解析失败，回退到yt-dlp: {str(e)}")
+
         # 如果提供了Cookie，添加到yt-dlp选项
         if cookie:
             ydl_opts['cookiefile'] = self._create_cookie_file(cookie)
             self.logger.info("已将Cookie添加到yt-dlp请求")
 
-        # 首先尝试使用yt-dlp
+        # 尝试使用yt-dlp
         try:
             with yt_dlp.YoutubeDL(ydl_opts) as ydl:
                 info = ydl.extract_info(url, download=False)
+                self.router.record_success(url, STRATEGY_YTDLP)
+
+                if info.get('_type') in ('playlist', 'multi_video'):
+                    return self._build_playlist_info(info)
 
                 # 提取视频信息
                 video_info = {
@@ -157,34 +290,18 @@ class VideoDownloader:
 
                 self.logger.info(f"成功获取视频信息: {video_info['title']}")
 
-                # 提取可用格式（只取主要的几种）
-                formats = info.get('formats', [])
-                seen_resolutions = set()
-
-                for fmt in formats:
-                    # 过滤掉只有视频没有音频的格式
-                    if fmt.get('vcodec') == 'none':
-                        continue
-
-                    resolution = fmt.get('resolution', 'unknown')
-                    ext = fmt.get('ext', 'mp4')
-                    filesize = fmt.get('filesize', 0)
-
-                    # 避免重复分辨率
-                    if resolution not in seen_resolutions:
-                        video_info['formats'].append({
-                            'format_id': fmt.get('format_id'),
-                            'ext': ext,
-                            'resolution': resolution,
-                            'filesize': filesize,
-                            'quality': fmt.get('format_note', 'unknown')
-                        })
-                        seen_resolutions.add(resolution)
+                # 提取可用格式（保留编码、码率和估算大小）
+                video_info['formats'] = self._summarize_formats(info)
 
                 return video_info
 
         except Exception as e:
             self.logger.warning(f"yt-dlp解析失败: {str(e)}")
+            self.router.record_failure(url, STRATEGY_YTDLP)
+
+            if m3u8_error is not None:
+                # M3U8已经优先尝试过
+                raise Exception(f"获取视频信息失败:\nyt-dlp错误: {str(e)}\nM3U8错误: {str(m3u8_error)}")
 
             # 尝试使用M3U8下载器作为备用方案
             if use_m3u8_fallback:
@@ -201,7 +318,152 @@ class VideoDownloader:
             if cookie:
                 self._cleanup_cookie_file()
 
-    def _get_m3u8_video_info(self, url, cookie=None):
+    def _summarize_formats(self, info):
+        """
+        从yt-dlp信息中整理可用格式列表
+
+        按 分辨率+编码 去重，保留编码、码率和（估算的）文件大小，
+        同一分辨率下不同编码的格式都会保留，供格式选择使用
+
+        Args:
+            info: yt-dlp信息字典
+
+        Returns:
+            list: 格式列表
+        """
+        from .format_selector import FormatSelector, codec_family
+
+        selector = FormatSelector()
+        duration = info.get('duration') or 0
+        formats = []
+        seen = set()
+
+        for fmt in info.get('formats', []):
+            # 过滤掉纯音频格式
+            if fmt.get('vcodec') == 'none':
+                continue
+
+            resolution = fmt.get('resolution', 'unknown')
+            codec = codec_family(fmt.get('vcodec'))
+
+            # 避免重复的 分辨率+编码 组合
+            if (resolution, codec) in seen:
+                continue
+            seen.add((resolution, codec))
+
+            formats.append({
+                'format_id': fmt.get('format_id'),
+                'ext': fmt.get('ext', 'mp4'),
+                'resolution': resolution,
+                'height': fmt.get('height'),
+                'vcodec': fmt.get('vcodec'),
+                'acodec': fmt.get('acodec'),
+                'tbr': fmt.get('tbr'),
+                'filesize': fmt.get('filesize', 0),
+                'estimated_size': selector.estimate_size(fmt, duration),
+                'quality': fmt.get('format_note', 'unknown')
+            })
+
+        return formats
+
+    def _build_playlist_info(self, info):
+        """
+        将yt-dlp扁平播放列表结果转换为统一的视频信息格式
+
+        Args:
+            info: yt-dlp返回的播放列表信息字典（只包含第一页条目）
+
+        Returns:
+            dict: 播放列表信息字典
+        """
+        preview_entries = [entry for entry in (info.get('entries') or []) if entry]
+        playlist_count = info.get('playlist_count') or 0
+
+        video_info = {
+            'title': info.get('title', '未知播放列表'),
+            'duration': 0,
+            'thumbnail': '',
+            'uploader': info.get('uploader') or info.get('channel') or '未知上传者',
+            'view_count': info.get('view_count') or 0,
+            'description': info.get('description') or '',
+            'formats': [],
+            'is_m3u8': False,
+            'is_playlist': True,
+            'playlist_count': playlist_count,
+            'preview_entries': [
+                {'id': entry.get('id'), 'title': entry.get('title') or entry.get('id')}
+                for entry in preview_entries
+            ]
+        }
+
+        count_str = playlist_count if playlist_count else f"{len(preview_entries)}+"
+        self.logger.info(f"成功获取播放列表信息: {video_info['title']} ({count_str} 个条目)")
+        return video_info
+
+    def _prefers_m3u8(self, url, route):
+        """
+        判断是否应优先使用M3U8解析
+
+        Args:
+            url: 视频URL
+            route: 路由表中的首选策略
+
+        Returns:
+            bool: 路由表命中M3U8策略，或无记录但属于已知M3U8站点
+        """
+        if route in M3U8_STRATEGIES:
+            return True
+        return route is None and (self.url_validator.is_m3u8_page(url) or self.url_validator.is_m3u8_url(url))
+
+    def _parse_m3u8(self, url, preferred_strategy=None):
+        """
+        使用M3U8下载器解析URL，并将结果记录到路由表
+
+        Args:
+            url: 视频页面URL或M3U8 URL
+            preferred_strategy: 可选的首选策略
+
+        Returns:
+            dict: M3U8信息字典
+
+        Raises:
+            DirectMP4UrlException: 页面中找到了直接MP4 URL
+        """
+        from .m3u8_downloader import DirectMP4UrlException
+
+        if preferred_strategy not in M3U8_STRATEGIES:
+            preferred_strategy = None
+
+        try:
+            # 判断是直接的M3U8 URL还是包含M3U8视频的页面
+            if '.m3u8' in url.lower():
+                # 直接的M3U8 URL
+                m3u8_info = self.m3u8_downloader.parse_m3u8_direct(url)
+            else:
+                # 从页面解析 - 不传递video_id，让parse_m3u8_from_url按策略链尝试
+                # 路由表中的首选策略会被提前尝试
+                m3u8_info = self.m3u8_downloader.parse_m3u8_from_url(
+                    url, video_id=None, preferred_strategy=preferred_strategy
+                )
+        except DirectMP4UrlException as mp4_ex:
+            strategy = mp4_ex.strategy
+            self.router.record_success(url, strategy)
+            if preferred_strategy and preferred_strategy != strategy:
+                self.router.record_failure(url, preferred_strategy)
+            raise
+        except Exception:
+            if preferred_strategy:
+                self.router.record_failure(url, preferred_strategy)
+            raise
+
+        strategy = m3u8_info.get('strategy')
+        if strategy:
+            self.router.record_success(url, strategy)
+        if preferred_strategy and preferred_strategy != strategy:
+            self.router.record_failure(url, preferred_strategy)
+        return m3u8_info
+
+    def _get_m3u8_video_info(self, url, cookie=None, preferred_strategy=None):
         """使用M3U8下载器获取视频信息（增强错误处理）"""
         self.logger.info(f"使用M3U8方式解析: {url}")
 
@@ -211,19 +473,13 @@ class VideoDownloader:
             self.logger.info("已将Cookie设置到M3U8下载器")
 
         try:
-            # 判断是直接的M3U8 URL还是包含M3U8视频的页面
-            if '.m3u8' in url.lower():
-                # 直接的M3U8 URL
-                m3u8_info = self.m3u8_downloader.parse_m3u8_direct(url)
-            else:
-                # 从页面解析 - 不传递video_id，让parse_m3u8_from_url自己按顺序尝试
-                # 这样它会先尝试提取直接MP4 URL，然后再尝试其他方法
-                m3u8_info = self.m3u8_downloader.parse_m3u8_from_url(url, video_id=None)
+            m3u8_info = self._parse_m3u8(url, preferred_strategy=preferred_strategy)
 
             # 转换为统一格式
+            estimated_size = m3u8_info.get('estimated_size') or 0
             return {
                 'title': m3u8_info.get('title', 'M3U8视频'),
-                'duration': 0,
+                'duration': m3u8_info.get('duration') or 0,
                 'thumbnail': '',
                 'uploader': 'M3U8视频流',
                 'view_count': 0,
@@ -233,6 +489,7 @@ class VideoDownloader:
                     'ext': 'mp4',
                     'resolution': 'unknown',
                     'filesize': 0,
+                    'estimated_size': estimated_size,
                     'quality': 'M3U8流'
                 }],
                 'is_m3u8': True,
@@ -329,26 +586,7 @@ class VideoDownloader:
                 self.logger.info(f"成功获取直接MP4视频信息: {video_info['title']}")
 
                 # 提取可用格式
-                formats = info.get('formats', [])
-                seen_resolutions = set()
-
-                for fmt in formats:
-                    if fmt.get('vcodec') == 'none':
-                        continue
-
-                    resolution = fmt.get('resolution', 'unknown')
-                    ext = fmt.get('ext', 'mp4')
-                    filesize = fmt.get('filesize', 0)
-
-                    if resolution not in seen_resolutions:
-                        video_info['formats'].append({
-                            'format_id': fmt.get('format_id'),
-                            'ext': ext,
-                            'resolution': resolution,
-                            'filesize': filesize,
-                            'quality': fmt.get('format_note', 'unknown')
-                        })
-                        seen_resolutions.add(resolution)
+                video_info['formats'] = self._summarize_formats(info)
 
                 return video_info
 
@@ -377,7 +615,7 @@ class VideoDownloader:
             if cookie:
                 self._cleanup_cookie_file()
 
-    def download_video(self, url, output_path='.', quality='best', video_info=None, cookie=None):
+    def download_video(self, url, output_path='.', quality='best', video_info=None, cookie=None, resume_info=None):
         """
         下载视频
 
@@ -387,16 +625,43 @@ class VideoDownloader:
             quality: 视频质量 (best/worst/best[ext]/worst[ext])
             video_info: 可选的视频信息（用于M3U8下载）
             cookie: 可选的Cookie字符串
+            resume_info: 可选的恢复信息（上次暂停时结果中的 resume_info），提供时跳过重新解析
 
         Returns:
-            dict: 下载结果
+            dict: 下载结果（被取消时包含 'cancelled': True 和用于恢复的 'resume_info'）
         """
+        self.resume_info = None
+        try:
+            return self._download_video(url, output_path, quality, video_info, cookie, resume_info)
+        except DownloadCancelled:
+            # 已下载的部分保留在磁盘上（.part 文件、片段临时文件夹），重新下载时续传
+            self.logger.info(f"下载已取消: {url}")
+            return {
+                'success': False,
+                'cancelled': True,
+                'error': '下载已取消',
+                'resume_info': self.resume_info
+            }
+
+    def _download_video(self, url, output_path, quality, video_info, cookie, resume_info=None):
+        """下载视频（取消时抛出 DownloadCancelled）"""
+        self.progress_handler.reset()
         self.logger.info(f"开始下载视频: {url}")
         self.logger.info(f"保存路径: {output_path}")
         self.logger.info(f"视频质量: {quality}")
         if cookie:
             self.logger.info("使用自定义Cookie")
 
+        # 如果提供了video_info且是播放列表/频道，逐条流式下载
+        if video_info and video_info.get('is_playlist'):
+            return self.download_playlist(url, output_path, quality, cookie=cookie)
+
+        # 发起网络请求前查询下载归档
+        if not resume_info:
+            skipped = self._check_archive_url(url, video_info)
+            if skipped:
+                return skipped
+
         # 如果提供了video_info且是M3U8，使用M3U8下载器
         if video_info and video_info.get('is_m3u8'):
             return self._download_m3u8_video(video_info.get('m3u8_info'), output_path, cookie=cookie)
@@ -406,7 +671,14 @@ class VideoDownloader:
             self.logger.info(f"检测到直接MP4 URL，尝试直接下载")
             # 先尝试直接下载（绕过yt-dlp和代理限制）
             try:
-                return self._download_direct_mp4(video_info['direct_mp4_url'], output_path, video_info.get('title', 'video'))
+                result = self._download_direct_mp4(video_info['direct_mp4_url'], output_path, video_info.get('title', 'video'))
+                if result.get('success') and self.archive is not None:
+                    match = extractor_id_for_url(url)
+                    if match:
+                        self._record_archive(match[0], match[1], result.get('filename'), url)
+                return result
+            except DownloadCancelled:
+                raise
             except Exception as direct_error:
                 self.logger.warning(f"直接下载失败，尝试使用yt-dlp: {str(direct_error)}")
                 # 如果直接下载失败，降级到yt-dlp
@@ -416,69 +688,369 @@ class VideoDownloader:
         if not output_path.endswith('/') and not output_path.endswith('\\'):
             output_path += '/'
 
-        # 首先尝试使用yt-dlp下载
+        # 恢复暂停的下载：直接使用上次的解析结果，从磁盘上的部分文件续传
+        if resume_info and resume_info.get('m3u8_info'):
+            self.logger.info("使用上次的M3U8解析结果恢复下载")
+            return self._download_m3u8_video(resume_info['m3u8_info'], output_path, cookie=cookie)
+        if resume_info and resume_info.get('ytdlp_info'):
+            self.logger.info("使用上次的解析结果恢复下载")
+            return self._download_with_ytdlp(url, output_path, quality, cookie=cookie,
+                                             pre_info=resume_info['ytdlp_info'])
+
+        # 路由表命中M3U8策略（或已知M3U8站点）时优先使用M3U8下载器
+        route = self.router.preferred_strategy(url)
+        m3u8_error = None
+        if self._prefers_m3u8(url, route):
+            self.logger.info(f"优先使用M3U8下载器 (路由策略: {route or '已知M3U8站点'})")
+            try:
+                return self._download_via_m3u8(url, output_path, quality, cookie=cookie, preferred_strategy=route)
+            except DownloadCancelled:
+                raise
+            except Exception as e:
+                m3u8_error = e
+                self.logger.warning(f"M3U8下载失败，回退到yt-dlp: {str(e)}")
+
+        # 尝试使用yt-dlp下载
         try:
-            return self._download_with_ytdlp(url, output_path, quality, cookie=cookie)
+            # 只有URL的任务（命令行、HTTP守护进程、调度器、API）先扁平探测：
+            # 播放列表/频道转为逐条流式下载，不在下载前解析全部条目；单个视频复用探测的解析结果
+            pre_info = None if video_info else self._probe_url(url, cookie)
+            if pre_info and pre_info.get('_type') in ('playlist', 'multi_video'):
+                self.logger.info("检测到播放列表/频道，逐条下载")
+                return self.download_playlist(url, output_path, quality, cookie=cookie)
+            result = self._download_with_ytdlp(url, output_path, quality, cookie=cookie, pre_info=pre_info)
+            self.router.record_success(url, STRATEGY_YTDLP)
+            return result
+        except DownloadCancelled:
+            raise
         except Exception as e:
             self.logger.warning(f"yt-dlp下载失败: {str(e)}")
+            self.router.record_failure(url, STRATEGY_YTDLP)
+
+            if m3u8_error is None:
+                # 如果yt-dlp失败，尝试M3U8下载；URL中带有viewkey或数字ID时先直接按ID获取，
+                # 不必先请求页面查找直接MP4链接
+                self.logger.info("尝试使用M3U8下载器...")
+                url_strategy, _ = self.m3u8_downloader.url_id_strategy(url)
+                try:
+                    return self._download_via_m3u8(url, output_path, quality, cookie=cookie,
+                                                   preferred_strategy=url_strategy)
+                except DownloadCancelled:
+                    raise
+                except Exception as fallback_error:
+                    m3u8_error = fallback_error
+
+            self.logger.error(f"M3U8下载也失败: {str(m3u8_error)}")
+            import traceback
+            error_details = f"yt-dlp错误: {str(e)}\n\nM3U8错误: {str(m3u8_error)}\n\n{traceback.format_exc()}"
+            return {
+                'success': False,
+                'error': error_details
+            }
 
-            # 如果yt-dlp失败，尝试M3U8下载
-            self.logger.info("尝试使用M3U8下载器...")
+    def _download_via_m3u8(self, url, output_path, quality, cookie=None, preferred_strategy=None):
+        """
+        使用M3U8下载器解析并下载
+
+        Args:
+            url: 视频页面URL或M3U8 URL
+            output_path: 保存路径
+            quality: 视频质量（页面中找到直接MP4 URL时使用）
+            cookie: 可选的Cookie字符串
+            preferred_strategy: 可选的首选解析策略
+
+        Returns:
+            dict: 下载结果
+        """
+        from .m3u8_downloader import DirectMP4UrlException
+
+        # 如果提供了Cookie，设置到M3U8下载器
+        if cookie:
+            self.m3u8_downloader.set_cookie(cookie)
+            self.logger.info("已将Cookie设置到M3U8下载器")
+
+        try:
+            m3u8_info = self._parse_m3u8(url, preferred_strategy=preferred_strategy)
+            self.resume_info = {'m3u8_info': m3u8_info}
+        except DirectMP4UrlException as mp4_ex:
+            # 如果找到直接MP4 URL，使用yt-dlp下载
+            self.logger.info(f"检测到直接MP4 URL: {mp4_ex.mp4_url}")
+            return self._download_with_ytdlp(mp4_ex.mp4_url, output_path, quality, cookie=cookie)
+
+        return self._download_m3u8_video(m3u8_info, output_path, cookie=cookie)
+
+    def iter_playlist_entries(self, url, cookie=None, max_entries=None):
+        """
+        分页扁平枚举播放列表/频道条目（生成器）
+
+        Args:
+            url: 播放列表或频道URL
+            cookie: 可选的Cookie字符串
+            max_entries: 可选的最大条目数
+
+        Yields:
+            dict: 条目信息（见 PlaylistExpander.iter_pages）
+        """
+        from .playlist_expander import PlaylistExpander
+
+        # 枚举期间会穿插下载，使用独立的Cookie文件，避免被下载流程清理
+        cookiefile = self._create_cookie_file(cookie, track=False) if cookie else None
+        try:
+            expander = PlaylistExpander(self.playlist_page_size, proxy=self.proxy, cookiefile=cookiefile)
+            yield from expander.iter_entries(url, max_entries=max_entries)
+        finally:
+            if cookiefile and os.path.exists(cookiefile):
+                try:
+                    os.unlink(cookiefile)
+                except OSError:
+                    pass
+
+    def download_playlist(self, url, output_path='.', quality='best', cookie=None, max_entries=None):
+        """
+        下载播放列表/频道
+
+        枚举线程分页发现条目并立即放入下载队列，当前线程依次取出条目，
+        在即将下载时才对该条目做完整解析，第一个视频无需等待整个列表枚举完成
+
+        Args:
+            url: 播放列表或频道URL
+            output_path: 保存路径
+            quality: 视频质量
+            cookie: 可选的Cookie字符串
+            max_entries: 可选的最大下载条目数
+
+        Returns:
+            dict: 下载结果
+            {
+                'success': 是否全部成功,
+                'is_playlist': True,
+                'downloaded': 成功数量,
+                'total': 条目总数,
+                'failed': 失败条目列表,
+                'results': 每个条目的下载结果
+            }
+        """
+        self.logger.info(f"开始下载播放列表: {url}")
+
+        # 有界队列：下载慢于枚举时暂停枚举，避免一次性展开整个频道
+        entry_queue = queue.Queue(maxsize=self.playlist_page_size * 2)
+        end_marker = object()
+        enumerate_errors = []
+        stop_event = threading.Event()
+
+        def put(item):
+            """放入队列；下载端已停止（异常或取消）时放弃，返回是否放入"""
+            while not stop_event.is_set():
+                try:
+                    entry_queue.put(item, timeout=0.5)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def producer():
+            entries = self.iter_playlist_entries(url, cookie=cookie, max_entries=max_entries)
             try:
-                from .m3u8_downloader import DirectMP4UrlException
+                for entry in entries:
+                    if not put(entry):
+                        break
+            except Exception as e:
+                self.logger.error(f"播放列表枚举失败: {str(e)}")
+                enumerate_errors.append(str(e))
+            finally:
+                # 提前停止时立即结束枚举（关闭 yt-dlp 会话、清理Cookie文件）
+                entries.close()
+                # 队列已满时下载端可能已经停止，结束标记同样不能无限阻塞
+                put(end_marker)
+
+        threading.Thread(target=producer, daemon=True).start()
+
+        results = []
+        failed = []
+        try:
+            while True:
+                try:
+                    entry = entry_queue.get(timeout=0.5)
+                except queue.Empty:
+                    # 等待枚举时也响应取消
+                    self.cancel_token.raise_if_cancelled()
+                    continue
+                if entry is end_marker:
+                    break
+                self.cancel_token.raise_if_cancelled()
+
+                if self.archive is not None and self.archive.contains(entry.get('ie_key'), entry.get('id')):
+                    # 枚举结果已带有提取器和视频ID，已下载的条目不做任何网络请求
+                    self.logger.info(f"跳过已下载的播放列表条目 [{entry['index']}]: {entry['title']}")
+                    result = self._skipped_result(entry.get('ie_key'), entry.get('id'), entry['title'])
+                    result['entry'] = entry
+                    results.append(result)
+                    continue
+
+                self.logger.info(f"下载播放列表条目 [{entry['index']}]: {entry['title']}")
+                try:
+                    # 完整解析推迟到此处，由单视频下载流程完成
+                    result = self._download_video(entry['url'], output_path, quality, None, cookie)
+                except DownloadCancelled:
+                    raise
+                except Exception as e:
+                    result = {'success': False, 'error': str(e)}
+
+                result['entry'] = entry
+                results.append(result)
+                if not result.get('success'):
+                    failed.append(entry)
+                    self.logger.warning(f"播放列表条目下载失败 [{entry['index']}]: {result.get('error', '未知错误')}")
+        finally:
+            stop_event.set()
+
+        downloaded = len(results) - len(failed)
+        skipped = sum(1 for result in results if result.get('skipped'))
+        self.logger.info(f"播放列表下载结束: {downloaded}/{len(results)} 成功（其中 {skipped} 个已下载过）")
+
+        result = {
+            'success': bool(results) and not failed and not enumerate_errors,
+            'is_playlist': True,
+            'title': url,
+            'downloaded': downloaded,
+            'total': len(results),
+            'skipped': skipped,
+            'failed': failed,
+            'results': results
+        }
+        if enumerate_errors:
+            result['error'] = f"播放列表枚举失败: {enumerate_errors[0]}"
+        elif failed:
+            result['error'] = f"下载失败: {downloaded}/{len(results)} 个条目成功"
+        return result
 
-                # 如果提供了Cookie，设置到M3U8下载器
-                if cookie:
-                    self.m3u8_downloader.set_cookie(cookie)
-                    self.logger.info("已将Cookie设置到M3U8下载器")
+    def _get_format_constraints(self, quality):
+        """
+        获取本次下载使用的格式约束
 
-                # 策略1: 如果是直接的M3U8 URL
-                if '.m3u8' in url.lower():
-                    m3u8_info = self.m3u8_downloader.parse_m3u8_direct(url)
-                else:
-                    # 策略2: 尝试从URL参数提取viewkey
-                    video_id = None
-                    from urllib.parse import urlparse, parse_qs
-                    parsed = urlparse(url)
-                    params = parse_qs(parsed.query)
-
-                    if 'viewkey' in params:
-                        video_id = params['viewkey'][0]
-                        self.logger.info(f"从URL参数提取到viewkey: {video_id}")
-                    else:
-                        # 策略3: 从URL路径提取数字ID
-                        id_match = re.search(r'/(\d{6,})', url)
-                        if id_match:
-                            video_id = id_match.group(1)
+        Args:
+            quality: 质量参数
 
-                    m3u8_info = self.m3u8_downloader.parse_m3u8_from_url(url, video_id)
+        Returns:
+            FormatConstraints: 约束，不需要格式选择时返回None
+        """
+        from .format_selector import FormatConstraints
 
-                return self._download_m3u8_video(m3u8_info, output_path, cookie=cookie)
+        if quality == 'best-audio':
+            return None
+        if quality == 'economy':
+            return self.format_constraints or FormatConstraints()
+        if quality == 'best-mp4' and self.format_constraints and not self.format_constraints.container:
+            constraints = FormatConstraints.from_dict(self.format_constraints.to_dict())
+            constraints.container = 'mp4'
+            return constraints
+        return self.format_constraints
+
+    def _select_format(self, ydl, url, constraints, info=None):
+        """
+        解析视频并按约束从完整格式列表中选择格式
 
-            except DirectMP4UrlException as mp4_ex:
-                # 如果找到直接MP4 URL，使用yt-dlp下载
-                self.logger.info(f"检测到直接MP4 URL: {mp4_ex.mp4_url}")
-                return self._download_with_ytdlp(mp4_ex.mp4_url, output_path, quality, cookie=cookie)
+        Args:
+            ydl: 用于解析的YoutubeDL实例
+            url: 视频URL
+            constraints: FormatConstraints 实例
+            info: 可选的已有解析结果（提供时不再解析）
 
-            except Exception as m3u8_error:
-                self.logger.error(f"M3U8下载也失败: {str(m3u8_error)}")
-                import traceback
-                error_details = f"yt-dlp错误: {str(e)}\n\nM3U8错误: {str(m3u8_error)}\n\n{traceback.format_exc()}"
-                return {
-                    'success': False,
-                    'error': error_details
-                }
+        Returns:
+            tuple: (yt-dlp信息字典, 格式字符串或None)
+        """
+        from .format_selector import FormatSelector
+
+        if info is None:
+            info = ydl.extract_info(url, download=False)
+        selection = FormatSelector().select(info.get('formats', []), info.get('duration'), constraints)
+        if not selection:
+            return info, None
+        return info, selection['format_string']
+
+    def _extract_info(self, ydl, url, cookie=None):
+        """
+        使用yt-dlp解析视频（相同URL和选项的并发解析合并为一次）
+
+        Args:
+            ydl: YoutubeDL实例
+            url: 视频URL
+            cookie: 可选的Cookie字符串（临时Cookie文件路径每次不同，以Cookie内容区分）
+
+        Returns:
+            dict: yt-dlp信息字典（独立副本，下载过程会修改它）
+        """
+        key = ('ytdlp', url, cookie, self.proxy, ydl.params.get('format'), str(ydl.params.get('outtmpl')))
+        info, shared = _info_flight.do(key, lambda: ydl.extract_info(url, download=False))
+        if shared:
+            self.logger.info(f"复用其他任务的解析结果: {url}")
+        return copy.deepcopy(info)
+
+    def _probe_url(self, url, cookie=None):
+        """
+        使用yt-dlp扁平模式解析URL（播放列表只枚举第一个条目，不解析条目）
+
+        Args:
+            url: 视频、播放列表或频道URL
+            cookie: 可选的Cookie字符串
+
+        Returns:
+            dict: yt-dlp信息字典；播放列表的 _type 为 playlist/multi_video，
+                  单个视频为完整的解析结果，可直接作为 _download_with_ytdlp 的 pre_info
+        """
+        ydl_opts = {
+            'quiet': True,
+            'no_warnings': True,
+            'extract_flat': 'in_playlist',
+            'lazy_playlist': True,
+            'playlistend': 1,
+        }
+        if self.proxy:
+            ydl_opts['proxy'] = self.proxy
+
+        def probe():
+            cookiefile = self._create_cookie_file(cookie, track=False) if cookie else None
+            if cookiefile:
+                ydl_opts['cookiefile'] = cookiefile
+            try:
+                with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                    return ydl.sanitize_info(ydl.extract_info(url, download=False))
+            finally:
+                if cookiefile and os.path.exists(cookiefile):
+                    os.unlink(cookiefile)
+
+        key = ('probe', url, cookie, self.proxy)
+        info, shared = _info_flight.do(key, probe)
+        if shared:
+            self.logger.info(f"复用其他任务的解析结果: {url}")
+        return copy.deepcopy(info)
+
+    def _download_with_ytdlp(self, url, output_path, quality, cookie=None, pre_info=None):
+        """
+        使用yt-dlp下载视频
+
+        Args:
+            url: 视频URL
+            output_path: 保存路径
+            quality: 视频质量
+            cookie: 可选的Cookie字符串
+            pre_info: 可选的已有解析结果（恢复暂停的下载时使用）
 
-    def _download_with_ytdlp(self, url, output_path, quality, cookie=None):
-        """使用yt-dlp下载视频"""
+        Returns:
+            dict: 下载结果
+        """
         try:
             ydl_opts = {
                 'outtmpl': f'{output_path}%(title)s.%(ext)s',
                 'format': self._get_format_string(quality),
-                'progress_hooks': [self.progress_handler.progress_hook],
+                'progress_hooks': [self._ytdlp_progress_hook],
                 'quiet': True,
                 'no_warnings': True,
+                # 保留 .part 文件并在重新下载时续传（任务中断后恢复）
+                'continuedl': True,
+                'nopart': False,
             }
+            self._apply_throughput_options(ydl_opts)
 
             # 如果设置了代理，添加到yt-dlp选项
             if self.proxy:
@@ -492,9 +1064,55 @@ class VideoDownloader:
                 ydl_opts['cookiefile'] = self._create_cookie_file(cookie)
                 self.logger.info("已将Cookie添加到yt-dlp下载请求")
 
+            # 有格式约束时先解析完整格式列表并选择格式，随后复用解析结果下载
+            constraints = self._get_format_constraints(quality)
+            if constraints:
+                with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                    if not pre_info:
+                        pre_info = self._extract_info(ydl, url, cookie)
+                    pre_info, format_string = self._select_format(ydl, url, constraints, info=pre_info)
+                if format_string:
+                    ydl_opts['format'] = f"{format_string}/{ydl_opts['format']}"
+                    if constraints.container:
+                        ydl_opts['merge_output_format'] = constraints.container
+                else:
+                    self.logger.warning("格式约束无法满足，使用默认格式")
+
+            # 需要合并的格式（视频+音频）并行下载两路流
+            if self.parallel_streams and '+' in ydl_opts['format']:
+                from .parallel_streams import ParallelStreamDownloader
+
+                with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                    if pre_info:
+                        pre_info = ydl.process_ie_result(pre_info, download=False)
+                    else:
+                        pre_info = self._extract_info(ydl, url, cookie)
+                    skipped = self._check_archive_info(ydl, pre_info)
+                    if skipped:
+                        return skipped
+                    self.resume_info = {'ytdlp_info': ydl.sanitize_info(pre_info)}
+
+                parallel = ParallelStreamDownloader(ydl_opts, self._ytdlp_progress_hook)
+                if parallel.can_download(pre_info):
+                    filename = parallel.download(pre_info)
+                    self._record_archive(pre_info.get('extractor_key'), pre_info.get('id'), filename, url)
+                    return {
+                        'success': True,
+                        'filename': filename,
+                        'title': pre_info.get('title', '未知标题')
+                    }
+
             with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                # 先解析再下载（与 extract_info(download=True) 等价），解析结果保存下来供暂停后恢复
+                if not pre_info:
+                    pre_info = self._extract_info(ydl, url, cookie)
+                skipped = self._check_archive_info(ydl, pre_info)
+                if skipped:
+                    return skipped
+                self.resume_info = {'ytdlp_info': ydl.sanitize_info(pre_info)}
+
                 self.logger.info("正在调用 yt-dlp 下载...")
-                info = ydl.extract_info(url, download=True)
+                info = ydl.process_ie_result(pre_info, download=True)
 
                 self.logger.info(f"下载完成，视频标题: {info.get('title', '未知')}")
 
@@ -518,6 +1136,7 @@ class VideoDownloader:
                 else:
                     self.logger.info(f"确认文件存在: {filename}")
 
+                self._record_archive(info.get('extractor_key'), info.get('id'), filename, url)
                 return {
                     'success': True,
                     'filename': filename,
@@ -554,7 +1173,11 @@ class VideoDownloader:
         # 构造完整文件路径
         output_file = os.path.join(output_path, f"{filename}.mp4")
 
+        response = None
+        unregister_cancel = None
         try:
+            self.cancel_token.raise_if_cancelled()
+
             # 发起请求
             headers = {
                 'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
@@ -579,73 +1202,49 @@ class VideoDownloader:
             total_size = int(response.headers.get('content-length', 0))
             self.logger.info(f"文件大小: {total_size / (1024 * 1024):.2f} MB")
 
+            # 先写入 .part 文件，完成后再重命名；存在上次中断留下的 .part 文件时用 Range 请求续传
+            part_file = f"{output_file}.part"
+            resume_from = os.path.getsize(part_file) if os.path.exists(part_file) else 0
+            if resume_from and total_size and resume_from >= total_size:
+                resume_from = 0
+            if resume_from:
+                headers['Range'] = f"bytes={resume_from}-"
+                self.logger.info(f"发现未完成的下载，从 {resume_from / (1024 * 1024):.1f} MB 处续传")
+
             # 流式下载
             response = requests.get(mp4_url, headers=headers, proxies=proxies, stream=True, timeout=30, allow_redirects=True)
             response.raise_for_status()
+            # 取消时关闭连接，阻塞在读取上的 iter_content 立即返回
+            unregister_cancel = self.cancel_token.on_cancel(response.close)
+
+            if resume_from and response.status_code != 206:
+                # 服务器不支持断点续传，重新下载
+                self.logger.warning("服务器不支持断点续传，重新下载")
+                resume_from = 0
 
-            downloaded = 0
+            downloaded = resume_from
             start_time = time.time()
             last_update_time = start_time
 
-            with open(output_file, 'wb') as f:
+            with open(part_file, 'ab' if resume_from else 'wb') as f:
                 for chunk in response.iter_content(chunk_size=8192):
+                    self.cancel_token.raise_if_cancelled()
                     if chunk:
                         f.write(chunk)
                         downloaded += len(chunk)
 
-                        # 更新进度（每秒更新一次）
+                        # 更新进度（每0.5秒一次），速度为本次连接的平均速度
                         current_time = time.time()
-                        if current_time - last_update_time >= 0.5:  # 每0.5秒更新一次
-                            percentage = (downloaded / total_size * 100) if total_size > 0 else 0
-
-                            # 计算速度
+                        if current_time - last_update_time >= 0.5:
                             elapsed = current_time - start_time
-                            speed = 0.0  # 初始化speed
-                            if elapsed > 0:
-                                speed = downloaded / elapsed / (1024 * 1024)  # MB/s
-                                speed_str = f"{speed:.2f} MB/s"
-                            else:
-                                speed_str = "0 MB/s"
-
-                            # 计算ETA
-                            if total_size > 0 and speed > 0:
-                                remaining = total_size - downloaded
-                                eta = remaining / (speed * 1024 * 1024)  # 秒
-                                if eta > 60:
-                                    eta_str = f"{int(eta / 60)} min"
-                                else:
-                                    eta_str = f"{int(eta)} sec"
-                            else:
-                                eta_str = "N/A"
-
-                            # 格式化文件大小
-                            size_str = f"{downloaded / (1024 * 1024):.1f} MB"
-                            if total_size > 0:
-                                size_str += f" / {total_size / (1024 * 1024):.1f} MB"
-
-                            # 调用进度回调
-                            if self.progress_handler.progress_callback:
-                                self.progress_handler.progress_callback(
-                                    downloaded,
-                                    total_size,
-                                    percentage,
-                                    speed_str,
-                                    eta_str,
-                                    size_str
-                                )
-
+                            speed = (downloaded - resume_from) / elapsed if elapsed > 0 else None
+                            self.progress_handler.report(downloaded, total_size, speed)
                             last_update_time = current_time
 
+            os.replace(part_file, output_file)
+
             # 最终更新进度为100%
-            if self.progress_handler.progress_callback:
-                self.progress_handler.progress_callback(
-                    total_size,
-                    total_size,
-                    100,
-                    "完成",
-                    "0 sec",
-                    f"{total_size / (1024 * 1024):.1f} MB"
-                )
+            self.progress_handler.report(downloaded, total_size or downloaded, finished=True)
 
             self.logger.info(f"直接下载完成: {output_file}")
 
@@ -655,14 +1254,28 @@ class VideoDownloader:
                 'title': filename
             }
 
+        except DownloadCancelled:
+            # .part 文件保留，重新下载时从当前位置续传
+            self.logger.info(f"直接下载已取消: {mp4_url}")
+            raise
         except requests.exceptions.RequestException as e:
+            if self.cancel_token.is_cancelled:
+                # 连接被取消操作关闭
+                raise DownloadCancelled("下载已取消")
             error_msg = f"直接下载失败: {type(e).__name__}: {str(e)}"
             self.logger.error(error_msg, exc_info=True)
             raise Exception(error_msg)
         except Exception as e:
+            if self.cancel_token.is_cancelled:
+                raise DownloadCancelled("下载已取消")
             error_msg = f"直接下载失败: {str(e)}"
             self.logger.error(error_msg, exc_info=True)
             raise Exception(error_msg)
+        finally:
+            if unregister_cancel:
+                unregister_cancel()
+            if response is not None:
+                response.close()
 
     def _download_m3u8_video(self, m3u8_info, output_path, cookie=None):
         """使用M3U8下载器下载视频"""
@@ -675,11 +1288,17 @@ class VideoDownloader:
 
         # 更新进度回调
         if self.progress_handler.progress_callback:
-            self.m3u8_downloader.set_progress_callback(self._wrap_m3u8_callback())
+            self.m3u8_downloader.set_progress_callback(self.progress_handler.progress_callback)
+
+        video_id = m3u8_info.get('video_id')
+        if self.archive is not None and self.archive.contains(M3U8_EXTRACTOR, video_id):
+            self.logger.info(f"跳过已下载的视频: {video_id}")
+            return self._skipped_result(M3U8_EXTRACTOR, video_id, m3u8_info.get('title', 'M3U8视频'))
 
         result = self.m3u8_downloader.download_m3u8_video(m3u8_info, output_path)
 
         if result.get('success'):
+            self._record_archive(M3U8_EXTRACTOR, video_id, result.get('output_file'), m3u8_info.get('m3u8_url'))
             return {
                 'success': True,
                 'filename': result.get('output_file'),
@@ -730,16 +1349,20 @@ class VideoDownloader:
             'worst': 'worstvideo+worstaudio/worst',
             'best-mp4': 'bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best',
             'best-audio': 'bestaudio/best',
+            # 省流量：实际格式由格式选择引擎决定，此处为选择失败时的兜底
+            'economy': 'bestvideo+bestaudio/best',
         }
 
         return format_map.get(quality, 'bestvideo+bestaudio/best')
 
-    def _create_cookie_file(self, cookie_string):
+    def _create_cookie_file(self, cookie_string, track=True):
         """
         创建临时Cookie文件供yt-dlp使用
 
         Args:
             cookie_string: Cookie字符串 (Netscape格式或键值对格式)
+            track: 是否记录为当前临时文件（由 _cleanup_cookie_file 清理）；
+                   为False时由调用方自行删除
 
         Returns:
             str: 临时Cookie文件路径
@@ -748,7 +1371,8 @@ class VideoDownloader:
         import os
 
         # 先清理旧的临时文件
-        self._cleanup_cookie_file()
+        if track:
+            self._cleanup_cookie_file()
 
         # 创建临时文件
         fd, temp_path = tempfile.mkstemp(suffix='.txt', text=True)
@@ -774,7 +1398,8 @@ class VideoDownloader:
                             f.write(f".\tTRUE\t/\tFALSE\t0\t{name.strip()}\t{value.strip()}\n")
 
             # 保存临时文件路径以便后续清理
-            self._temp_cookie_file = temp_path
+            if track:
+                self._temp_cookie_file = temp_path
             self.logger.info(f"已创建临时Cookie文件: {temp_path}")
             return temp_path
 
@@ -800,9 +1425,87 @@ class VideoDownloader:
             except Exception as e:
                 self.logger.warning(f"清理Cookie文件失败: {str(e)}")
 
+    def _check_archive_url(self, url, video_info=None):
+        """
+        不联网地查询下载归档（URL规则或已有解析结果中的视频ID）
+
+        Args:
+            url: 视频URL
+            video_info: 可选的已有视频信息
+
+        Returns:
+            dict: 已下载过时返回跳过结果，否则返回None
+        """
+        if self.archive is None or not len(self.archive):
+            return None
+
+        if video_info and video_info.get('is_m3u8'):
+            match = (M3U8_EXTRACTOR, (video_info.get('m3u8_info') or {}).get('video_id'))
+        else:
+            match = extractor_id_for_url(url)
+        if match and self.archive.contains(*match):
+            title = (video_info or {}).get('title') or url
+            self.logger.info(f"跳过已下载的视频: {match[0]} {match[1]}")
+            return self._skipped_result(match[0], match[1], title)
+        return None
+
+    def _check_archive_info(self, ydl, info):
+        """
+        解析后查询下载归档（URL无法离线确定视频ID，或只按文件名导入过的视频）
+
+        Args:
+            ydl: YoutubeDL实例
+            info: yt-dlp解析结果
+
+        Returns:
+            dict: 已下载过时返回跳过结果，否则返回None
+        """
+        if self.archive is None:
+            return None
+
+        extractor, video_id = info.get('extractor_key'), info.get('id')
+        if self.archive.contains(extractor, video_id):
+            self.logger.info(f"跳过已下载的视频: {extractor} {video_id}")
+            return self._skipped_result(extractor, video_id, info.get('title', '未知标题'))
+
+        name = os.path.splitext(os.path.basename(ydl.prepare_filename(info)))[0]
+        if self.archive.contains_file(name):
+            self.logger.info(f"跳过已有同名文件的视频: {name}")
+            # 补记提取器和视频ID，下次在解析前即可跳过
+            record = self.archive.get(FILE_EXTRACTOR, name) or {}
+            self.archive.record(extractor, video_id, record.get('filename'), info.get('webpage_url'),
+                                checksum=record.get('checksum'))
+            return self._skipped_result(extractor, video_id, info.get('title', '未知标题'))
+        return None
+
+    def _skipped_result(self, extractor, video_id, title):
+        """已下载过的视频的结果（视为成功，文件名取自归档记录）"""
+        record = self.archive.get(extractor, video_id) if extractor and video_id else None
+        return {
+            'success': True,
+            'skipped': True,
+            'filename': record['filename'] if record else None,
+            'title': title
+        }
+
+    def _record_archive(self, extractor, video_id, filename, url):
+        """下载成功后记录到下载归档"""
+        if self.archive is None:
+            return
+        try:
+            self.archive.record(extractor, video_id, filename, url)
+        except Exception as e:
+            # 归档写入失败不影响下载结果
+            self.logger.warning(f"记录下载归档失败: {str(e)}")
+
     def cancel_download(self):
         """
-        取消下载（待实现）
+        取消下载（协作式）
+
+        yt-dlp 在下一次进度回调时中止，直接MP4下载立即关闭连接，
+        M3U8下载在当前片段请求结束后停止（最长一个请求超时时间）；
+        已下载的部分保留在磁盘上，同一任务重新下载时续传
         """
-        # yt-dlp的取消下载比较复杂，需要使用多线程和事件
-        pass
+        if not self.cancel_token.is_cancelled:
+            self.logger.info("正在取消下载...")
+        self.cancel_token.cancel()
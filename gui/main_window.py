@@ -5,6 +5,10 @@ from tkinter import ttk, filedialog, messagebox
 import threading
 import os
 from downloader.video_downloader import VideoDownloader
+from downloader.job_queue import JobQueue, STATE_QUEUED, STATE_PAUSED
+from downloader.scheduler import DownloadScheduler
+from downloader.scheduling_policy import estimate_job_size
+from gui.progress_bus import ProgressBus
 from utils.url_validator import URLValidator
 
 
@@ -20,8 +24,9 @@ class MainWindow:
         self.downloader = VideoDownloader()
         self.url_validator = URLValidator()
         self.current_video_info = None
-        self.is_downloading = False
         self.current_video_file = None  # 保存当前视频文件路径
+        self.control_job_id = None  # 取消/暂停操作的目标任务（用户最近开始的任务）
+        self.displayed_job_id = None  # 进度区域当前显示的任务
 
         # 设置样式
         self.setup_styles()
@@ -29,8 +34,16 @@ class MainWindow:
         # 创建UI组件
         self.create_widgets()
 
-        # 设置下载进度回调
-        self.downloader.set_progress_callback(self.update_download_progress)
+        # 持久化下载任务队列和多任务调度器：恢复上次中断的任务
+        self.job_queue = JobQueue()
+        self.scheduler = DownloadScheduler(self.job_queue)
+        # 进度经由进度总线合并，按每秒10次刷新界面
+        self.progress_bus = ProgressBus(self.root, self.render_download_progress)
+        self.progress_bus.start()
+        self.scheduler.progress_callback = lambda event: self.progress_bus.publish(event.job_id, event)
+        self.scheduler.job_finished_callback = self.job_finished
+        self.recover_jobs()
+        self.scheduler.start()
 
     def setup_styles(self):
         """设置UI样式"""
@@ -156,6 +169,7 @@ class MainWindow:
         quality_options = [
             ('最佳质量', 'best'),
             ('最佳MP4', 'best-mp4'),
+            ('省流量', 'economy'),
             ('仅音频', 'best-audio')
         ]
 
@@ -174,6 +188,24 @@ class MainWindow:
         )
         self.download_btn.pack(side=tk.LEFT, padx=(0, 5), expand=True, fill=tk.X)
 
+        # 取消按钮（取消进度区域当前显示的任务）
+        self.cancel_btn = ttk.Button(
+            button_frame,
+            text="取消下载",
+            command=self.cancel_download,
+            style='Action.TButton'
+        )
+        self.cancel_btn.pack(side=tk.LEFT, padx=5, expand=True, fill=tk.X)
+
+        # 暂停/继续按钮（作用于进度区域当前显示的任务）
+        self.pause_btn = ttk.Button(
+            button_frame,
+            text="暂停下载",
+            command=self.toggle_pause,
+            style='Action.TButton'
+        )
+        self.pause_btn.pack(side=tk.LEFT, padx=5, expand=True, fill=tk.X)
+
         # 添加播放按钮（初始禁用）
         self.play_btn = ttk.Button(
             button_frame,
@@ -325,7 +357,14 @@ class MainWindow:
         # 记录到日志
         self.log_message(f"视频标题: {video_info.get('title', '未知')}", 'SUCCESS')
 
-        if is_m3u8:
+        if video_info.get('is_playlist'):
+            count = video_info.get('playlist_count') or f"{len(video_info.get('preview_entries', []))}+"
+            self.log_message("类型: 播放列表/频道", 'WARNING')
+            self.log_message(f"上传者: {video_info.get('uploader', '未知')}", 'INFO')
+            self.log_message(f"条目数: {count}", 'INFO')
+            for entry in video_info.get('preview_entries', [])[:5]:
+                self.log_message(f"  - {entry.get('title')}", 'INFO')
+        elif is_m3u8:
             self.log_message("类型: M3U8视频流", 'WARNING')
             self.log_message(f"描述: {video_info.get('description', 'N/A')}", 'INFO')
         else:
@@ -368,6 +407,7 @@ class MainWindow:
         
         # 获取最终的代理地址（可能已被自动添加协议前缀）
         final_proxy = self.downloader.proxy
+        self.scheduler.set_proxy(final_proxy)
         
         # 显示成功消息
         if proxy == final_proxy:
@@ -381,14 +421,11 @@ class MainWindow:
         """
         self.proxy_entry.delete(0, tk.END)
         self.downloader.set_proxy(None)
+        self.scheduler.set_proxy(None)
         self.log_message("已清除代理设置", 'INFO')
 
     def start_download(self):
-        """开始下载"""
-        if self.is_downloading:
-            messagebox.showinfo("提示", "正在下载中,请等待...")
-            return
-
+        """开始下载（加入持久化任务队列）"""
         if not self.current_video_info:
             messagebox.showwarning("警告", "请先解析视频URL")
             return
@@ -403,51 +440,161 @@ class MainWindow:
             self.log_message(f"保存路径不存在: {output_path}", 'ERROR')
             return
 
-        self.log_message(f"开始下载视频到: {output_path}", 'INFO')
+        # 保存解析结果，恢复任务时无需重新解析
+        options = {
+            'quality': quality,
+            'cookie': self.get_cookie(),
+            'video_info': self.current_video_info
+        }
+        size_estimate = estimate_job_size(self.current_video_info, quality)
+        job_id = self.job_queue.add(url, options, output_path, size_estimate=size_estimate)
+        # 取消/暂停按钮固定作用于用户开始的任务，不随其他任务的进度切换
+        self.control_job_id = job_id
+        self.pause_btn.config(text="暂停下载")
+        self.scheduler.notify()
+
+        running = len(self.scheduler.running)
+        self.log_message(f"已加入下载队列 (任务 #{job_id})，保存到: {output_path}", 'INFO')
         self.log_message(f"视频质量: {quality}", 'INFO')
-
-        # 开始下载
-        self.is_downloading = True
-        self.download_btn.config(state='disabled')
-        self.progress_bar['value'] = 0
+        if running >= self.scheduler.max_workers:
+            self.log_message(f"当前已有 {running} 个任务在下载，任务将在空闲后开始", 'INFO')
         self.status_label.config(text="正在下载...")
 
-        def download_thread():
-            try:
-                # 获取Cookie
-                cookie = self.get_cookie()
-                # 传递video_info和cookie参数
-                result = self.downloader.download_video(url, output_path, quality, self.current_video_info, cookie=cookie)
-                self.root.after(0, lambda: self.download_finished(result))
-            except Exception as e:
-                error_msg = f"下载失败: {str(e)}"
-                self.root.after(0, lambda: self.log_message(error_msg, 'ERROR'))
-                self.root.after(0, lambda: self.show_error(error_msg))
-            finally:
-                self.is_downloading = False
-                self.root.after(0, lambda: self.download_btn.config(state='normal'))
+    def _control_target(self):
+        """
+        取消/暂停操作的目标任务
 
-        threading.Thread(target=download_thread, daemon=True).start()
+        Returns:
+            int: 用户开始的任务；没有时为唯一运行中的任务（如恢复的任务），无法确定时返回None
+        """
+        if self.control_job_id is not None:
+            return self.control_job_id
+        running = self.scheduler.running_job_ids()
+        return running[0] if len(running) == 1 else None
+
+    def _release_control(self, job_id):
+        """任务结束后不再作为取消/暂停的目标"""
+        if job_id == self.control_job_id:
+            self.control_job_id = None
+            self.pause_btn.config(text="暂停下载")
+
+    def cancel_download(self):
+        """取消用户开始的下载任务（已下载的部分保留，重新下载时续传）"""
+        job_id = self._control_target()
+        if job_id is None:
+            messagebox.showinfo("提示", "没有正在进行的下载任务")
+            return
 
-    def update_download_progress(self, downloaded, total, percentage, speed, eta, size):
-        """更新下载进度"""
-        def update():
-            if percentage > 0:
-                self.progress_bar['value'] = percentage
-                self.percentage_label.config(text=f"{percentage:.1f}%")
+        if self.scheduler.cancel(job_id):
+            self.log_message(f"正在取消下载任务 #{job_id}...", 'WARNING')
+            self.status_label.config(text="正在取消...")
+        else:
+            self.log_message(f"下载任务 #{job_id} 已结束，无法取消", 'INFO')
+
+    def toggle_pause(self):
+        """暂停或继续用户开始的下载任务（暂停时释放下载槽位给其他任务，继续时从中断处续传）"""
+        job_id = self._control_target()
+        job = self.job_queue.get(job_id) if job_id is not None else None
+        if job is None:
+            messagebox.showinfo("提示", "没有正在进行的下载任务")
+            return
 
-            self.status_label.config(text=f"正在下载...")
-            self.speed_label.config(text=f"速度: {speed}")
-            self.eta_label.config(text=f"ETA: {eta}")
-            self.size_label.config(text=size)
+        if job['state'] == STATE_PAUSED:
+            if self.scheduler.resume(job_id):
+                self.log_message(f"继续下载任务 #{job_id}", 'INFO')
+                self.status_label.config(text="等待继续下载...")
+                self.pause_btn.config(text="暂停下载")
+        elif self.scheduler.pause(job_id):
+            # 暂停的任务不再运行，固定为操作目标，之后才能继续
+            self.control_job_id = job_id
+            self.log_message(f"已暂停下载任务 #{job_id}，已下载的部分会保留", 'WARNING')
+            self.status_label.config(text="已暂停")
+            self.pause_btn.config(text="继续下载")
+        else:
+            self.log_message(f"下载任务 #{job_id} 已结束，无法暂停", 'INFO')
+
+    def recover_jobs(self):
+        """恢复上次中断的任务"""
+        recovered = self.job_queue.recover()
+        queued = self.job_queue.counts().get(STATE_QUEUED, 0)
+        if recovered:
+            self.log_message(f"已恢复 {recovered} 个中断的下载任务，将从已下载部分继续", 'WARNING')
+        if queued:
+            self.log_message(f"下载队列中有 {queued} 个任务，开始处理", 'INFO')
+
+    def job_finished(self, job, result, state):
+        """
+        任务结束回调（在调度器工作线程中调用）
 
-        self.root.after(0, update)
+        Args:
+            job: 任务字典
+            result: 下载结果
+            state: 任务的新状态（重新排队时为 queued）
+        """
+        # 结束事件经由进度总线按顺序交付，不会被合并丢弃
+        job_id = job['id']
+        if state == STATE_QUEUED:
+            # 重新排队等待重试，暂不提示失败
+            self.progress_bus.post(lambda: self.log_message(f"下载任务 #{job_id} 失败，稍后重试", 'WARNING'), job_id)
+            return
+        if state == STATE_PAUSED:
+            self.progress_bus.post(lambda: self.log_message(f"下载任务 #{job_id} 已停止，等待继续", 'INFO'), job_id)
+            return
+        if state is None:
+            # 任务已被取消，结果不再记录
+            self.progress_bus.post(lambda: self.download_cancelled(job_id), job_id)
+            return
+
+        self.progress_bus.post(lambda: self.download_finished(result, job_id), job_id)
+
+    def download_cancelled(self, job_id):
+        """下载任务已取消"""
+        self.log_message(f"下载任务 #{job_id} 已取消", 'WARNING')
+        self._release_control(job_id)
+        if job_id == self.displayed_job_id:
+            self.displayed_job_id = None
+            self.status_label.config(text="下载已取消")
+            self.speed_label.config(text="")
+            self.eta_label.config(text="")
+
+    def render_download_progress(self, job_id, event):
+        """
+        刷新下载进度（由进度总线在界面线程中调用，显示文本在此格式化）
+
+        用户开始的任务正在下载时只显示它的进度；其他任务只在它未运行时显示，
+        显示哪个任务不影响取消/暂停的目标
+        """
+        running_ids = self.scheduler.running_job_ids()
+        control = self.control_job_id
+        if job_id != control and control in running_ids:
+            return
+        self.displayed_job_id = job_id
+        percentage = event.percentage
+        if percentage > 0:
+            self.progress_bar['value'] = percentage
+            self.percentage_label.config(text=f"{percentage:.1f}%")
+
+        self.status_label.config(text=f"正在下载任务 #{job_id}... (进行中: {len(running_ids)})")
+        self.speed_label.config(text=f"速度: {event.speed_text()}")
+        self.eta_label.config(text=f"ETA: {event.eta_text()}")
+        self.size_label.config(text=event.size_text())
+
+    def download_finished(self, result, job_id=None):
+        """
+        下载完成
 
-    def download_finished(self, result):
-        """下载完成"""
+        Args:
+            result: 下载结果
+            job_id: 任务ID
+        """
+        self._release_control(job_id)
         self.progress_bar['value'] = 100
         self.percentage_label.config(text="100%")
 
+        if result.get('is_playlist'):
+            self.playlist_finished(result)
+            return
+
         if result.get('success'):
             self.status_label.config(text="下载完成!")
             self.speed_label.config(text="")
@@ -496,6 +643,29 @@ class MainWindow:
 
             messagebox.showerror("错误", f"下载失败!\n\n错误详情:\n{popup_msg}")
 
+    def playlist_finished(self, result):
+        """播放列表下载完成"""
+        self.speed_label.config(text="")
+        self.eta_label.config(text="")
+
+        downloaded = result.get('downloaded', 0)
+        total = result.get('total', 0)
+        summary = f"播放列表下载结束: {downloaded}/{total} 个条目成功"
+
+        for failed_entry in result.get('failed', []):
+            self.log_message(f"条目下载失败: {failed_entry.get('title')}", 'ERROR')
+
+        if result.get('success'):
+            self.status_label.config(text="下载完成!")
+            self.log_message(summary, 'SUCCESS')
+            messagebox.showinfo("成功", summary)
+        else:
+            self.status_label.config(text="部分下载失败")
+            error_msg = result.get('error', '未知错误')
+            self.log_message(summary, 'WARNING')
+            self.log_message(error_msg, 'ERROR')
+            messagebox.showwarning("提示", f"{summary}\n\n{error_msg}")
+
     def show_error(self, message):
         """显示错误消息"""
         self.status_label.config(text="发生错误")
@@ -0,0 +1,81 @@
+"""GUI进度总线模块
+
+下载线程可能每秒产生上千次进度回调，逐次通过 root.after 投递到界面会塞满
+Tk 事件队列导致界面卡顿。进度总线只保留每个任务的最新进度，
+由界面线程按固定频率（默认每秒10次）统一取出并刷新；
+任务结束、失败、取消等事件按到达顺序排队，一个都不会丢弃
+"""
+
+import threading
+from collections import deque
+from utils.logger import get_logger
+
+
+class ProgressBus:
+    """进度总线（下载线程发布，界面线程按固定频率交付）"""
+
+    def __init__(self, root, render, rate=10):
+        """
+        初始化进度总线
+
+        Args:
+            root: Tk 根窗口（用于在界面线程中定时交付）
+            render: 进度渲染函数 (job_id, *progress)，在界面线程中调用
+            rate: 每秒交付次数
+        """
+        self.logger = get_logger()
+        self.root = root
+        self.render = render
+        self.interval_ms = max(1, int(1000 / rate))
+        self._latest = {}
+        self._events = deque()
+        self._lock = threading.Lock()
+
+    def start(self):
+        """开始定时交付"""
+        self.root.after(self.interval_ms, self._tick)
+
+    def publish(self, job_id, *progress):
+        """
+        发布任务进度（只保留最新的一次，可在任意线程中调用）
+
+        Args:
+            job_id: 任务ID
+            progress: 进度参数，原样传给渲染函数
+        """
+        with self._lock:
+            self._latest[job_id] = progress
+
+    def post(self, callback, job_id=None):
+        """
+        投递必须交付的事件（任务结束、失败、取消等），按到达顺序交付
+
+        Args:
+            callback: 无参数的界面回调，在界面线程中调用
+            job_id: 可选的任务ID，提供时丢弃该任务尚未交付的进度（避免结束后又显示进度）
+        """
+        with self._lock:
+            if job_id is not None:
+                self._latest.pop(job_id, None)
+            self._events.append(callback)
+
+    def _tick(self):
+        """界面线程：交付最新进度和排队的事件"""
+        # 先安排下一次交付：事件回调中弹出的模态对话框不会阻塞后续交付
+        self.root.after(self.interval_ms, self._tick)
+
+        with self._lock:
+            latest, self._latest = self._latest, {}
+            events = list(self._events)
+            self._events.clear()
+
+        for job_id, progress in latest.items():
+            try:
+                self.render(job_id, *progress)
+            except Exception as e:
+                self.logger.warning(f"进度刷新失败: {str(e)}")
+        for callback in events:
+            try:
+                callback()
+            except Exception as e:
+                self.logger.error(f"界面事件处理失败: {str(e)}", exc_info=True)
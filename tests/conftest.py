@@ -0,0 +1,15 @@
+"""测试公共配置"""
+
+import os
+import sys
+
+import pytest
+
+# 测试直接导入项目根目录下的包（downloader、utils 等）
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(autouse=True)
+def _work_dir(tmp_path, monkeypatch):
+    """在临时目录中运行每个测试（日志、缓存等文件不写入项目目录）"""
+    monkeypatch.chdir(tmp_path)
@@ -0,0 +1,88 @@
+"""可嵌入下载接口测试（使用替身下载器，不联网）"""
+
+import asyncio
+import time
+
+import pytest
+
+from downloader.api import DownloaderClient, DownloadResult, VideoInfo
+from downloader.cancellation import DownloadCancelled
+from downloader.progress_handler import ProgressEvent
+
+
+class _FakeDownloader:
+    """按固定步骤报告进度的替身下载器"""
+
+    def __init__(self, wait_until=None, block=False):
+        self.cancel_token = None
+        self.callback = None
+        self.wait_until = wait_until
+        self.block = block
+
+    def set_progress_callback(self, callback):
+        self.callback = callback
+
+    def get_video_info(self, url, cookie=None):
+        return {'title': 'demo', 'duration': 12, 'formats': [{'format_id': '18', 'ext': 'mp4', 'height': 360}]}
+
+    def download_video(self, url, output_path='.', quality='best', video_info=None, cookie=None):
+        if self.block:
+            self.cancel_token.wait(5)
+            return {'success': False, 'cancelled': True}
+        if self.wait_until is not None:
+            # 等待进度迭代器登记监听函数
+            deadline = time.monotonic() + 5
+            while not self.wait_until() and time.monotonic() < deadline:
+                time.sleep(0.01)
+        for downloaded in (100, 200, 300):
+            self.callback(ProgressEvent(downloaded, 300, finished=downloaded == 300))
+            time.sleep(0.01)
+        return {'success': True, 'filename': f'{output_path}/demo.mp4', 'title': 'demo'}
+
+
+def _client(**fake_kwargs):
+    client = DownloaderClient(max_workers=2)
+    client._create_downloader = lambda: _FakeDownloader(**fake_kwargs)
+    return client
+
+
+def test_resolve_and_download_future():
+    with _client() as client:
+        info = client.resolve('https://example.com/v').result(5)
+        task = client.download('https://example.com/v', output_path='out', video_info=info)
+        result = task.result(5)
+
+    assert isinstance(info, VideoInfo)
+    assert info.title == 'demo' and info.formats[0].height == 360
+    assert isinstance(result, DownloadResult)
+    assert result.success and result.filename == 'out/demo.mp4'
+    assert task.latest.finished
+
+
+def test_async_progress_iteration():
+    async def run(client):
+        task = client.download('https://example.com/v', output_path='out')
+        tasks.append(task)
+        updates = [update async for update in task.progress()]
+        return updates, await task
+
+    tasks = []
+    with _client(wait_until=lambda: tasks and tasks[0]._listeners) as client:
+        updates, result = asyncio.run(run(client))
+
+    assert result.success
+    assert updates
+    # 只保证最新进度，最后一次更新一定是完成事件
+    assert updates[-1].finished and updates[-1].percentage == 100.0
+    assert [update.downloaded for update in updates] == sorted(update.downloaded for update in updates)
+
+
+def test_cancel_running_download():
+    with _client(block=True) as client:
+        task = client.download('https://example.com/v')
+        time.sleep(0.1)
+        task.cancel()
+
+        with pytest.raises(DownloadCancelled):
+            task.result(5)
+    assert task.cancelled
@@ -0,0 +1,96 @@
+"""下载归档键和持久化测试"""
+
+import json
+
+from downloader import download_archive
+from downloader.download_archive import DownloadArchive, FILE_EXTRACTOR, archive_key, get_archive
+
+
+def test_archive_key_matches_ytdlp_format():
+    assert archive_key('Youtube', 'dQw4w9WgXcQ') == 'youtube dQw4w9WgXcQ'
+    # 提取器名称不区分大小写，视频ID区分
+    assert archive_key('BiliBili', 'BV1xx') == archive_key('bilibili', 'BV1xx')
+    assert archive_key('youtube', 'abc') != archive_key('youtube', 'ABC')
+
+
+def test_record_contains_remove(tmp_path):
+    archive = DownloadArchive(':memory:')
+    video = tmp_path / 'a.mp4'
+    video.write_bytes(b'data')
+
+    archive.record('Youtube', 'abc', filename=str(video), url='https://example.com/a')
+
+    assert archive.contains('youtube', 'abc')
+    assert not archive.contains('youtube', 'ABC')
+    assert not archive.contains(None, 'abc')
+    record = archive.get('YOUTUBE', 'abc')
+    assert record['size'] == 4 and record['checksum']
+    assert archive.find_checksum(record['checksum'])['video_id'] == 'abc'
+
+    assert archive.remove('Youtube', 'abc')
+    assert not archive.contains('youtube', 'abc')
+    assert not archive.remove('Youtube', 'abc')
+
+
+def test_persists_across_reopen(tmp_path):
+    path = str(tmp_path / 'cache' / 'archive.db')
+    archive = DownloadArchive(path)
+    archive.record('m3u8', '123456')
+    archive.close()
+
+    reopened = DownloadArchive(path)
+
+    assert reopened.contains('M3U8', '123456')
+    assert len(reopened) == 1
+    reopened.close()
+
+
+def test_import_ytdlp_archive(tmp_path):
+    archive = DownloadArchive(':memory:')
+    archive.record('youtube', 'old')
+    archive_file = tmp_path / 'archive.txt'
+    archive_file.write_text('youtube old\nyoutube new\nBiliBili BV1xx\n\nbroken\n', encoding='utf-8')
+
+    assert archive.import_ytdlp_archive(str(archive_file)) == 2
+    assert archive.contains('bilibili', 'BV1xx')
+    # 重复导入不会产生新记录
+    assert archive.import_ytdlp_archive(str(archive_file)) == 0
+
+
+def test_import_folder(tmp_path):
+    folder = tmp_path / 'videos'
+    (folder / 'sub').mkdir(parents=True)
+    (folder / 'Title.mp4').write_bytes(b'x')
+    (folder / 'Title.info.json').write_text(
+        json.dumps({'extractor_key': 'Youtube', 'id': 'abc', 'webpage_url': 'https://example.com/abc'}),
+        encoding='utf-8'
+    )
+    (folder / 'sub' / '123456.mp4').write_bytes(b'y')
+    (folder / 'notes.txt').write_text('ignored', encoding='utf-8')
+    archive = DownloadArchive(':memory:')
+
+    assert archive.import_folder(str(folder)) == 2
+    assert archive.contains('youtube', 'abc')
+    # 有元数据的媒体文件不再按文件名重复导入
+    assert not archive.contains_file('Title')
+    assert archive.contains_file('123456')
+    assert archive.get(FILE_EXTRACTOR, '123456')['size'] == 1
+    assert archive.import_folder(str(folder)) == 0
+
+
+def test_get_archive_shared_per_path(tmp_path, monkeypatch):
+    monkeypatch.setattr(download_archive, '_global_archives', {})
+    path = str(tmp_path / 'archive.db')
+
+    assert get_archive(path) is get_archive(path)
+    assert get_archive(path) is not get_archive(str(tmp_path / 'other.db'))
+
+
+def test_contains_url_without_network():
+    archive = DownloadArchive(':memory:')
+    archive.record('Youtube', 'dQw4w9WgXcQ')
+
+    assert archive.contains_url('https://www.youtube.com/watch?v=dQw4w9WgXcQ')
+    assert not archive.contains_url('https://www.youtube.com/watch?v=aaaaaaaaaaa')
+    # 没有专用提取器的URL无法离线判断
+    assert not archive.contains_url('https://example.com/video/dQw4w9WgXcQ')
@@ -0,0 +1,80 @@
+"""解析路由表测试"""
+
+import json
+import os
+
+from downloader import extraction_router
+from downloader.extraction_router import ExtractionRouter, STRATEGY_VIEWKEY, STRATEGY_NUMERIC_ID
+from downloader.m3u8_downloader import M3U8Downloader
+
+URL = 'https://www.91porn.com/view_video.php?viewkey=abc123'
+
+
+def _read(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def test_saves_are_batched_until_flush(tmp_path):
+    path = str(tmp_path / 'routes.json')
+    router = ExtractionRouter(path)
+
+    router.record_success(URL, STRATEGY_VIEWKEY)
+    router.record_success(URL, STRATEGY_VIEWKEY)
+    assert not os.path.exists(path)
+    assert router.preferred_strategy(URL) == STRATEGY_VIEWKEY
+
+    router.flush()
+    stats = _read(path)[router.route_key(URL)][STRATEGY_VIEWKEY]
+    assert stats['success'] == 2
+
+
+def test_concurrent_writers_merge_counts(tmp_path, monkeypatch):
+    monkeypatch.setattr(extraction_router, 'SAVE_INTERVAL', 0)
+    path = str(tmp_path / 'routes.json')
+    # 两个进程各自加载同一个文件，交替写入
+    first = ExtractionRouter(path)
+    second = ExtractionRouter(path)
+
+    first.record_success(URL, STRATEGY_VIEWKEY)
+    second.record_success(URL, STRATEGY_VIEWKEY)
+    second.record_failure(URL, STRATEGY_NUMERIC_ID)
+    first.record_success(URL, STRATEGY_VIEWKEY)
+
+    stats = _read(path)[first.route_key(URL)]
+    assert stats[STRATEGY_VIEWKEY]['success'] == 3
+    assert stats[STRATEGY_NUMERIC_ID]['failure'] == 1
+    # 没有残留的临时文件
+    assert os.listdir(tmp_path) == ['routes.json']
+
+
+def test_corrupt_file_is_relearned(tmp_path):
+    path = tmp_path / 'routes.json'
+    path.write_text('{not json', encoding='utf-8')
+
+    router = ExtractionRouter(str(path))
+    router.record_success(URL, STRATEGY_VIEWKEY)
+    router.flush()
+
+    assert router.route_key(URL) in _read(str(path))
+
+
+def test_provided_video_id_records_matching_strategy(monkeypatch):
+    downloader = M3U8Downloader()
+    monkeypatch.setattr(downloader, '_fetch_m3u8_by_id', lambda video_id: {'video_id': video_id})
+
+    by_viewkey = downloader.parse_m3u8_from_url(URL, video_id='abc123')
+    by_number = downloader.parse_m3u8_from_url('https://example.com/videos/1234567', video_id='1234567')
+    unrelated = downloader.parse_m3u8_from_url(URL, video_id='999999')
+
+    assert by_viewkey['strategy'] == STRATEGY_VIEWKEY
+    assert by_number['strategy'] == STRATEGY_NUMERIC_ID
+    assert unrelated['strategy'] is None
+
+
+def test_url_id_strategy():
+    downloader = M3U8Downloader()
+
+    assert downloader.url_id_strategy(URL) == (STRATEGY_VIEWKEY, 'abc123')
+    assert downloader.url_id_strategy('https://example.com/v/1234567') == (STRATEGY_NUMERIC_ID, '1234567')
+    assert downloader.url_id_strategy('https://example.com/watch') == (None, None)
@@ -0,0 +1,121 @@
+"""格式选择引擎测试"""
+
+from downloader.format_selector import FormatConstraints, FormatSelector, codec_family
+
+DURATION = 100
+
+
+def _video(format_id, height, vcodec, tbr=None, ext='mp4', **extra):
+    fmt = {'format_id': format_id, 'height': height, 'vcodec': vcodec, 'acodec': 'none', 'ext': ext}
+    if tbr:
+        fmt['tbr'] = tbr
+    fmt.update(extra)
+    return fmt
+
+
+def _audio(format_id, abr, ext='m4a'):
+    return {'format_id': format_id, 'vcodec': 'none', 'acodec': 'mp4a.40.2', 'abr': abr, 'ext': ext}
+
+
+FORMATS = [
+    _audio('140', 128),
+    _audio('251', 160, ext='webm'),
+    _video('137', 1080, 'avc1.640028', tbr=4000),
+    _video('248', 1080, 'vp09.00.40.08', tbr=2500, ext='webm'),
+    _video('399', 1080, 'av01.0.08M.08', tbr=2000),
+    _video('136', 720, 'avc1.4d401f', tbr=2000),
+    _video('22', 720, 'avc1.64001F', tbr=1500),
+]
+FORMATS[-1]['acodec'] = 'mp4a.40.2'
+
+
+def test_codec_family():
+    assert codec_family('avc1.640028') == 'h264'
+    assert codec_family('vp09.00.40.08') == 'vp9'
+    assert codec_family('AV01.0.08M.08') == 'av1'
+    assert codec_family('none') is None
+    assert codec_family('theora') == 'theora'
+
+
+def test_size_from_bitrate_times_duration():
+    selector = FormatSelector()
+
+    # 2000 kbps * 100 秒 = 25,000,000 字节
+    assert selector.estimate_size({'tbr': 2000}, DURATION) == 25_000_000
+    # 没有总码率时视频码率加音频码率
+    assert selector.estimate_bitrate({'vcodec': 'avc1', 'acodec': 'mp4a', 'vbr': 900, 'abr': 100}) == 1000
+    # 文件大小优先于码率估算
+    assert selector.estimate_size({'filesize': 1234, 'tbr': 2000}, DURATION) == 1234
+    assert selector.estimate_size({'filesize_approx': 999}, DURATION) == 999
+    assert selector.estimate_size({'tbr': 2000}, None) is None
+    assert selector.estimate_size({}, DURATION) is None
+
+
+def test_merged_candidate_adds_audio_size():
+    best = FormatSelector().select(FORMATS, DURATION, FormatConstraints(container='mp4', preferred_codecs=['h264']))
+
+    assert best['format_string'] == '137+140'
+    assert best['estimated_bitrate'] == 4128
+    assert best['estimated_size'] == int(4000 * 1000 / 8 * DURATION) + int(128 * 1000 / 8 * DURATION)
+
+
+def test_resolution_floor_defaults_to_highest_available():
+    # 不限编码时在最高画质（1080p）中选择字节最少的 AV1，而不是更小的 720p
+    best = FormatSelector().select(FORMATS, DURATION, FormatConstraints())
+    assert best['height'] == 1080
+    assert best['codec'] == 'av1'
+
+    capped = FormatSelector().select(FORMATS, DURATION, FormatConstraints(max_height=720))
+    assert capped['height'] == 720
+    # 自带音频的 22 (1500kbps) 比 136+140 (2128kbps) 更小
+    assert capped['format_string'] == '22'
+
+
+def test_explicit_min_height_allows_smaller_formats():
+    best = FormatSelector().select(FORMATS, DURATION, FormatConstraints(min_height=720))
+
+    assert best['format_string'] == '22'
+
+
+def test_codec_preference_beats_size():
+    best = FormatSelector().select(FORMATS, DURATION, FormatConstraints(preferred_codecs=['vp9', 'h264']))
+
+    # 更小的 AV1 不是首选编码；不限容器时使用码率最高的音频
+    assert best['codec'] == 'vp9'
+    assert best['format_string'] == '248+251'
+
+
+def test_container_picks_compatible_audio():
+    best = FormatSelector().select(FORMATS, DURATION, FormatConstraints(container='webm'))
+
+    assert best['format_string'] == '248+251'
+
+
+def test_size_budget():
+    selector = FormatSelector()
+    # 1080p 中最小的 399+140 约 26.6MB，预算 20MB 时 1080p 全部被排除
+    best = selector.select(FORMATS, DURATION, FormatConstraints(max_filesize=20_000_000))
+    assert best['format_string'] == '22'
+
+    assert selector.select(FORMATS, DURATION, FormatConstraints(max_filesize=1_000_000)) is None
+    # 有预算时无法估算大小的格式视为不满足
+    unknown = [_audio('140', 128), _video('137', 1080, 'avc1.640028')]
+    assert selector.select(unknown, DURATION, FormatConstraints(max_filesize=10 ** 9)) is None
+
+
+def test_bitrate_budget_and_unreachable_floor():
+    selector = FormatSelector()
+
+    assert selector.select(FORMATS, DURATION, FormatConstraints(max_bitrate=1600))['format_string'] == '22'
+    assert selector.select(FORMATS, DURATION, FormatConstraints(max_height=720, min_height=1080)) is None
+
+
+def test_constraints_round_trip():
+    constraints = FormatConstraints(max_height=1080, preferred_codecs='AV1', container='MP4', max_filesize=10)
+
+    restored = FormatConstraints.from_dict(constraints.to_dict())
+
+    assert restored.to_dict() == {
+        'max_height': 1080, 'min_height': None, 'preferred_codecs': ['av1'],
+        'container': 'mp4', 'max_filesize': 10, 'max_bitrate': None,
+    }
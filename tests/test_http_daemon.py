@@ -0,0 +1,93 @@
+"""HTTP控制接口请求校验测试"""
+
+import asyncio
+import json
+
+from downloader.http_daemon import DownloadDaemon
+from downloader.job_queue import JobQueue
+
+
+class _FakeScheduler:
+    """只提供守护进程用到的属性的调度器替身"""
+
+    def __init__(self):
+        self.job_queue = JobQueue(':memory:')
+        self.progress_callback = None
+        self.job_started_callback = None
+        self.job_finished_callback = None
+
+    def notify(self):
+        pass
+
+
+def _request(daemon, raw):
+    """向守护进程的连接处理函数发送原始请求，返回 (状态码, JSON响应)"""
+    async def run():
+        server = await asyncio.start_server(daemon._handle_connection, '127.0.0.1', 0)
+        port = server.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(raw)
+        await writer.drain()
+        response = await reader.read()
+        writer.close()
+        server.close()
+        await server.wait_closed()
+        return response
+
+    response = asyncio.run(run())
+    head, _, body = response.partition(b'\r\n\r\n')
+    return int(head.split(b' ')[1]), json.loads(body.decode('utf-8'))
+
+
+def _post_jobs(daemon, payload, headers=''):
+    body = payload if isinstance(payload, bytes) else json.dumps(payload).encode('utf-8')
+    raw = f"POST /jobs HTTP/1.1\r\nContent-Length: {len(body)}\r\n{headers}\r\n".encode('latin-1') + body
+    return _request(daemon, raw)
+
+
+def test_enqueue_valid_job():
+    daemon = DownloadDaemon(_FakeScheduler())
+
+    status, payload = _post_jobs(daemon, {'url': 'https://example.com/v', 'priority': 3, 'size_estimate': '1024'})
+
+    assert status == 201
+    job = daemon.job_queue.get(payload['ids'][0])
+    assert (job['priority'], job['size_estimate']) == (3, 1024)
+
+
+def test_invalid_fields_return_400():
+    daemon = DownloadDaemon(_FakeScheduler())
+    invalid = [
+        {'url': 'https://example.com/v', 'priority': 'high'},
+        {'url': 'https://example.com/v', 'size_estimate': [1]},
+        {'url': 'https://example.com/v', 'priority': 1.5},
+        {'url': 'https://example.com/v', 'deadline': 'tomorrow'},
+        {'urls': 'https://example.com/v'},
+        {'urls': [1, 2]},
+        ['https://example.com/v'],
+        'https://example.com/v',
+        b'{not json',
+    ]
+    for payload in invalid:
+        status, body = _post_jobs(daemon, payload)
+        assert status == 400, payload
+        assert body['error']
+    assert daemon.job_queue.list_jobs() == []
+
+
+def test_invalid_content_length_returns_400():
+    daemon = DownloadDaemon(_FakeScheduler())
+
+    status, body = _request(daemon, b"POST /jobs HTTP/1.1\r\nContent-Length: abc\r\n\r\n")
+
+    assert status == 400
+    assert 'Content-Length' in body['error']
+
+
+def test_token_is_required():
+    daemon = DownloadDaemon(_FakeScheduler(), token='secret')
+
+    assert _request(daemon, b"GET /jobs HTTP/1.1\r\n\r\n")[0] == 401
+    assert _request(daemon, b"GET /jobs HTTP/1.1\r\nAuthorization: Bearer wrong\r\n\r\n")[0] == 401
+    assert _request(daemon, "GET /jobs HTTP/1.1\r\nAuthorization: Bearer \xe9\r\n\r\n".encode('latin-1'))[0] == 401
+    assert _request(daemon, b"GET /jobs HTTP/1.1\r\nAuthorization: Bearer secret\r\n\r\n") == (200, {'jobs': []})
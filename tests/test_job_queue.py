@@ -0,0 +1,218 @@
+"""持久化任务队列测试（领取、租约、恢复）"""
+
+import time
+
+from downloader.job_queue import (
+    JobQueue, STATE_QUEUED, STATE_RUNNING, STATE_DONE, STATE_FAILED, STATE_PAUSED
+)
+
+
+def _queue(tmp_path, **kwargs):
+    return JobQueue(str(tmp_path / 'jobs.db'), **kwargs)
+
+
+def test_default_node_ids_are_unique_per_instance(tmp_path):
+    first = _queue(tmp_path)
+    second = _queue(tmp_path)
+
+    assert first.node_id != second.node_id
+    assert _queue(tmp_path, node_id='host-a').node_id == 'host-a'
+
+
+def test_claim_sets_running_state_and_lease(tmp_path):
+    job_queue = _queue(tmp_path, lease_seconds=60)
+    job_id = job_queue.add('https://example.com/a', options={'quality': 'best'})
+
+    job = job_queue.claim_next()
+
+    assert job['id'] == job_id
+    assert job['state'] == STATE_RUNNING
+    assert job['attempts'] == 1
+    assert job['lease_owner'] == job_queue.node_id
+    assert job['lease_expires'] > time.time()
+    # 领取结果包含完整的任务字段（下载选项已解码）
+    assert job['options'] == {'quality': 'best'}
+    assert job_queue.claim_next() is None
+
+
+def test_claim_follows_policy_and_accept_filter(tmp_path):
+    job_queue = _queue(tmp_path)
+    low = job_queue.add('https://a.example.com/low', priority=0)
+    high = job_queue.add('https://b.example.com/high', priority=5)
+    job_queue.set_policy('priority')
+
+    assert job_queue.claim_next()['id'] == high
+
+    seen = []
+
+    def accept(job):
+        seen.append(job)
+        return False
+
+    assert job_queue.claim_next(accept=accept) is None
+    assert [job['id'] for job in seen] == [low]
+    assert seen[0]['url'] == 'https://a.example.com/low'
+
+
+def test_sjf_claims_smallest_job(tmp_path):
+    job_queue = _queue(tmp_path)
+    job_queue.add('https://example.com/big', size_estimate=10 ** 9)
+    small = job_queue.add('https://example.com/small', size_estimate=10 ** 6)
+    job_queue.set_policy('sjf')
+
+    assert job_queue.claim_next()['id'] == small
+
+
+def test_sjf_handles_jobs_waiting_many_aging_periods(tmp_path):
+    job_queue = _queue(tmp_path)
+    old = job_queue.add('https://example.com/old', size_estimate=10 ** 9)
+    job_queue.add('https://example.com/new', size_estimate=10 ** 6)
+    job_queue.set_policy('sjf', aging_seconds=1)
+    # 等待超过1024个老化周期（2 ** periods 会溢出浮点数）
+    job_queue._connection().execute('UPDATE jobs SET created_at = ? WHERE id = ?', (time.time() - 5000, old))
+
+    assert job_queue.claim_next()['id'] == old
+
+
+def test_recover_skips_live_leases_of_other_processes(tmp_path):
+    running_process = _queue(tmp_path, lease_seconds=60)
+    job_id = running_process.add('https://example.com/a')
+    running_process.claim_next()
+
+    # 同一主机上共享 cache/jobs.db 的另一个进程启动
+    second_process = _queue(tmp_path, lease_seconds=60)
+
+    assert second_process.recover() == 0
+    assert second_process.get(job_id)['state'] == STATE_RUNNING
+    assert second_process.claim_next() is None
+
+
+def test_recover_requeues_expired_leases(tmp_path):
+    crashed = _queue(tmp_path, lease_seconds=1)
+    job_id = crashed.add('https://example.com/a')
+    crashed.claim_next()
+    time.sleep(1.1)
+
+    restarted = _queue(tmp_path, lease_seconds=1)
+
+    assert restarted.recover() == 1
+    job = restarted.get(job_id)
+    assert job['state'] == STATE_QUEUED
+    assert job['lease_owner'] is None
+
+
+def test_claim_reclaims_expired_leases(tmp_path):
+    crashed = _queue(tmp_path, lease_seconds=1)
+    job_id = crashed.add('https://example.com/a', max_attempts=2)
+    crashed.claim_next()
+    time.sleep(1.1)
+
+    other = _queue(tmp_path, lease_seconds=60)
+    job = other.claim_next()
+
+    assert job['id'] == job_id
+    assert job['attempts'] == 2
+    assert job['lease_owner'] == other.node_id
+    # 原进程的结果不再生效
+    assert not crashed.complete(job_id, 'a.mp4')
+    assert other.complete(job_id, 'a.mp4')
+
+
+def test_renew_leases_reports_lost_jobs(tmp_path):
+    job_queue = _queue(tmp_path, lease_seconds=60)
+    kept = job_queue.add('https://example.com/a')
+    cancelled = job_queue.add('https://example.com/b')
+    job_queue.claim_next()
+    job_queue.claim_next()
+    job_queue.cancel(cancelled)
+
+    assert job_queue.renew_leases([kept, cancelled]) == {kept}
+
+
+def test_fail_retries_until_max_attempts(tmp_path):
+    job_queue = _queue(tmp_path)
+    job_id = job_queue.add('https://example.com/a', max_attempts=2)
+
+    job_queue.claim_next()
+    assert job_queue.fail(job_id, 'timeout') == STATE_QUEUED
+    job_queue.claim_next()
+    assert job_queue.fail(job_id, 'timeout') == STATE_FAILED
+    assert job_queue.counts() == {STATE_FAILED: 1}
+
+
+def test_capacity_limits_jobs_held_by_node(tmp_path):
+    job_queue = _queue(tmp_path)
+    job_queue.register_node(capacity=1)
+    job_queue.add('https://example.com/a')
+    job_queue.add('https://example.com/b')
+
+    first = job_queue.claim_next()
+    assert job_queue.claim_next() is None
+    job_queue.complete(first['id'])
+    assert job_queue.claim_next() is not None
+    assert job_queue.counts() == {STATE_DONE: 1, STATE_RUNNING: 1}
+
+
+def test_stale_node_records_are_pruned(tmp_path):
+    old = _queue(tmp_path, lease_seconds=1)
+    old.register_node(2)
+    time.sleep(1.1)
+
+    new = _queue(tmp_path, lease_seconds=1)
+    new.register_node(2)
+
+    assert [node['node_id'] for node in new.list_nodes()] == [new.node_id]
+
+
+def test_release_leases_requeues_own_running_jobs(tmp_path):
+    interrupted = _queue(tmp_path, node_id='node-a', lease_seconds=60)
+    own = interrupted.add('https://example.com/a')
+    other = interrupted.add('https://example.com/b')
+    interrupted.claim_next()
+    _queue(tmp_path, node_id='node-b', lease_seconds=60).claim_next()
+
+    assert interrupted.release_leases() == 1
+
+    # 立即重新运行时无需等待租约过期
+    rerun = _queue(tmp_path, node_id='node-c', lease_seconds=60)
+    job = rerun.claim_next()
+    assert job['id'] == own
+    assert job['attempts'] == 1
+    assert rerun.get(other)['lease_owner'] == 'node-b'
+
+
+def test_pause_resume_keeps_attempts_and_resume_info(tmp_path):
+    job_queue = _queue(tmp_path)
+    job_id = job_queue.add('https://example.com/a', options={'quality': 'best'})
+    assert job_queue.claim_next()['attempts'] == 1
+
+    assert job_queue.pause(job_id)
+    paused = job_queue.get(job_id)
+    # 暂停不计入尝试次数，租约交还
+    assert paused['state'] == STATE_PAUSED
+    assert paused['attempts'] == 0
+    assert paused['lease_owner'] is None
+    assert job_queue.claim_next() is None
+
+    resume_info = {'m3u8_info': {'video_id': '123456', 'ts_list': ['a.ts', 'b.ts']}}
+    assert job_queue.save_resume_info(job_id, resume_info)
+    assert job_queue.resume(job_id)
+    assert not job_queue.resume(job_id)
+
+    job = job_queue.claim_next()
+    assert job['id'] == job_id
+    assert job['attempts'] == 1
+    assert job['options'] == {'quality': 'best', 'resume_info': resume_info}
+
+
+def test_pause_queued_job_and_resume_info_rejected_after_claim(tmp_path):
+    job_queue = _queue(tmp_path)
+    job_id = job_queue.add('https://example.com/a')
+
+    assert job_queue.pause(job_id)
+    assert job_queue.get(job_id)['attempts'] == 0
+    assert job_queue.resume(job_id)
+    job_queue.claim_next()
+
+    # 已被重新领取的任务不再接受旧的恢复信息
+    assert not job_queue.save_resume_info(job_id, {'ytdlp_info': {}})
@@ -0,0 +1,119 @@
+"""列表流水线下载测试（不联网）"""
+
+import os
+import threading
+import time
+
+from downloader.listing_crawler import SeenStore
+from downloader.m3u8_downloader import M3U8Downloader
+
+
+class _FakeListing:
+    """替换网络请求：一页列表，每个视频两个片段，指定的片段下载失败"""
+
+    def __init__(self, video_ids, failing_segments=(), on_segment=None):
+        self.video_ids = video_ids
+        self.failing_segments = set(failing_segments)
+        self.on_segment = on_segment
+        self.segment_threads = {}
+
+    def install(self, monkeypatch):
+        listing = self
+
+        def get_video_ids_from_page(downloader, page_url):
+            return list(listing.video_ids) if page_url.endswith('page=1') else []
+
+        def fetch_m3u8_by_id(downloader, video_id):
+            return {
+                'video_id': video_id,
+                'base_url': f'https://cdn.example.com/{video_id}/',
+                'ts_list': [f'{video_id}_0.ts', f'{video_id}_1.ts'],
+                'durations': [1.0, 1.0],
+            }
+
+        def request_content(downloader, url, is_text=False, max_retries=3):
+            name = url.rsplit('/', 1)[-1]
+            listing.segment_threads.setdefault(threading.get_ident(), set()).add(id(downloader))
+            if listing.on_segment:
+                listing.on_segment(downloader)
+            if name in listing.failing_segments:
+                return None
+            return name.encode('ascii')
+
+        monkeypatch.setattr(M3U8Downloader, 'get_video_ids_from_page', get_video_ids_from_page)
+        monkeypatch.setattr(M3U8Downloader, '_fetch_m3u8_by_id', fetch_m3u8_by_id)
+        monkeypatch.setattr(M3U8Downloader, '_request_content', request_content)
+
+
+def _downloader():
+    downloader = M3U8Downloader()
+    downloader.set_download_delay(0, 0)
+    return downloader
+
+
+def test_only_merged_videos_are_marked_seen(tmp_path, monkeypatch):
+    _FakeListing(['100001', '100002'], failing_segments=['100002_1.ts']).install(monkeypatch)
+    seen_path = str(tmp_path / 'seen.txt')
+
+    result = _downloader().download_listing(
+        'https://example.com/list?page=1', output_path=str(tmp_path), seen_path=seen_path, max_pages=2
+    )
+
+    assert result['downloaded'] == 1
+    seen = SeenStore(seen_path)
+    assert '100001' in seen
+    assert '100002' not in seen
+    # 有片段缺失的视频保留临时文件夹，下次同步时续传
+    assert not os.path.exists(tmp_path / '100001_temp')
+    assert os.path.exists(tmp_path / '100002_temp' / '100002_0.ts')
+
+
+def test_failed_video_is_retried_on_next_sync(tmp_path, monkeypatch):
+    seen_path = str(tmp_path / 'seen.txt')
+    _FakeListing(['100001'], failing_segments=['100001_1.ts']).install(monkeypatch)
+    first = _downloader().download_listing(
+        'https://example.com/list?page=1', output_path=str(tmp_path), seen_path=seen_path, max_pages=1
+    )
+    assert first['downloaded'] == 0
+
+    _FakeListing(['100001']).install(monkeypatch)
+    second = _downloader().download_listing(
+        'https://example.com/list?page=1', output_path=str(tmp_path), seen_path=seen_path, max_pages=1
+    )
+
+    assert second['downloaded'] == 1
+    assert '100001' in SeenStore(seen_path)
+    with open(tmp_path / '100001.mp4', 'rb') as f:
+        assert f.read() == b'100001_0.ts100001_1.ts'
+
+
+def test_download_workers_use_their_own_downloader(tmp_path, monkeypatch):
+    listing = _FakeListing([str(100001 + i) for i in range(6)])
+    listing.install(monkeypatch)
+    downloader = _downloader()
+
+    downloader.download_listing('https://example.com/list?page=1', output_path=str(tmp_path), max_pages=1)
+
+    # 每个下载线程只使用一个下载器，且不是共享的主下载器
+    used = [ids for ids in listing.segment_threads.values()]
+    assert all(len(ids) == 1 for ids in used)
+    assert id(downloader) not in set().union(*used)
+
+
+def test_cancel_stops_listing_pipeline(tmp_path, monkeypatch):
+    video_ids = [str(100001 + i) for i in range(50)]
+    # 第一个片段请求时取消（下载线程的下载器与主下载器共享取消令牌）
+    _FakeListing(video_ids, on_segment=lambda downloader: downloader.cancel_token.cancel()).install(monkeypatch)
+
+    result = _downloader().download_listing(
+        'https://example.com/list?page=1', output_path=str(tmp_path), max_pages=1
+    )
+
+    assert result['cancelled']
+    assert not result['success']
+    assert result['downloaded'] < len(video_ids)
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline and any(
+            thread.name.startswith('pipeline-') for thread in threading.enumerate()):
+        time.sleep(0.05)
+    assert not [thread.name for thread in threading.enumerate() if thread.name.startswith('pipeline-')]
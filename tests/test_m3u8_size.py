@@ -0,0 +1,73 @@
+"""M3U8总大小估算和磁盘空间预检测试（不联网）"""
+
+import pytest
+
+from downloader.cancellation import DownloadCancelled
+from downloader.m3u8_downloader import M3U8Downloader
+
+PLAYLIST = '#EXTM3U\n' + ''.join(f'#EXTINF:2.0,\nseg{i}.ts\n' for i in range(6)) + '#EXT-X-ENDLIST\n'
+
+
+def _downloader(monkeypatch, probes):
+    downloader = M3U8Downloader()
+    downloader.set_download_delay(0, 0)
+
+    def request_content(url, is_text=False, max_retries=3):
+        return PLAYLIST if is_text else b'x' * 100
+
+    def probe_size(url):
+        probes.append(url)
+        return 100
+
+    monkeypatch.setattr(downloader, '_request_content', request_content)
+    monkeypatch.setattr(downloader, '_probe_size', probe_size)
+    return downloader
+
+
+def test_parsing_does_not_probe_segments(monkeypatch):
+    probes = []
+    downloader = _downloader(monkeypatch, probes)
+
+    m3u8_info = downloader.parse_m3u8_direct('https://cdn.example.com/v/index.m3u8')
+
+    assert probes == []
+    assert m3u8_info['duration'] == 12.0
+    assert 'estimated_size' not in m3u8_info
+
+
+def test_estimate_runs_once_at_download(tmp_path, monkeypatch):
+    probes = []
+    downloader = _downloader(monkeypatch, probes)
+    m3u8_info = downloader.parse_m3u8_direct('https://cdn.example.com/v/index.m3u8')
+    m3u8_info['video_id'] = 'v1'
+
+    result = downloader.download_m3u8_video(m3u8_info, str(tmp_path), merge=False)
+
+    assert result['success']
+    assert len(probes) == 3
+    assert m3u8_info['estimated_size'] == 600
+
+    # 恢复下载时使用保存的估算结果，不再探测
+    downloader.download_m3u8_video(m3u8_info, str(tmp_path), merge=False)
+    assert len(probes) == 3
+
+
+def test_probes_stop_when_cancelled(tmp_path, monkeypatch):
+    probes = []
+    downloader = _downloader(monkeypatch, probes)
+    m3u8_info = downloader.parse_m3u8_direct('https://cdn.example.com/v/index.m3u8')
+    m3u8_info['video_id'] = 'v1'
+    downloader.cancel_token.cancel()
+
+    with pytest.raises(DownloadCancelled):
+        downloader.download_m3u8_video(m3u8_info, str(tmp_path))
+
+    assert probes == []
+
+
+def test_disk_space_preflight(tmp_path, monkeypatch):
+    downloader = _downloader(monkeypatch, [])
+    m3u8_info = {'video_id': 'v1', 'ts_list': ['seg0.ts'], 'estimated_size': 10 ** 18}
+
+    with pytest.raises(Exception, match='磁盘空间不足'):
+        downloader.download_m3u8_video(m3u8_info, str(tmp_path))
@@ -0,0 +1,69 @@
+"""页面分析结果缓存测试"""
+
+import requests
+
+from downloader import page_analyzer
+from downloader.page_analyzer import PageAnalyzer
+from utils.single_flight import SingleFlight
+
+
+class _FakeResponse:
+    """只含测试需要的字段的响应"""
+
+    def __init__(self, text):
+        self.text = text
+        self.content = text.encode('utf-8')
+        self.status_code = 200
+
+
+def _analyzer(monkeypatch, hits, **kwargs):
+    """创建请求被记录、不访问网络的页面分析器"""
+    monkeypatch.setattr(page_analyzer, '_page_flight', SingleFlight(retain=0))
+    session = requests.Session()
+
+    def get(url, **kw):
+        hits.append(url)
+        return _FakeResponse('<html></html>')
+
+    session.get = get
+    return PageAnalyzer(session, **kwargs)
+
+
+def test_cache_hit_within_ttl(monkeypatch):
+    hits = []
+    analyzer = _analyzer(monkeypatch, hits)
+
+    analyzer.analyze('https://example.com/a')
+    analyzer.analyze('https://example.com/a')
+
+    assert hits == ['https://example.com/a']
+
+
+def test_expired_entries_pruned_on_insert(monkeypatch):
+    hits = []
+    analyzer = _analyzer(monkeypatch, hits, ttl=60)
+    clock = [1000.0]
+    monkeypatch.setattr(page_analyzer.time, 'monotonic', lambda: clock[0])
+
+    analyzer.analyze('https://example.com/a')
+    analyzer.analyze('https://example.com/b')
+    clock[0] += 61
+    analyzer.analyze('https://example.com/c')
+
+    # 只查询过一次的页面过期后也会被清理
+    assert list(analyzer._cache) == ['https://example.com/c']
+
+
+def test_cache_bounded_lru(monkeypatch):
+    hits = []
+    analyzer = _analyzer(monkeypatch, hits, max_entries=2)
+
+    analyzer.analyze('https://example.com/a')
+    analyzer.analyze('https://example.com/b')
+    analyzer.analyze('https://example.com/a')
+    analyzer.analyze('https://example.com/c')
+
+    # b 最久未使用，被淘汰
+    assert list(analyzer._cache) == ['https://example.com/a', 'https://example.com/c']
+    analyzer.analyze('https://example.com/b')
+    assert hits.count('https://example.com/b') == 2
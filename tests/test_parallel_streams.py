@@ -0,0 +1,52 @@
+"""音视频流并行下载的进度合并测试"""
+
+from downloader import parallel_streams
+from downloader.parallel_streams import ParallelStreamDownloader, _CombinedProgress
+
+
+def test_combined_progress_sums_streams():
+    events = []
+    progress = _CombinedProgress(('137', '140'), events.append)
+
+    progress.hook_for('137')({'status': 'downloading', 'downloaded_bytes': 100, 'total_bytes': 1000, 'speed': 10, 'eta': 90})
+    progress.hook_for('140')({'status': 'downloading', 'downloaded_bytes': 50, 'total_bytes_estimate': 200, 'speed': 5, 'eta': 30})
+    progress.hook_for('140')({'status': 'finished', 'total_bytes': 200})
+
+    assert events[1] == {'status': 'downloading', 'downloaded_bytes': 150, 'total_bytes': 1200, 'speed': 15, 'eta': 90}
+    # 单个流完成时仍按下载中转发
+    assert events[2]['status'] == 'downloading'
+    assert events[2]['downloaded_bytes'] == 300
+
+
+def test_finished_event_carries_combined_totals(tmp_path, monkeypatch):
+    events = []
+    downloader = ParallelStreamDownloader({'outtmpl': str(tmp_path / '%(title)s.%(ext)s')}, events.append)
+    sizes = {'137': 1000, '140': 200}
+
+    def download_stream(info, fmt, base_path, hook):
+        size = sizes[fmt['format_id']]
+        hook({'status': 'downloading', 'downloaded_bytes': size // 2, 'total_bytes': size})
+        hook({'status': 'finished', 'total_bytes': size})
+        path = f"{base_path}.f{fmt['format_id']}.{fmt['ext']}"
+        with open(path, 'wb') as f:
+            f.write(b'x')
+        return path
+
+    def merge(video_file, audio_file, output_file):
+        with open(output_file, 'wb') as f:
+            f.write(b'merged')
+
+    monkeypatch.setattr(downloader, '_download_stream', download_stream)
+    monkeypatch.setattr(downloader, '_merge', merge)
+    monkeypatch.setattr(parallel_streams, 'ffmpeg_available', lambda: True)
+    info = {
+        'id': 'abc', 'title': 'demo', 'ext': 'mp4',
+        'requested_formats': [{'format_id': '137', 'ext': 'mp4'}, {'format_id': '140', 'ext': 'm4a'}],
+    }
+
+    assert downloader.can_download(info)
+    output_file = downloader.download(info)
+
+    assert output_file.endswith('demo.mp4')
+    assert events[-1]['status'] == 'finished'
+    assert events[-1]['downloaded_bytes'] == events[-1]['total_bytes'] == 1200
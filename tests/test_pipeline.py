@@ -0,0 +1,78 @@
+"""分阶段流水线测试（提前停止时所有线程退出）"""
+
+import itertools
+import threading
+import time
+
+from downloader.pipeline import Pipeline, Stage
+
+
+def _pipeline_threads():
+    return [thread for thread in threading.enumerate() if thread.name.startswith('pipeline-')]
+
+
+def _wait_threads_exit(timeout=5):
+    deadline = time.monotonic() + timeout
+    while _pipeline_threads() and time.monotonic() < deadline:
+        time.sleep(0.05)
+    return _pipeline_threads()
+
+
+def test_all_items_pass_through_stages():
+    pipeline = Pipeline(range(20), [
+        Stage('double', lambda x: x * 2, workers=3),
+        Stage('drop_odd_tens', lambda x: None if x % 20 == 10 else x, workers=2),
+    ], queue_size=2)
+
+    results = sorted(pipeline.run())
+
+    assert results == [x * 2 for x in range(20) if x * 2 % 20 != 10]
+    assert _wait_threads_exit() == []
+
+
+def test_threads_exit_when_consumer_stops_early():
+    # 无限输入、小队列：提前结束时各阶段都阻塞在队列上
+    pipeline = Pipeline(itertools.count(), [
+        Stage('first', lambda x: x, workers=2),
+        Stage('second', lambda x: x, workers=3),
+    ], queue_size=1)
+
+    for item in pipeline.run():
+        if item >= 3:
+            break
+
+    assert _wait_threads_exit() == []
+
+
+def test_stop_while_stage_is_slow():
+    release = threading.Event()
+
+    def slow(x):
+        release.wait(5)
+        return x
+
+    pipeline = Pipeline(range(100), [Stage('slow', slow, workers=2), Stage('next', lambda x: x)], queue_size=1)
+    results = []
+    consumer = threading.Thread(target=lambda: results.extend(pipeline.run()), daemon=True)
+    consumer.start()
+    time.sleep(0.2)
+
+    pipeline.stop()
+    release.set()
+    consumer.join(5)
+
+    assert not consumer.is_alive()
+    assert _wait_threads_exit() == []
+
+
+def test_stage_errors_are_recorded_and_threads_exit():
+    def fail_on_odd(x):
+        if x % 2:
+            raise ValueError(f"bad {x}")
+        return x
+
+    pipeline = Pipeline(range(6), [Stage('check', fail_on_odd, workers=2)])
+
+    assert sorted(pipeline.run()) == [0, 2, 4]
+    assert sorted(failure['item'] for failure in pipeline.failures) == [1, 3, 5]
+    assert _wait_threads_exit() == []
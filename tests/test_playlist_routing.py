@@ -0,0 +1,78 @@
+"""只提供URL的下载任务的播放列表识别测试"""
+
+from downloader import video_downloader
+from downloader.extraction_router import ExtractionRouter
+from downloader.video_downloader import VideoDownloader
+from utils.single_flight import SingleFlight
+
+PLAYLIST_URL = 'https://example.com/playlist'
+
+
+class _FakeYoutubeDL:
+    """按URL返回播放列表或单个视频的 yt-dlp 替身，记录每次解析使用的选项"""
+
+    calls = []
+
+    def __init__(self, params):
+        self.params = params
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def extract_info(self, url, download=False):
+        self.calls.append((url, self.params.get('extract_flat')))
+        if url == PLAYLIST_URL:
+            return {'_type': 'playlist', 'id': 'list', 'entries': [{'url': 'https://example.com/v/1'}]}
+        return {'_type': 'video', 'id': url.rsplit('/', 1)[-1], 'extractor_key': 'Fake', 'formats': []}
+
+    def sanitize_info(self, info):
+        return info
+
+
+def _downloader(monkeypatch):
+    monkeypatch.setattr(video_downloader, '_info_flight', SingleFlight(retain=0))
+    monkeypatch.setattr(video_downloader.yt_dlp, 'YoutubeDL', _FakeYoutubeDL)
+    _FakeYoutubeDL.calls = []
+    downloader = VideoDownloader()
+    downloader.router = ExtractionRouter(path=None)
+    downloads = []
+
+    def download_with_ytdlp(url, output_path, quality, cookie=None, pre_info=None):
+        downloads.append((url, pre_info))
+        return {'success': True, 'filename': url, 'title': url}
+
+    downloader._download_with_ytdlp = download_with_ytdlp
+
+    def iter_playlist_entries(url, cookie=None, max_entries=None):
+        for i in (1, 2):
+            yield {'index': i, 'id': str(i), 'url': f'https://example.com/v/{i}', 'ie_key': 'Fake', 'title': str(i)}
+
+    downloader.iter_playlist_entries = iter_playlist_entries
+    return downloader, downloads
+
+
+def test_url_only_playlist_is_downloaded_entry_by_entry(monkeypatch):
+    downloader, downloads = _downloader(monkeypatch)
+
+    result = downloader.download_video(PLAYLIST_URL, output_path='out')
+
+    assert result['is_playlist'] and result['downloaded'] == 2
+    # 播放列表本身只做扁平探测，条目在下载时逐个解析
+    assert [url for url, _ in downloads] == ['https://example.com/v/1', 'https://example.com/v/2']
+    assert all(flat == 'in_playlist' for _, flat in _FakeYoutubeDL.calls)
+    assert downloader.resume_info is None or 'ytdlp_info' not in downloader.resume_info
+
+
+def test_url_only_video_reuses_probe_result(monkeypatch):
+    downloader, downloads = _downloader(monkeypatch)
+
+    result = downloader.download_video('https://example.com/v/9', output_path='out')
+
+    assert result['success']
+    assert downloads == [('https://example.com/v/9', {
+        '_type': 'video', 'id': '9', 'extractor_key': 'Fake', 'formats': []
+    })]
+    assert len(_FakeYoutubeDL.calls) == 1
@@ -0,0 +1,103 @@
+"""GUI进度总线测试（使用替身根窗口，不需要Tk）"""
+
+import threading
+
+from downloader.progress_handler import ProgressEvent
+from gui.progress_bus import ProgressBus
+
+
+class _FakeRoot:
+    """记录 after 调用，由测试手动触发定时回调"""
+
+    def __init__(self):
+        self.scheduled = []
+
+    def after(self, ms, callback):
+        self.scheduled.append((ms, callback))
+
+    def run_next(self):
+        ms, callback = self.scheduled.pop(0)
+        callback()
+        return ms
+
+
+def _bus(rate=10):
+    root = _FakeRoot()
+    rendered = []
+    bus = ProgressBus(root, lambda job_id, event: rendered.append((job_id, event.downloaded)), rate=rate)
+    bus.start()
+    return root, bus, rendered
+
+
+def test_ticks_at_fixed_rate():
+    root, bus, rendered = _bus()
+
+    assert root.run_next() == 100
+    # 每次交付都会安排下一次
+    assert len(root.scheduled) == 1 and root.scheduled[0][0] == 100
+    assert rendered == []
+
+
+def test_progress_coalesced_to_latest_per_job():
+    root, bus, rendered = _bus()
+
+    def publish(job_id):
+        for downloaded in range(1000):
+            bus.publish(job_id, ProgressEvent(downloaded, 1000))
+
+    threads = [threading.Thread(target=publish, args=(job_id,)) for job_id in (1, 2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    root.run_next()
+
+    # 两千次发布合并为每个任务一次刷新，且是最新的进度
+    assert sorted(rendered) == [(1, 999), (2, 999)]
+    root.run_next()
+    assert len(rendered) == 2
+
+
+def test_posted_events_delivered_in_order_after_progress():
+    root, bus, rendered = _bus()
+    delivered = []
+
+    bus.publish(1, ProgressEvent(10, 100))
+    bus.publish(2, ProgressEvent(20, 100))
+    bus.post(lambda: delivered.append('finished-1'), job_id=1)
+    bus.post(lambda: delivered.append('log'))
+    bus.post(lambda: delivered.append('finished-2'))
+    root.run_next()
+
+    # 结束事件丢弃该任务尚未交付的进度，其余事件一个不丢、按顺序交付
+    assert rendered == [(2, 20)]
+    assert delivered == ['finished-1', 'log', 'finished-2']
+
+
+def test_failing_callbacks_do_not_stop_delivery():
+    root = _FakeRoot()
+    bus = ProgressBus(root, lambda job_id, event: 1 / 0)
+    bus.start()
+    delivered = []
+
+    bus.publish(1, ProgressEvent(1, 2))
+    bus.post(lambda: [][0])
+    bus.post(lambda: delivered.append('ok'))
+    root.run_next()
+
+    assert delivered == ['ok']
+    assert len(root.scheduled) == 1
+
+
+def test_progress_event_is_slotted_and_round_trips():
+    event = ProgressEvent(512, 2048, speed=1024, eta=1.5, started_at=1.0, timestamp=2.0, job_id=7)
+
+    assert not hasattr(event, '__dict__')
+    assert event.percentage == 25.0
+    assert ProgressEvent.from_tuple(event.to_tuple()).to_tuple() == event.to_tuple()
+    assert event.size_text() == '512.00 B / 2.00 KB'
+
+    finished = ProgressEvent(10, 0, finished=True)
+    assert finished.percentage == 100.0
+    assert finished.speed_text() == finished.eta_text() == '完成'
+    assert ProgressEvent(10, 0).percentage == 0.0
@@ -0,0 +1,95 @@
+"""页面和播放列表请求合并键测试"""
+
+import requests
+
+from downloader import m3u8_downloader, page_analyzer
+from downloader.m3u8_downloader import M3U8Downloader
+from downloader.page_analyzer import PageAnalyzer
+from utils.single_flight import SingleFlight
+
+
+class _FakeResponse:
+    """只含测试需要的字段的响应"""
+
+    def __init__(self, text, status_code=200):
+        self.text = text
+        self.content = text.encode('utf-8')
+        self.status_code = status_code
+        self.encoding = 'utf-8'
+        self.headers = {}
+
+
+def _fake_get(hits, text='#EXTM3U\n'):
+    """记录请求次数并返回固定内容的 session.get"""
+    def get(url, **kwargs):
+        hits.append(url)
+        return _FakeResponse(text)
+    return get
+
+
+def test_m3u8_request_after_clearing_proxy(monkeypatch):
+    monkeypatch.setattr(m3u8_downloader, '_playlist_flight', SingleFlight(retain=10))
+    downloader = M3U8Downloader()
+    downloader.set_proxy('http://127.0.0.1:7890')
+    downloader.set_proxy(None)
+    hits = []
+    downloader.session.get = _fake_get(hits)
+
+    assert downloader._request_content('https://example.com/index.m3u8', is_text=True) == '#EXTM3U\n'
+    assert len(hits) == 1
+
+
+def test_m3u8_request_with_proxies_none(monkeypatch):
+    monkeypatch.setattr(m3u8_downloader, '_playlist_flight', SingleFlight(retain=10))
+    downloader = M3U8Downloader()
+    downloader.session.proxies = None
+    downloader.session.get = _fake_get([])
+
+    assert downloader._request_content('https://example.com/index.m3u8', is_text=True) == '#EXTM3U\n'
+
+
+def test_page_analyzer_with_proxies_none(monkeypatch):
+    monkeypatch.setattr(page_analyzer, '_page_flight', SingleFlight(retain=10))
+    session = requests.Session()
+    session.proxies = None
+    hits = []
+    session.get = _fake_get(hits, '<html><video src="https://example.com/a.mp4"></video></html>')
+
+    analysis = PageAnalyzer(session).analyze('https://example.com/view')
+
+    assert analysis.ok
+    assert analysis.direct_mp4_url() == ('https://example.com/a.mp4', 'video标签')
+
+
+def test_flight_key_separates_cookies_and_proxies():
+    session = requests.Session()
+    analyzer = PageAnalyzer(session)
+    url = 'https://example.com/view'
+    plain = analyzer._flight_key(url)
+
+    session.cookies.set('sid', 'abc')
+    with_cookie = analyzer._flight_key(url)
+    session.proxies = {'https': 'http://127.0.0.1:7890'}
+    with_proxy = analyzer._flight_key(url)
+
+    assert len({plain, with_cookie, with_proxy}) == 3
+    session.proxies = None
+    assert analyzer._flight_key(url) == with_cookie
+
+
+def test_playlist_requests_with_different_cookies_are_not_merged(monkeypatch):
+    monkeypatch.setattr(m3u8_downloader, '_playlist_flight', SingleFlight(retain=10))
+    hits = []
+    first = M3U8Downloader()
+    second = M3U8Downloader()
+    second.set_cookie('sid=abc')
+    for downloader in (first, second):
+        downloader.session.get = _fake_get(hits)
+
+    url = 'https://example.com/index.m3u8'
+    first._request_content(url, is_text=True)
+    first._request_content(url, is_text=True)
+    second._request_content(url, is_text=True)
+
+    # 相同参数的请求复用结果，不同Cookie的请求单独发出
+    assert len(hits) == 2
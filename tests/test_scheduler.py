@@ -0,0 +1,183 @@
+"""多任务调度器测试（使用替身下载器，不联网）"""
+
+import threading
+import time
+
+from downloader.job_queue import JobQueue, STATE_DONE, STATE_PAUSED
+from downloader.scheduler import DownloadScheduler
+
+
+class _FakeDownloader:
+    """记录连接配额并在释放前阻塞的替身下载器"""
+
+    def __init__(self, release):
+        self.release = release
+        self.concurrent_fragments = 8
+
+    def download_video(self, url, output_path='.', quality='best', video_info=None, cookie=None,
+                       resume_info=None):
+        self.release.wait(5)
+        return {'success': True, 'filename': url.rsplit('/', 1)[-1]}
+
+    def cancel_download(self):
+        self.release.set()
+
+
+def _scheduler(job_queue, release, **kwargs):
+    scheduler = DownloadScheduler(job_queue, **kwargs)
+    scheduler._create_downloader = lambda job_id: _FakeDownloader(release)
+    return scheduler
+
+
+def test_connection_budget_is_never_oversubscribed():
+    job_queue = JobQueue(':memory:')
+    for index in range(3):
+        job_queue.add(f'https://host{index}.example.com/video{index}')
+    release = threading.Event()
+    scheduler = _scheduler(job_queue, release, max_workers=3, per_host_limit=2, max_connections=16)
+    started = []
+    all_started = threading.Event()
+
+    def on_started(job):
+        started.append(job['id'])
+        if len(started) == 3:
+            all_started.set()
+
+    scheduler.job_started_callback = on_started
+    scheduler.start(exit_when_idle=True)
+    assert all_started.wait(5)
+
+    with scheduler._condition:
+        shares = [running.downloader.concurrent_fragments for running in scheduler.running.values()]
+    release.set()
+    scheduler.join(5)
+
+    assert len(shares) == 3
+    assert sum(shares) <= 16
+    assert job_queue.counts() == {STATE_DONE: 3}
+
+
+def test_per_host_limit():
+    job_queue = JobQueue(':memory:')
+    for index in range(3):
+        job_queue.add(f'https://same.example.com/video{index}')
+    release = threading.Event()
+    scheduler = _scheduler(job_queue, release, max_workers=3, per_host_limit=2)
+    two_started = threading.Event()
+    started = []
+
+    def on_started(job):
+        started.append(job['id'])
+        if len(started) == 2:
+            two_started.set()
+
+    scheduler.job_started_callback = on_started
+    scheduler.start(exit_when_idle=True)
+    assert two_started.wait(5)
+    with scheduler._condition:
+        running = len(scheduler.running)
+    release.set()
+    scheduler.join(5)
+
+    assert running == 2
+    assert job_queue.counts() == {STATE_DONE: 3}
+
+
+def test_progress_is_not_blocked_by_claim():
+    job_queue = JobQueue(':memory:')
+    scheduler = DownloadScheduler(job_queue)
+    claiming = threading.Event()
+    finish_claim = threading.Event()
+
+    def slow_claim(accept=None):
+        claiming.set()
+        finish_claim.wait(5)
+        return None
+
+    job_queue.claim_next = slow_claim
+    thread = threading.Thread(target=scheduler._claim)
+    thread.start()
+    assert claiming.wait(5)
+
+    # 领取任务期间调度器锁不被占用，进度回调可以立即执行
+    acquired = scheduler._condition.acquire(timeout=1)
+    if acquired:
+        scheduler._condition.release()
+    finish_claim.set()
+    thread.join(5)
+
+    assert acquired
+
+
+def test_leases_renewed_after_stop_until_running_jobs_finish(tmp_path):
+    path = str(tmp_path / 'jobs.db')
+    job_queue = JobQueue(path, lease_seconds=1)
+    job_id = job_queue.add('https://example.com/long')
+    release = threading.Event()
+    scheduler = _scheduler(job_queue, release, max_workers=1)
+    started = threading.Event()
+    scheduler.job_started_callback = lambda job: started.set()
+    scheduler.start()
+    assert started.wait(5)
+
+    scheduler.stop()
+    # 停止后运行中的任务超过租约时长仍未结束，租约不能过期
+    time.sleep(2.5)
+    other_node = JobQueue(path, node_id='other', lease_seconds=1)
+    assert other_node.claim_next() is None
+
+    release.set()
+    scheduler.join(5)
+    assert job_queue.get(job_id)['state'] == STATE_DONE
+
+
+class _ResumableDownloader:
+    """取消时返回恢复信息的替身下载器，记录每次下载收到的恢复信息"""
+
+    def __init__(self, calls, started):
+        self.calls = calls
+        self.started = started
+        self.cancelled = threading.Event()
+        self.concurrent_fragments = 8
+
+    def download_video(self, url, output_path='.', quality='best', video_info=None, cookie=None,
+                       resume_info=None):
+        self.calls.append(resume_info)
+        self.started.set()
+        if resume_info is None and self.cancelled.wait(5):
+            return {'success': False, 'cancelled': True, 'resume_info': {'ytdlp_info': {'id': 'abc'}}}
+        return {'success': True, 'filename': 'abc.mp4'}
+
+    def cancel_download(self):
+        self.cancelled.set()
+
+
+def test_pause_and_resume_running_job():
+    job_queue = JobQueue(':memory:')
+    job_id = job_queue.add('https://example.com/video')
+    calls = []
+    started = threading.Event()
+    scheduler = DownloadScheduler(job_queue, max_workers=1)
+    scheduler._create_downloader = lambda job_id: _ResumableDownloader(calls, started)
+    finished = []
+    scheduler.job_finished_callback = lambda job, result, state: finished.append(state)
+    scheduler.start()
+    assert started.wait(5)
+
+    assert scheduler.pause(job_id)
+    deadline = time.monotonic() + 5
+    while not finished and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert finished == [STATE_PAUSED]
+    assert job_queue.get(job_id)['options']['resume_info'] == {'ytdlp_info': {'id': 'abc'}}
+
+    assert scheduler.resume(job_id)
+    while len(finished) < 2 and time.monotonic() < deadline:
+        time.sleep(0.02)
+    scheduler.stop()
+    scheduler.join(5)
+
+    # 恢复后的下载收到暂停时保存的解析结果
+    assert calls == [None, {'ytdlp_info': {'id': 'abc'}}]
+    assert job_queue.get(job_id)['state'] == STATE_DONE
+    assert job_queue.get(job_id)['attempts'] == 1
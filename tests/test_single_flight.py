@@ -0,0 +1,119 @@
+"""请求合并测试"""
+
+import threading
+import time
+
+import pytest
+
+from utils.single_flight import SingleFlight
+
+
+def _run_concurrently(count, target):
+    """同时启动多个线程执行 target，返回各线程的结果"""
+    results = [None] * count
+    barrier = threading.Barrier(count)
+
+    def worker(index):
+        barrier.wait()
+        results[index] = target()
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    return results
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight(retain=0)
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        time.sleep(0.2)
+        return 'page'
+
+    results = _run_concurrently(5, lambda: flight.do('key', fetch))
+
+    assert len(calls) == 1
+    assert [result for result, _ in results] == ['page'] * 5
+    assert sorted(shared for _, shared in results) == [False, True, True, True, True]
+
+
+def test_different_keys_run_separately():
+    flight = SingleFlight(retain=10)
+
+    assert flight.do('a', lambda: 1) == (1, False)
+    assert flight.do('b', lambda: 2) == (2, False)
+
+
+def test_result_retained_then_forgotten():
+    flight = SingleFlight(retain=10)
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        return len(calls)
+
+    assert flight.do('key', fetch) == (1, False)
+    assert flight.do('key', fetch) == (1, True)
+
+    flight.forget('key')
+    assert flight.do('key', fetch) == (2, False)
+
+
+def test_retain_zero_does_not_keep_results():
+    flight = SingleFlight(retain=0)
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        return len(calls)
+
+    assert flight.do('key', fetch) == (1, False)
+    assert flight.do('key', fetch) == (2, False)
+
+
+def test_failure_is_not_shared():
+    flight = SingleFlight(retain=10)
+    started = threading.Event()
+    release = threading.Event()
+
+    def failing():
+        started.set()
+        release.wait(5)
+        raise ValueError('boom')
+
+    leader_error = []
+
+    def leader():
+        try:
+            flight.do('key', failing)
+        except ValueError as e:
+            leader_error.append(e)
+
+    thread = threading.Thread(target=leader)
+    thread.start()
+    started.wait(5)
+
+    follower_result = []
+    follower = threading.Thread(target=lambda: follower_result.append(flight.do('key', lambda: 'retried')))
+    follower.start()
+    time.sleep(0.05)
+    release.set()
+    thread.join(5)
+    follower.join(5)
+
+    assert len(leader_error) == 1
+    # 领头者失败后，等待中的线程自己重新执行请求
+    assert follower_result == [('retried', False)]
+
+
+def test_leader_exception_propagates():
+    flight = SingleFlight()
+
+    with pytest.raises(KeyError):
+        flight.do('key', lambda: {}['missing'])
+    # 失败不保留
+    assert flight.do('key', lambda: 'ok') == ('ok', False)
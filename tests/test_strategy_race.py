@@ -0,0 +1,130 @@
+"""M3U8解析策略竞速测试（替身策略，不联网）"""
+
+import threading
+import time
+
+import pytest
+
+from downloader.m3u8_downloader import DirectMP4UrlException, M3U8Downloader
+
+
+def _downloader(deadline=45):
+    downloader = M3U8Downloader()
+    downloader.set_strategy_racing(True, deadline)
+    return downloader
+
+
+def _waiting_strategy(downloader, seconds, result, cancelled, started=None):
+    """等待指定时间后返回结果；等待期间被取消时记录并返回None"""
+    def strategy():
+        if started is not None:
+            started.set()
+        if downloader._sleep(seconds):
+            cancelled.set()
+            return None
+        return result
+    return strategy
+
+
+def test_higher_priority_result_wins_over_faster_one():
+    downloader = _downloader()
+    cancelled = threading.Event()
+    strategies = [
+        ('viewkey', _waiting_strategy(downloader, 0.3, {'m3u8_url': 'a'}, cancelled)),
+        ('page_id', lambda: {'m3u8_url': 'b'}),
+    ]
+
+    result = downloader._race_strategies(strategies, [])
+
+    assert result == {'m3u8_url': 'a', 'strategy': 'viewkey'}
+    assert not cancelled.is_set()
+
+
+def test_failed_strategy_falls_through_to_next():
+    downloader = _downloader()
+    errors = []
+
+    def failing():
+        raise ValueError('页面没有 viewkey')
+
+    result = downloader._race_strategies([('viewkey', failing), ('page_id', lambda: {'m3u8_url': 'b'})], errors)
+
+    assert result['strategy'] == 'page_id'
+    assert [str(e) for e in errors] == ['页面没有 viewkey']
+
+
+def test_winner_cancels_losers():
+    downloader = _downloader()
+    cancelled = threading.Event()
+    loser_started = threading.Event()
+
+    def winner():
+        # 等落败的策略开始运行后再返回（尚未开始的策略直接被撤销）
+        loser_started.wait(2)
+        return {'m3u8_url': 'a'}
+
+    strategies = [
+        ('direct_mp4', winner),
+        ('page_id', _waiting_strategy(downloader, 10, {'m3u8_url': 'b'}, cancelled, loser_started)),
+    ]
+
+    result = downloader._race_strategies(strategies, [])
+
+    assert result['strategy'] == 'direct_mp4'
+    # 落败的策略在等待中被唤醒，而不是等满10秒
+    assert cancelled.wait(2)
+
+
+def test_deadline_takes_best_finished_result_and_cancels_slow_strategy():
+    downloader = _downloader(deadline=1)
+    cancelled = threading.Event()
+    strategies = [
+        ('viewkey', _waiting_strategy(downloader, 10, {'m3u8_url': 'slow'}, cancelled)),
+        ('page_id', lambda: {'m3u8_url': 'fast'}),
+    ]
+    start = time.monotonic()
+
+    result = downloader._race_strategies(strategies, [])
+
+    assert 0.9 <= time.monotonic() - start < 3
+    assert result == {'m3u8_url': 'fast', 'strategy': 'page_id'}
+    assert cancelled.wait(2)
+
+
+def test_deadline_without_result_reports_timeout():
+    downloader = _downloader(deadline=1)
+    cancelled = threading.Event()
+    errors = []
+    strategies = [
+        ('viewkey', _waiting_strategy(downloader, 10, {'m3u8_url': 'a'}, cancelled)),
+        ('page_id', lambda: None),
+    ]
+
+    assert downloader._race_strategies(strategies, errors) is None
+    assert '超时' in str(errors[-1])
+    assert cancelled.wait(2)
+
+
+def test_direct_mp4_from_winner_is_raised():
+    downloader = _downloader()
+
+    def found_mp4():
+        raise DirectMP4UrlException('https://cdn.example.com/a.mp4')
+
+    with pytest.raises(DirectMP4UrlException):
+        downloader._race_strategies([('direct_mp4', found_mp4), ('page_id', lambda: {'m3u8_url': 'b'})], [])
+
+
+def test_download_cancel_stops_raced_strategies():
+    downloader = _downloader()
+    cancelled = threading.Event()
+    strategies = [
+        ('viewkey', _waiting_strategy(downloader, 10, {'m3u8_url': 'a'}, cancelled)),
+        ('page_id', _waiting_strategy(downloader, 10, {'m3u8_url': 'b'}, threading.Event())),
+    ]
+    threading.Timer(0.2, downloader.cancel_token.cancel).start()
+    start = time.monotonic()
+
+    assert downloader._race_strategies(strategies, []) is None
+    assert time.monotonic() - start < 3
+    assert cancelled.is_set()
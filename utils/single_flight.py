@@ -0,0 +1,102 @@
+"""请求合并工具模块
+
+多个线程同时发起相同的请求（相同的页面、播放列表或元数据）时，
+只有第一个线程（领头者）真正执行，其余线程等待并共享同一个结果；
+结果在完成后短时间保留，稍后到达的相同请求直接复用。
+失败不共享：领头者失败后，等待中的线程重新发起（同一时刻仍然只有一个请求在途）
+"""
+
+import threading
+import time
+
+
+class _Call:
+    """一次进行中或已完成的请求"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.ok = False
+        self.result = None
+        self.finished_at = None
+
+
+class SingleFlight:
+    """相同请求合并器（线程安全）"""
+
+    def __init__(self, retain=10):
+        """
+        初始化请求合并器
+
+        Args:
+            retain: 成功结果在完成后保留的时间（秒），0表示只合并进行中的请求
+        """
+        self.retain = retain
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        """
+        执行请求，相同键的并发请求只执行一次
+
+        Args:
+            key: 请求键（可哈希，需包含影响结果的所有参数，如URL、Cookie、代理）
+            fn: 无参数的请求函数
+
+        Returns:
+            tuple: (结果, 是否为共享的结果)
+
+        Raises:
+            Exception: 本线程作为领头者执行时 fn 抛出的异常
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                call = self._calls.get(key)
+                if call is not None and self._expired(call, now):
+                    del self._calls[key]
+                    call = None
+                leader = call is None
+                if leader:
+                    self._purge(now)
+                    call = self._calls[key] = _Call()
+
+            if leader:
+                return self._lead(key, call, fn), False
+
+            call.done.wait()
+            if call.ok:
+                return call.result, True
+
+    def _lead(self, key, call, fn):
+        """领头者执行请求并发布结果"""
+        try:
+            call.result = fn()
+            call.ok = True
+            return call.result
+        finally:
+            with self._lock:
+                call.finished_at = time.monotonic()
+                if (not call.ok or not self.retain) and self._calls.get(key) is call:
+                    del self._calls[key]
+            call.done.set()
+
+    def _expired(self, call, now):
+        """已完成的结果是否超过保留时间"""
+        return call.finished_at is not None and now - call.finished_at >= self.retain
+
+    def _purge(self, now):
+        """清理过期的结果（调用方需持有锁）"""
+        for key in [key for key, call in self._calls.items() if self._expired(call, now)]:
+            del self._calls[key]
+
+    def forget(self, key):
+        """
+        丢弃保留的结果（下一次相同请求重新执行）
+
+        Args:
+            key: 请求键
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None and call.done.is_set():
+                del self._calls[key]